@@ -1,6 +1,10 @@
 from langgraph.graph import StateGraph, END
 from typing import TypedDict, Optional
+from langchain_core.runnables import RunnableConfig
+from langchain_google_community.calendar.create_event import CalendarCreateEvent
 from utils.calender_event import generate_event
+from utils.checkpoints import get_checkpointer
+from utils.draft_store import create_draft
 
 class CalenderState(TypedDict):
     query: str
@@ -9,10 +13,38 @@ class CalenderState(TypedDict):
 calender_graph = StateGraph(CalenderState)
 
 # Step 1: Generate Draft
-def generate_event_draft(state: CalenderState) -> CalenderState:
+def generate_event_draft(state: CalenderState, config: RunnableConfig) -> CalenderState:
     event_data = generate_event(state["query"])
-    return {"output": {"event": event_data}}
+    # Stored server-side so approval sends only the draft ID and edited fields
+    thread_id = config.get("configurable", {}).get("thread_id")
+    draft_id = create_draft("event", event_data, {"thread_id": thread_id})["draft_id"]
+    return {"output": {"event": event_data, "draft_id": draft_id}}
+
+# Step 2: Create the event on Google Calendar (only after review)
+def create_event_node(state: CalenderState) -> CalenderState:
+    event = (state.get("output") or {}).get("event")
+    if not event:
+        return {"output": {"success": False, "error": "Event missing"}}
+    CalendarCreateEvent().invoke(
+        {
+            "summary": event["summary"],
+            "start_datetime": event["start_datetime"],
+            "end_datetime": event["end_datetime"],
+            "timezone": event["timezone"],
+            "location": event["location"],
+            "description": event["description"],
+            "reminders": event["reminders"],
+            "conference_data": event["conference_data"],
+            "color_id": event["color_id"],
+        }
+    )
+    return {"output": {**state["output"], "success": True, "result": "Submitted Successfully"}}
 
 calender_graph.add_node("generate_event", generate_event_draft)
-calender_graph.add_edge("generate_event", END)
+calender_graph.add_node("create_event", create_event_node)
+calender_graph.add_edge("generate_event", "create_event")
+calender_graph.add_edge("create_event", END)
 calender_graph.set_entry_point("generate_event")
+
+# Runs pause before "create_event" for review; approval resumes the checkpointed thread
+calender_app = calender_graph.compile(checkpointer=get_checkpointer(), interrupt_before=["create_event"])
@@ -0,0 +1,260 @@
+"""
+Compound requests as a small action DAG executed with LangGraph fan-out/fan-in.
+
+The planner turns a request into actions (calendar, email, post, analytics)
+with dependencies between them. Every action whose dependencies are done runs
+in parallel (one ``Send`` branch each); the ``schedule`` node is the fan-in
+barrier that releases the next level. A dependency's result is passed to the
+actions depending on it, e.g. the drafted event's time into the email.
+"""
+
+import json
+import re
+from typing import Annotated, Any, Dict, List, Optional, TypedDict
+
+from langgraph.graph import END, StateGraph
+from langgraph.types import Send
+
+from agents.calender_graph import calender_app
+from agents.content_graph import compact_content, content_app
+from agents.email_graph import email_app
+from agents.linkedinAnalyticsGraph import profile_analytics_agent
+from agents.linkedinContentGen import setup_llm
+from utils.analytics_precompute import wait_for_precompute
+from utils.checkpoints import new_thread_id, resume_thread, thread_config
+from utils.draft_store import record_action
+from utils.speculation import claim, discard
+
+MAX_ACTIONS = 6
+
+# action -> what the planner is told it does
+ACTIONS = {
+    "calendar": "Draft a Google Calendar event (the user reviews it before it is created)",
+    "email": "Write and send an email",
+    "post": "Draft a LinkedIn post (the user reviews it before it is published)",
+    "analytics": "Answer a question about the uploaded LinkedIn analytics file",
+}
+
+# Keywords for the plan used when the LLM's plan can't be parsed
+ACTION_KEYWORDS = {
+    "calendar": ("calender", "calendar", "event", "meeting", "schedule"),
+    "email": ("email", "mail"),
+    "post": ("linkedin post", "create post", "write a post", "draft a post"),
+    "analytics": ("analytics", "best performing", "top post", "profile data"),
+}
+
+
+def _merge_results(left: Dict[str, Any], right: Dict[str, Any]) -> Dict[str, Any]:
+    """Reducer so parallel action branches can each add their own result"""
+    return {**(left or {}), **(right or {})}
+
+
+class CompoundState(TypedDict):
+    query: str
+    file_path: Optional[str]
+    plan: List[Dict[str, Any]]
+    results: Annotated[Dict[str, Any], _merge_results]
+
+
+class ActionTask(TypedDict):
+    action: Dict[str, Any]
+    file_path: Optional[str]
+    inputs: Dict[str, Any]
+
+
+def validate_plan(plan: Any) -> List[Dict[str, Any]]:
+    """Normalized plan, or ValueError if it isn't a valid acyclic DAG of known actions."""
+    if not isinstance(plan, list) or not 0 < len(plan) <= MAX_ACTIONS:
+        raise ValueError(f"A plan needs 1-{MAX_ACTIONS} actions")
+    actions = []
+    for step in plan:
+        if not isinstance(step, dict) or step.get("action") not in ACTIONS:
+            raise ValueError(f"Unknown action in plan: {step}")
+        actions.append({
+            "id": str(step.get("id") or step["action"]),
+            "action": step["action"],
+            "query": str(step.get("query") or ""),
+            "depends_on": [str(dep) for dep in step.get("depends_on") or []],
+        })
+    ids = [action["id"] for action in actions]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Action ids must be unique")
+    for action in actions:
+        unknown = set(action["depends_on"]) - set(ids)
+        if unknown:
+            raise ValueError(f"{action['id']} depends on unknown actions {sorted(unknown)}")
+
+    # Kahn's algorithm: every action must become ready eventually
+    done: set = set()
+    while len(done) < len(actions):
+        ready = [a["id"] for a in actions if a["id"] not in done and set(a["depends_on"]) <= done]
+        if not ready:
+            raise ValueError("Plan has a dependency cycle")
+        done.update(ready)
+    return actions
+
+
+def keyword_plan(query: str) -> List[Dict[str, Any]]:
+    """Plan from keywords: every mentioned action on the whole query, email after the event"""
+    q = query.lower()
+    found = [action for action, words in ACTION_KEYWORDS.items() if any(word in q for word in words)]
+    plan = []
+    for action in found or ["post"]:
+        depends_on = ["calendar"] if action == "email" and "calendar" in found else []
+        plan.append({"id": action, "action": action, "query": query, "depends_on": depends_on})
+    return plan
+
+
+def plan_actions(query: str) -> List[Dict[str, Any]]:
+    """Decompose a compound request into an action DAG with one LLM call."""
+    actions = "\n".join(f"- {name}: {description}" for name, description in ACTIONS.items())
+    prompt = f"""Split this request into the actions needed to fulfil it.
+
+Request: "{query}"
+
+Available actions:
+{actions}
+
+Return ONLY a JSON list. Each item has:
+- "id": short unique name (use the action name unless it is used twice)
+- "action": one of {list(ACTIONS)}
+- "query": the instruction for that action alone, with every detail it needs from the request
+- "depends_on": ids whose result this action needs (e.g. an email about an event depends on the calendar action); [] if independent
+
+Keep independent actions independent so they can run in parallel."""
+    try:
+        response = setup_llm().invoke(prompt)
+        text = response.content if hasattr(response, "content") else str(response)
+        match = re.search(r"\[.*\]", text, re.DOTALL)
+        plan = validate_plan(json.loads(match.group(0) if match else text))
+    except Exception as e:
+        print(f"DEBUG: Compound planner fell back to keywords: {e}")
+        plan = validate_plan(keyword_plan(query))
+    for action in plan:
+        action["query"] = action["query"] or query
+    return plan
+
+
+def _succeeded(result: Dict[str, Any]) -> bool:
+    if not result or result.get("success", True) is False or "error" in result:
+        return False
+    output = result.get("output")
+    return not isinstance(output, dict) or output.get("success", True) is not False
+
+
+def _dependency_context(inputs: Dict[str, Any]) -> str:
+    """What the dependencies produced, in a form the next action's prompt can use"""
+    lines = []
+    for result in inputs.values():
+        event = (result.get("output") or {}).get("event")
+        if event:
+            fields = ("summary", "start_datetime", "end_datetime", "timezone", "location")
+            lines.append("Event: " + ", ".join(f"{field}={event[field]}" for field in fields if event.get(field)))
+        elif result.get("draft"):
+            lines.append(f"Email sent: {result['draft'].get('subject', '')} to {result['draft'].get('to', '')}")
+        elif result.get("content"):
+            lines.append(f"LinkedIn post draft:\n{result['content'].get('content', '')}")
+        elif result.get("analysis"):
+            lines.append(f"Analytics findings:\n{str(result['analysis'])[:1500]}")
+    return "\n".join(lines)
+
+
+def run_action(action: Dict[str, Any], file_path: Optional[str], inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one planned action; drafts that need review stay paused under their draft ID."""
+    query = action["query"]
+    context = _dependency_context(inputs)
+    if context:
+        query = f"{query}\n\nUse these details:\n{context}"
+
+    if action["action"] == "calendar":
+        state = calender_app.invoke({"query": query, "output": None}, thread_config(new_thread_id("calender")))
+        return {"output": state["output"]}
+    if action["action"] == "email":
+        # Compound requests send the email right away: resume the paused run
+        thread_id = new_thread_id("email")
+        drafted = email_app.invoke(
+            {"query": query, "draft": None, "draft_id": None, "approved": False, "output": None},
+            thread_config(thread_id),
+        )
+        if not drafted.get("draft"):
+            return {"success": False, "error": "Failed to generate email draft"}
+        sent = resume_thread(email_app, thread_id, {"approved": True})
+        record_action(sent["draft_id"], sent["output"])
+        return {"output": sent["output"], "draft": sent["draft"], "draft_id": sent["draft_id"]}
+    if action["action"] == "post":
+        state = content_app.invoke(
+            {"query": query, "content": None, "approved": False, "output": None, "variants": None},
+            thread_config(new_thread_id("content")),
+        )
+        content = compact_content(state.get("content") or {})
+        return {"content": content, "success": bool(content.get("success"))}
+    if not file_path:
+        return {"success": False, "error": "No analytics file provided. Please upload your LinkedIn analytics Excel/CSV file."}
+    # The router may already have queued the precompute speculatively
+    claim("analytics", file_path)
+    wait_for_precompute(file_path)
+    return profile_analytics_agent(file_path, query)
+
+
+def plan_node(state: CompoundState) -> CompoundState:
+    plan = plan_actions(state["query"])
+    print(f"DEBUG: Compound plan: {[(a['id'], a['depends_on']) for a in plan]}")
+    # The router's personal context retrieval is keyed by the whole request; it is
+    # claimed only by an independent post action drafted from that same request
+    if not any(a["action"] == "post" and a["query"] == state["query"] and not a["depends_on"] for a in plan):
+        discard("personal_context", state["query"])
+    return {"plan": plan, "results": {}}
+
+
+def action_node(task: ActionTask) -> CompoundState:
+    action = task["action"]
+    failed = [dep for dep, result in task["inputs"].items() if not _succeeded(result)]
+    if failed:
+        result = {"success": False, "error": f"Skipped because {', '.join(failed)} failed"}
+    else:
+        try:
+            result = run_action(action, task["file_path"], task["inputs"])
+        except Exception as e:
+            result = {"success": False, "error": f"{action['action']} failed: {e}"}
+    return {"results": {action["id"]: result}}
+
+
+def schedule_node(state: CompoundState) -> CompoundState:
+    # Fan-in barrier: runs once after every branch of a level has finished
+    return {}
+
+
+def dispatch_ready(state: CompoundState):
+    """One branch per action whose dependencies are all done; END when nothing is left."""
+    done = state.get("results") or {}
+    ready = [
+        action for action in state["plan"]
+        if action["id"] not in done and all(dep in done for dep in action["depends_on"])
+    ]
+    if not ready:
+        return END
+    return [
+        Send("run_action", {
+            "action": action,
+            "file_path": state.get("file_path"),
+            "inputs": {dep: done[dep] for dep in action["depends_on"]},
+        })
+        for action in ready
+    ]
+
+
+compound_graph = StateGraph(CompoundState)
+compound_graph.add_node("plan", plan_node)
+compound_graph.add_node("run_action", action_node)
+compound_graph.add_node("schedule", schedule_node)
+compound_graph.set_entry_point("plan")
+compound_graph.add_conditional_edges("plan", dispatch_ready, ["run_action", END])
+compound_graph.add_edge("run_action", "schedule")
+compound_graph.add_conditional_edges("schedule", dispatch_ready, ["run_action", END])
+compound_app = compound_graph.compile()
+
+
+def run_compound(query: str, file_path: Optional[str] = None) -> Dict[str, Any]:
+    """Plan and execute a compound request; ``results`` is keyed by action id."""
+    state = compound_app.invoke({"query": query, "file_path": file_path, "plan": [], "results": {}})
+    return {"plan": state["plan"], "results": state["results"]}
@@ -1,6 +1,10 @@
+import re
 from langgraph.graph import StateGraph, END
 from typing import TypedDict, Optional
+from langchain_core.runnables import RunnableConfig
 from agents.linkedinContentGen import setup_llm, PersonalizedLinkedInContentAgent
+from utils.draft_store import create_draft
+from utils.checkpoints import get_checkpointer
 
 content_agent = PersonalizedLinkedInContentAgent()
 
@@ -9,13 +13,62 @@ class ContentState(TypedDict):
     content: Optional[str]
     approved: bool
     output: Optional[str]
+    variants: Optional[int]  # Number of alternative drafts to generate
 
-def content_draft_node(state: ContentState) -> ContentState:
-    content = content_agent.generate_personalized_content(state["query"])
+def requested_variants(query: str) -> int:
+    """Number of drafts asked for in the query, e.g. "give me 3 versions"; 1 by default"""
+    match = re.search(r"\b(\d+)\s+(?:\w+\s+)?(?:variants|versions|options|drafts|alternatives)\b", query, re.IGNORECASE)
+    return int(match.group(1)) if match else 1
+
+def content_draft_node(state: ContentState, config: RunnableConfig) -> ContentState:
+    variants = state.get("variants") or requested_variants(state["query"])
+    if variants > 1:
+        content = content_agent.generate_content_variants(state["query"], variants)
+    else:
+        content = content_agent.generate_personalized_content(state["query"])
+    if content.get("success"):
+        # Each draft gets an ID so it can be revised without regenerating
+        metadata = {"topic": state["query"], "thread_id": config.get("configurable", {}).get("thread_id")}
+        for variant in content.get("variants", []):
+            variant["draft_id"] = create_draft("post", variant["text"], metadata)["draft_id"]
+        content["draft_id"] = (
+            content["variants"][0]["draft_id"] if content.get("variants")
+            else create_draft("post", content["content"], metadata)["draft_id"]
+        )
     return {"content": content, "approved": False}
 
 
+def compact_content(content: dict) -> dict:
+    """Generated post(s) without the per-feature breakdown of their engagement scores"""
+    def brief(item: dict) -> dict:
+        return {k: v for k, v in item.items() if k != "features"}
+
+    compact = dict(content)
+    if compact.get("engagement_score"):
+        compact["engagement_score"] = brief(compact["engagement_score"])
+    if compact.get("variants"):
+        compact["variants"] = [brief(variant) for variant in compact["variants"]]
+    return compact
+
+def content_publish_node(state: ContentState) -> ContentState:
+    content = state.get("content") or {}
+    text = content.get("content") if isinstance(content, dict) else content
+    if not text:
+        return {"output": {"success": False, "error": "Content missing"}}
+    content_agent.linkedin_automation.create_post(text)
+    return {"approved": True, "output": {"success": True, "result": "Submitted Successfully"}}
+
+def _draft_decision(state: ContentState) -> str:
+    content = state.get("content") or {}
+    return "publish" if content.get("success") else END
+
+
 graph = StateGraph(ContentState)
 graph.add_node("draft", content_draft_node)
+graph.add_node("publish", content_publish_node)
 graph.set_entry_point("draft")
-graph.add_edge("draft", END)
\ No newline at end of file
+graph.add_conditional_edges("draft", _draft_decision, {"publish": "publish", END: END})
+graph.add_edge("publish", END)
+
+# Runs pause before "publish" for review; approval resumes the checkpointed thread
+content_app = graph.compile(checkpointer=get_checkpointer(), interrupt_before=["publish"])
\ No newline at end of file
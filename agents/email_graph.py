@@ -1,23 +1,30 @@
 # email_graph.py
 from langgraph.graph import StateGraph, END
 from typing import TypedDict, Optional
+from langchain_core.runnables import RunnableConfig
 from tools.gmail_tool import gmail_send_message
 from tools.email_writer import generate_email_draft  # your LLM draft writer
+from utils.checkpoints import get_checkpointer
+from utils.draft_store import create_draft
 
 class EmailState(TypedDict):
     query: str
     draft: Optional[dict]
+    draft_id: Optional[str]
     approved: bool
     output: Optional[dict]
 
 graph = StateGraph(EmailState)
 
 # Step 1: Generate Draft
-def draft_node(state: EmailState) -> EmailState:
+def draft_node(state: EmailState, config: RunnableConfig) -> EmailState:
     print(f"DEBUG draft_node - input query: '{state['query']}'")
     draft = generate_email_draft(state["query"])  # returns {"to":..., "subject":..., "body":...}
     # print(f"DEBUG draft_node - generated draft: {draft}")
-    return {"draft": draft, "approved": False}
+    # Stored server-side so approval sends only the draft ID and edited fields
+    thread_id = config.get("configurable", {}).get("thread_id")
+    draft_id = create_draft("email", draft, {"thread_id": thread_id})["draft_id"]
+    return {"draft": draft, "draft_id": draft_id, "approved": False}
 
 # Step 2: Send Email (only if approved)
 def send_node(state: EmailState) -> EmailState:
@@ -31,6 +38,7 @@ def send_node(state: EmailState) -> EmailState:
     return {
         "query": state["query"],
         "draft": draft,
+        "draft_id": state.get("draft_id"),
         "approved": True,
         "output": res
     }
@@ -38,7 +46,9 @@ def send_node(state: EmailState) -> EmailState:
 graph.add_node("draft", draft_node)
 graph.add_node("send", send_node)
 
-# edges - set draft as default entry point but allow start_at to override
 graph.set_entry_point("draft")
-graph.add_edge("draft", END)   # stop after draft, wait for review
+graph.add_edge("draft", "send")
 graph.add_edge("send", END)    # stop after send
+
+# Runs pause before "send" for review; approval resumes the checkpointed thread
+email_app = graph.compile(checkpointer=get_checkpointer(), interrupt_before=["send"])
@@ -2,11 +2,15 @@ from langgraph.graph import StateGraph, END
 from typing import TypedDict, Optional
 from agents.linkedinAnalyticsGraph import profile_analytics_agent
 from agents.linkedinAnalytics import analyze_post_agent
+from utils.analytics_precompute import enqueue_precompute, wait_for_precompute
+from utils.speculation import claim, discard, speculate
 from tools.content_postingTool import content_posting_agent
-from agents.email_graph import graph as email_graph
-from agents.calender_graph import calender_graph
+from agents.email_graph import email_app
+from agents.calender_graph import calender_app
 from agents.linkedinContentGen import setup_llm
-from agents.content_graph import graph as content_graph
+from agents.content_graph import compact_content, content_agent, content_app
+from utils.checkpoints import new_thread_id, thread_config
+from agents.compound_graph import ACTION_KEYWORDS, run_compound
 class AgentState(TypedDict):
     query: str
     choice: str   # linkedin_post / profile_analytics / post_analytics / email / calender / compound
@@ -14,12 +18,18 @@ class AgentState(TypedDict):
     output: Optional[dict]
     route: Optional[str]
     compound_actions: Optional[list]  # For handling multiple actions
+    variants: Optional[int]  # Alternative LinkedIn post drafts to generate
 
 maingraph = StateGraph(AgentState)
 
 # Router (MainAgent) - LangChain-based intelligent routing
 def router(state: AgentState) -> AgentState:
     llm = setup_llm()
+    # Speculative prefetch while the routing LLM call is in flight; discarded if the route doesn't need it
+    speculate("personal_context", state["query"], content_agent.personal_agent.search_personal_info, state["query"])
+    if state.get("uploaded_file_path"):
+        # Only queues the precompute job (parsing runs in its own pool); waiting is left to the consumer
+        speculate("analytics", state["uploaded_file_path"], enqueue_precompute, state["uploaded_file_path"])
     
     prompt = f"""You are an intelligent routing agent. Based on the user's query, determine which agent should handle the request.
 
@@ -36,7 +46,7 @@ User query: "{state['query']}"
 Routing guidance and examples:
 - If the user asks for "best performing post", "top post(s)", "top performing", or similar analytics insights, choose profile_analytics (these rely on uploaded Excel/CSV analytics files).
 - If the user provides a LinkedIn post URL or asks to analyze a specific URL, choose post_analytics.
-- If the query involves multiple actions (like creating calendar event AND sending email), respond with "compound".
+- If the query involves multiple actions (like creating calendar event AND sending email, or writing a post AND emailing it), respond with "compound".
 Otherwise, respond with ONLY the single agent name (linkedin_post, profile_analytics, post_analytics, email, or calender).
 """
     
@@ -48,8 +58,8 @@ Otherwise, respond with ONLY the single agent name (linkedin_post, profile_analy
     if choice not in valid_choices:
         # Fallback to keyword matching if LLM gives invalid response
         q = state["query"].lower()
-        # Check for compound requests first
-        if ("calender" in q or "event" in q) and ("email" in q or "mail" in q):
+        # Check for compound requests first: more than one kind of action mentioned
+        if sum(any(word in q for word in words) for words in ACTION_KEYWORDS.values()) > 1:
             choice = "compound"
         elif "linkedin post" in q or "create post" in q:
             choice = "linkedin_post"
@@ -67,6 +77,11 @@ Otherwise, respond with ONLY the single agent name (linkedin_post, profile_analy
         else:
             choice = "linkedin_post"  # default fallback
     
+    # A compound plan may contain a post; the planner discards the retrieval otherwise
+    if choice not in ("linkedin_post", "compound"):
+        discard("personal_context", state["query"])
+    if state.get("uploaded_file_path") and choice not in ("profile_analytics", "compound"):
+        discard("analytics", state["uploaded_file_path"])
     return {"route": choice}
 
 maingraph.add_node("router", router)
@@ -78,11 +93,13 @@ def linkedin_post_agent(state: AgentState) -> AgentState:
         "query": state["query"],
         "content": None,
         "approved": False,
-        "output": None
+        "output": None,
+        "variants": state.get("variants")
     }
-    content_comp = content_graph.compile()
-    output = content_comp.invoke(content_state, start_at="draft")
-    return {"output": output, "route": "content"}
+    # Pauses before publishing; /post_content resumes it by draft ID
+    output = content_app.invoke(content_state, thread_config(new_thread_id("content")))
+    return {"output": {"content": compact_content(output.get("content") or {})}, "route": "content"}
+
 
 # Profile Analytics Agent
 def profile_analytic_agent(state: AgentState) -> AgentState:
@@ -90,6 +107,10 @@ def profile_analytic_agent(state: AgentState) -> AgentState:
     file_path = state.get("uploaded_file_path")
     if not file_path:
         return {"output": {"success": False, "error": "No analytics file provided. Please upload your LinkedIn analytics Excel/CSV file."}, "route": "profile_analytics"}
+    # Let an in-flight background precompute cache the parsed sheets and metrics so they are
+    # reused; the router may already have queued it speculatively
+    claim("analytics", file_path)
+    wait_for_precompute(file_path)
     output = profile_analytics_agent(file_path, state["query"])
     return {"output": output, "route": "profile_analytics"}
 
@@ -112,80 +133,26 @@ def email_agent(state: AgentState) -> AgentState:
         "output": None
     }
     
-    # Compile and run the email graph starting from draft generation
-    email_comp = email_graph.compile()
-    result = email_comp.invoke(email_state, start_at="draft")
+    # Run the email graph; it pauses before sending and /send_email resumes it by draft ID
+    result = email_app.invoke(email_state, thread_config(new_thread_id("email")))
     
     # Return the draft for review (not automatically sending)
-    return {"output": {"draft": result["draft"], "status": "draft_generated"}, "route": "email"}
+    return {"output": {"draft": result["draft"], "draft_id": result["draft_id"], "status": "draft_generated"}, "route": "email"}
 
 def calender_agent(state: AgentState) -> AgentState:
     calender_event = {
         "query": state["query"],
         "output": None
     }
-    calender_comp = calender_graph.compile()
-    output = calender_comp.invoke(calender_event, start_at="generate_event")
-    return {"output": output, "route": "calender"}
+    # Pauses before creating the event; /create_event resumes it by draft ID
+    output = calender_app.invoke(calender_event, thread_config(new_thread_id("calender")))
+    return {"output": {"output": output["output"]}, "route": "calender"}
 
-# Compound Agent - handles multiple actions sequentially
+# Compound Agent - plans an action DAG and runs independent actions in parallel
 def compound_agent(state: AgentState) -> AgentState:
     """Handle compound requests like 'create calendar event and send email'"""
-    query = state["query"]
-    results = {}
-    
-    # Check if query involves calendar and email
-    q_lower = query.lower()
-    if ("calender" in q_lower or "event" in q_lower) and ("email" in q_lower or "mail" in q_lower):
-        # Step 1: Create calendar event
-        calender_event = {
-            "query": query,
-            "output": None
-        }
-        calender_comp = calender_graph.compile()
-        calendar_result = calender_comp.invoke(calender_event, start_at="generate_event")
-        results["calendar"] = calendar_result
-        
-        # Step 2: Generate and send email about the calendar event
-        # Extract event details for email context with proper null checks
-        output_data = calendar_result.get("output") if calendar_result else None
-        event_info = output_data.get("event", {}) if output_data else {}
-        
-        # Safely extract event details
-        summary = event_info.get('summary', 'New Event') if event_info else 'New Event'
-        start_info = event_info.get('start', {}) if event_info else {}
-        start_time = start_info.get('dateTime', 'TBD') if isinstance(start_info, dict) else 'TBD'
-        
-        email_query = f"Send an email about the calendar event: {summary} scheduled for {start_time}"
-        
-        email_state = {
-            "query": email_query,
-            "draft": None,
-            "approved": False,
-            "output": None
-        }
-        
-        # Generate email draft
-        email_comp = email_graph.compile()
-        email_draft_result = email_comp.invoke(email_state, start_at="draft")
-        
-        # Auto-approve and send the email with null checks
-        if email_draft_result and email_draft_result.get("draft"):
-            email_send_state = {
-                "query": email_query,
-                "draft": email_draft_result["draft"],
-                "approved": True,
-                "output": None
-            }
-            email_result = email_comp.invoke(email_send_state, start_at="send")
-            results["email"] = email_result
-        else:
-            results["email"] = {"output": {"success": False, "error": "Failed to generate email draft"}}
-        
-        return {"output": results, "route": "compound"}
-    
-    # Fallback for other compound requests
-    return {"output": {"error": "Compound request not recognized"}, "route": "compound"}
+    output = run_compound(state["query"], state.get("uploaded_file_path"))
+    return {"output": output, "route": "compound"}
 
 # Add nodes
 maingraph.add_node("linkedin_post", linkedin_post_agent)
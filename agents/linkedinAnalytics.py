@@ -1,10 +1,14 @@
 # tools_bundle.py
+import json
 import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from langchain.tools import tool, Tool
 from langchain.agents import create_tool_calling_agent, AgentExecutor, initialize_agent, AgentType
 from langchain.prompts import PromptTemplate
-from typing import Dict, Any
-import streamlit as st
+from typing import Dict, Any, List, Tuple
+from utils.memo import memoize
 
 from schemas import PostAnalysisInput, ProfileAnalysisInput, CreatePostInput
 from agents.linkedinContentGen import setup_llm
@@ -12,101 +16,188 @@ from tools.post_analyticsTool import get_linkedin_post
 from tools.profile_analyticsTools import (
     load_engagement, load_top_posts, load_overall_performance, load_demographics
 )
+from utils.analytics_fastpath import answer_fast
+from utils.analytics_sql import run_sql, schema_hint, sql_available
+from utils.columnar import Columns
+from utils.analytics_metrics import compute_metric_summary
+from utils.engagement_model import describe_score, score_post
+from utils.llm_usage import StageStats
 
 llm = setup_llm()
 
 # --- PROFILE ANALYSIS (as a tool) ---
 
+# Loaders the planner can pick from: name -> (function, description)
+PLAN_LOADERS = {
+    "metrics": (compute_metric_summary, "Compact metric summary: totals, rolling 7/28-day averages, week-over-week growth, day-of-week patterns, anomalies, top posts, audience"),
+    "engagement": (load_engagement, "Monthly engagements & impressions with month-over-month growth"),
+    "top_posts": (load_top_posts, "Top 10 posts with URLs, publish dates, engagements, impressions"),
+    "overall": (load_overall_performance, "Overall totals (impressions, members reached, followers)"),
+    "demographics": (load_demographics, "Audience demographics (job titles, industries, locations, seniority, companies)"),
+    "top_post_content": (None, "The scraped text of the best performing post (needed to analyze/critique that post)"),
+    "sql": (None, "Result of ONE read-only SQL query you write over the export tables (for ad-hoc filtering/grouping/ranking questions the other data can't answer directly)"),
+}
+
+URL_FIELDS = ["Post URL", "URL", "Link", "Post Link", "Post", "Activity URL", "url", "link", "post_url"]
+
+
+def _llm_text(response) -> str:
+    return response.content if hasattr(response, "content") else str(response)
+
+
+def _plan_loaders(file: str, question: str, stats: StageStats) -> Tuple[List[str], str]:
+    """Round trip 1: one cheap classification deciding which loaders the question needs (and the SQL, if any)"""
+    loaders = {name: description for name, (_, description) in PLAN_LOADERS.items() if name != "sql" or sql_available()}
+    options = "\n".join(f"- {name}: {description}" for name, description in loaders.items())
+    sql_hint = ""
+    if "sql" in loaders:
+        sql_hint = f"""
+
+If you include "sql", write the query on a new line starting with SQL: (DuckDB dialect, a single SELECT) using only these tables:
+{schema_hint(file)}"""
+    prompt = f"""Pick the data needed to answer a LinkedIn analytics question.
+
+Available data:
+{options}
+
+Question: "{question}"
+
+Respond with ONLY a JSON list of names, e.g. ["metrics", "top_posts"].{sql_hint}"""
+    sql = ""
+    try:
+        with stats.timed("plan"):
+            response = llm.invoke(prompt)
+        stats.record("plan", [prompt], [response])
+        text = _llm_text(response)
+        match = re.search(r"\[.*?\]", text, re.DOTALL)
+        plan = [name for name in json.loads(match.group(0)) if name in loaders] if match else []
+        sql_match = re.search(r"SQL:\s*(.+)", text, re.DOTALL | re.IGNORECASE)
+        # Anything after the first blank line is commentary, not SQL
+        sql = sql_match.group(1).strip().split("\n\n")[0] if sql_match else ""
+    except Exception as e:
+        print(f"DEBUG: Planner output unusable, using default plan: {e}")
+        plan = []
+    if "sql" in plan and not sql:
+        plan.remove("sql")
+    return plan or ["metrics"], sql
+
+
+def _top_post_content(file: str) -> Dict[str, Any]:
+    """Best performing post URL taken straight from the data (never guessed) plus its scraped text"""
+    top_posts = load_top_posts(file)
+    if not isinstance(top_posts, Columns) or not top_posts:
+        return {"error": "No top posts data available"}
+    first_post = top_posts[0]
+    url = next((str(first_post[f]).strip() for f in URL_FIELDS if first_post.get(f) and str(first_post[f]).strip()), "")
+    if not url.startswith("https://www.linkedin.com/"):
+        return {"error": f"No valid LinkedIn URL in top post: {url or list(first_post.keys())}"}
+    content = get_linkedin_post(url)
+    if "Error scraping post" in content:
+        return {"url": url, "error": content}
+    return {"url": url, "content": content}
+
+
+def _data_to_prompt(data: Dict[str, Any]) -> str:
+    """Tables as compact CSV, everything else as compact JSON"""
+    blocks = []
+    for name, value in data.items():
+        if isinstance(value, Columns):
+            blocks.append(f"{name} (CSV):\n{value}")
+        else:
+            blocks.append(f"{name} (JSON):\n{json.dumps(value, separators=(',', ':'), default=str)}")
+    return "\n\n".join(blocks)
+
+
+def _execute_plan(file: str, plan: List[str], sql: str = "") -> Dict[str, Any]:
+    """Run every planned loader in parallel; no LLM involved"""
+    special = {"top_post_content": _top_post_content, "sql": lambda f: run_sql(f, sql)}
+    jobs = {name: special.get(name) or PLAN_LOADERS[name][0] for name in plan}
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        futures = {name: pool.submit(job, file) for name, job in jobs.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
 @tool("ProfileAnalysis", args_schema=ProfileAnalysisInput,return_direct=True)
-@st.cache_data(ttl=3600) 
+@memoize(ttl=3600, should_cache=lambda result: result.get("success"))
 def profile_analytics_agent(file: str, question: str = "") -> Dict[str, Any]:
     """
     Analyze LinkedIn profile analytics from an Excel export and answer the user question.
-    Uses loader tools to read sheets and then reasons about them.
+    Plans which sheets to load, loads them in parallel, then reasons about them
+    in a single call (at most two LLM round trips per question).
     """
     try:
-        # expose sub-tools to an inner agent so it can choose what to load
-        subtools = [
-            Tool(
-                name="load_engagement_data",
-                func=lambda _: load_engagement(file),
-                description="Loads engagement metrics & computes monthly growth for engagements & impressions."
-            ),
-            Tool(
-                name="load_top_posts_data",
-                func=lambda _: load_top_posts(file),
-                description="Loads top posts data with URLs, impressions, engagements. Returns list of dictionaries with keys like 'URL', 'Post URL', 'Link', 'Impressions', 'Engagements'."
-            ),
-            Tool(
-                name="load_overall_performance",
-                func=lambda _: load_overall_performance(file),
-                description="Loads overall performance totals (impressions, reach, etc.)."
-            ),
-            Tool(
-                name="load_demographics",
-                func=lambda _: load_demographics(file),
-                description="Loads audience demographics."
-            ),
-            Tool(
-                name="GetLinkedInPost",
-                func=get_linkedin_post,
-                description="Given a LinkedIn post URL (like https://www.linkedin.com/feed/update/urn:li:activity:XXXXXXXXX), returns the post text content. NEVER use placeholder URLs."
-            ),
-        ]
+        fast_result = answer_fast(file, question)
+        if fast_result:
+            return fast_result
 
-        prompt = PromptTemplate.from_template(
-            """You are a LinkedIn profile analytics assistant.
+        question = question or "Give me a strategy from the analytics."
+        timings = {}
+        stats = StageStats()
 
-Use the provided tools to load ONLY the data you need. Then analyze and answer the user.
+        started = time.perf_counter()
+        plan, sql = _plan_loaders(file, question, stats)
+        timings["plan"] = round(time.perf_counter() - started, 3)
 
-CRITICAL URL EXTRACTION RULES:
-1. When user asks about "best performing post" or "analyze top post":
-   - FIRST call load_top_posts_data to get the top posts data
-   - The data is a list of dictionaries. Look at the column names printed in debug output
-   - Common URL field names: "URL", "Post URL", "Link", "Post Link", "Post", "Activity URL"
-   - Extract the COMPLETE URL string from the URL field of the first post
-   - The URL format should be: https://www.linkedin.com/feed/update/urn:li:activity:XXXXXXXXX
-   - NEVER EVER use placeholder URLs like "https://www.linkedin.com/posts/.../*post_url*"
-   - NEVER modify or truncate the URL - use it exactly as found in the data
-   - THEN call GetLinkedInPost with the complete extracted URL
-   - FINALLY analyze the scraped content
+        started = time.perf_counter()
+        data = _execute_plan(file, plan, sql)
+        timings["load"] = round(time.perf_counter() - started, 3)
 
-DEBUGGING STEPS:
-1. Check debug output for column names
-2. Look for URL-related columns in the first dictionary
-3. Print the exact URL value before using it
-4. Verify URL starts with "https://www.linkedin.com/feed/update/"
+        started = time.perf_counter()
+        prompt = f"""You are a LinkedIn profile analytics assistant.
 
-2. For general analytics:
-   - Load relevant sheets (engagement, top posts, overall performance, demographics)
-   - Summarize key trends and growth (MoM / weekly if present)
-   - Extract top 10 posts by impressions and engagement rate
+Answer the user's request using ONLY the data below. Refer to posts by the exact URLs given; never invent URLs or numbers.
 
-3. Always use GetLinkedInPost when you need actual post content from URLs
+If the best performing post's content is included, analyze it: engagement strengths, areas for improvement, hashtag and CTA quality, and 3 concrete edits.
+For general analytics, summarize key trends and growth, top posts by impressions and engagement rate, audience insights and a content strategy.
 
-User request:
-{input}
+Data:
+{_data_to_prompt(data)}
 
-{agent_scratchpad}
+User request:
+{question}
 """
-        )
-
-        agent = create_tool_calling_agent(llm, subtools, prompt=prompt)
-        exec_ = AgentExecutor(agent=agent, tools=subtools, verbose=True, handle_parsing_errors=True)
-        return exec_.invoke({"input": question or "Give me a strategy from the analytics."})
+        with stats.timed("analyze"):
+            response = llm.invoke(prompt)
+        stats.record("analyze", [prompt], [response])
+        output = _llm_text(response)
+        timings["analyze"] = round(time.perf_counter() - started, 3)
+
+        stage_stats = stats.as_dict()
+        round_trips = sum(stage["calls"] for stage in stage_stats.values())
+        print(f"DEBUG: Profile analytics plan={plan} timings={timings} llm_round_trips={round_trips}")
+        return {
+            "success": True,
+            "input": question,
+            "output": output,
+            "plan": plan,
+            "sql": sql if "sql" in plan else None,
+            "llm_round_trips": round_trips,
+            "stage_stats": stage_stats,
+            "timings": timings,
+        }
 
     except Exception as e:
         return {"success": False, "error": f"Profile analysis failed: {e}"}
 
 
 # --- POST ANALYSIS (as a tool, with nested mini-agent for scraping if URL) ---
-@st.cache_data(ttl=3600) 
+@memoize(ttl=3600, should_cache=lambda result: result.get("success"))
 def analyze_post_agent(content: str) -> Dict[str, Any]:
     """
     Analyze a LinkedIn post for engagement potential.
     Accepts raw text OR a LinkedIn post URL.
     """
     try:
+        # Score the text locally; a URL is fetched first so the model sees the post
+        engagement_score = None
+        text = content
+        if re.match(r"^\s*https?://", content or ""):
+            fetched = get_linkedin_post(content.strip())
+            text = None if fetched.startswith("Error scraping post") else fetched
+        if text:
+            engagement_score = score_post(text)
+            content = text
+
         # Subtool for fetching post text if a URL is given
         subtools = [
             Tool(
@@ -118,7 +209,7 @@ def analyze_post_agent(content: str) -> Dict[str, Any]:
 
         # Explicit prompt: reference ONLY tools that exist
         prompt = PromptTemplate(
-            input_variables=["input", "agent_scratchpad"],
+            input_variables=["input", "engagement_score", "agent_scratchpad"],
             template="""You are a LinkedIn content performance analyst.
 
 You can only use the following tools:
@@ -129,7 +220,7 @@ Your task:
 2. If {input} looks like a LinkedIn post URL, call **GetLinkedInPost** to fetch its text.
 
 For your analysis include:
-1) Engagement score (1-10) with a one-line reason
+1) Engagement score: {engagement_score}
 2) Key strengths (3-5 points)
 3) Areas for improvement (3-5 points)
 4) Expected reach potential (Low/Med/High) and why
@@ -147,8 +238,14 @@ End with a crisp 2-3 line summary strategy.
         exec_ = AgentExecutor(agent=agent, tools=subtools, verbose=True, handle_parsing_errors=True)
 
         # Run the agent
-        result = exec_.invoke({"input": content})
-        return {"success": True, "analysis": result}
+        result = exec_.invoke({
+            "input": content,
+            "engagement_score": (
+                f"{describe_score(engagement_score)} - keep this score and give a one-line reason"
+                if engagement_score else "(1-10) with a one-line reason"
+            ),
+        })
+        return {"success": True, "analysis": result, "engagement_score": engagement_score}
 
     except Exception as e:
         return {"success": False, "error": f"Post analysis failed: {e}"}
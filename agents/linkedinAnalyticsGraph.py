@@ -4,18 +4,31 @@ LangGraph implementation of LinkedIn Analytics workflow
 Provides better state management and clearer workflow visualization
 """
 
-from typing import Dict, Any, List, TypedDict
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, TypedDict, Annotated
 from langgraph.graph import StateGraph, END
 from langchain_core.messages import HumanMessage
 from langchain.tools import Tool
-import streamlit as st
 
 from schemas import ProfileAnalysisInput
 from agents.linkedinContentGen import setup_llm
 from tools.post_analyticsTool import get_linkedin_post
-from tools.profile_analyticsTools import (
-    load_engagement, load_top_posts, load_overall_performance, load_demographics
+from tools.profile_analyticsTools import load_top_posts
+from utils.analytics_metrics import compute_metric_summary, load_month_partitions, summary_to_prompt
+from utils.analytics_fastpath import answer_fast
+from utils.columnar import Columns
+from utils.llm_usage import StageStats, estimate_tokens
+from utils.analytics_store import ingest_export
+from utils.analytics_result_cache import (
+    GENERAL_REPORT_QUESTION, get_cached_result, is_general_report_request, put_cached_result
 )
+from utils.engagement_model import describe_score, score_post
+
+def _merge_sections(left: Dict[str, str], right: Dict[str, str]) -> Dict[str, str]:
+    """Reducer so parallel section branches can each add their own result"""
+    return {**(left or {}), **(right or {})}
 
 # State definition
 class AnalyticsState(TypedDict):
@@ -25,10 +38,60 @@ class AnalyticsState(TypedDict):
     loaded_data: Dict[str, Any]
     extracted_url: str
     scraped_content: str
+    section_results: Annotated[Dict[str, str], _merge_sections]
+    partition_summaries: List[str]
+    stage_stats: Dict[str, Dict[str, Any]]
+    engagement_score: Dict[str, Any]
     analysis_result: str
     error: str
 
+# General analytics is split into independent sections analyzed in parallel:
+# section -> (report heading, metric summary keys it needs, what to cover)
+ANALYSIS_SECTIONS = {
+    "trends": (
+        "Performance Trends",
+        ["period", "totals", "rolling", "recent_weeks", "day_of_week", "best_day_of_week", "anomalies", "series"],
+        "1. Key performance trends (growth, rolling averages, week-over-week)\n2. Notable spikes/drops and what they suggest\n3. Best days to be active",
+    ),
+    "content": (
+        "Content Performance",
+        ["posts", "totals"],
+        "1. Top performing content patterns\n2. Engagement rate vs reach of the top posts\n3. Content strategy recommendations",
+    ),
+    "audience": (
+        "Audience Insights",
+        ["audience", "followers"],
+        "1. Who the audience is (roles, industries, locations, seniority)\n2. Audience engagement insights\n3. Growth opportunities to reach more of the right people",
+    ),
+}
+
+# Map-reduce mode: months are summarized in parallel (at most MAP_CONCURRENCY
+# LLM calls at once) and the summaries are reduced into one report, in
+# several rounds if they don't fit in REDUCE_TOKEN_BUDGET
+MAP_CONCURRENCY = int(os.getenv("ANALYTICS_MAP_CONCURRENCY", 4))
+REDUCE_TOKEN_BUDGET = int(os.getenv("ANALYTICS_REDUCE_TOKEN_BUDGET", 4000))
+MAP_REDUCE_PHRASES = [
+    "month by month", "month-by-month", "monthly breakdown", "each month", "every month", "per month",
+    "detailed report", "full report", "in depth", "in-depth", "whole history",
+]
+
+def classify_query(query: str) -> str:
+    """Route a question to post_analysis, map_reduce or general_analytics"""
+    query = query.lower()
+    if any(phrase in query for phrase in ["analyze best", "analyze top post", "analyze post", "top post content", "url", "top post","performing post", "best performing post" ]):
+        return "post_analysis"
+    if any(phrase in query for phrase in MAP_REDUCE_PHRASES):
+        return "map_reduce"
+    return "general_analytics"
+
 class LinkedInAnalyticsGraph:
+    """
+    Analytics engine holding the LLM and the compiled workflow.
+
+    Nodes never write to ``self``; all per-request data lives in
+    ``AnalyticsState``, so one instance can serve concurrent requests
+    (see ``get_analytics_graph``).
+    """
     def __init__(self):
         self.llm = setup_llm()
         self.graph = self._build_graph()
@@ -43,6 +106,11 @@ class LinkedInAnalyticsGraph:
         workflow.add_node("extract_url", self._extract_url_node)
         workflow.add_node("scrape_content", self._scrape_content_node)
         workflow.add_node("analyze", self._analyze_node)
+        workflow.add_node("analyze_trends", self._analyze_trends_node)
+        workflow.add_node("analyze_content", self._analyze_content_node)
+        workflow.add_node("analyze_audience", self._analyze_audience_node)
+        workflow.add_node("map_months", self._map_months_node)
+        workflow.add_node("reduce_report", self._reduce_report_node)
         workflow.add_node("format_response", self._format_response_node)
         
         # Define edges
@@ -54,6 +122,7 @@ class LinkedInAnalyticsGraph:
             {
                 "post_analysis": "load_data",
                 "general_analytics": "load_data",
+                "map_reduce": "load_data",
                 "error": END
             }
         )
@@ -63,7 +132,10 @@ class LinkedInAnalyticsGraph:
             self._data_loaded_decision,
             {
                 "extract_url": "extract_url",
-                "analyze": "analyze",
+                "map_months": "map_months",
+                "analyze_trends": "analyze_trends",
+                "analyze_content": "analyze_content",
+                "analyze_audience": "analyze_audience",
                 "error": END
             }
         )
@@ -71,22 +143,20 @@ class LinkedInAnalyticsGraph:
         workflow.add_edge("extract_url", "scrape_content")
         workflow.add_edge("scrape_content", "analyze")
         workflow.add_edge("analyze", "format_response")
+        workflow.add_edge("map_months", "reduce_report")
+        workflow.add_edge("reduce_report", "format_response")
+        # Section branches run in the same superstep; format_response waits for all
+        for section in ANALYSIS_SECTIONS:
+            workflow.add_edge(f"analyze_{section}", "format_response")
         workflow.add_edge("format_response", END)
         
         return workflow.compile()
     
     def _router_node(self, state: AnalyticsState) -> AnalyticsState:
         """Determine the type of analysis needed"""
-        query = state["user_query"].lower()
-        
-        if any(phrase in query for phrase in ["analyze best", "analyze top post", "analyze post", "top post content", "url", "top post","performing post", "best performing post" ]):
-            analysis_type = "post_analysis"
-        else:
-            analysis_type = "general_analytics"
-        
         return {
             **state,
-            "analysis_type": analysis_type
+            "analysis_type": classify_query(state["user_query"])
         }
     
     def _load_data_node(self, state: AnalyticsState) -> AnalyticsState:
@@ -94,24 +164,34 @@ class LinkedInAnalyticsGraph:
         try:
             file_path = state["file_path"]
             analysis_type = state["analysis_type"]
-            loaded_data = {}
             
             print(f"DEBUG: Loading data from file: {file_path}")
             print(f"DEBUG: Analysis type: {analysis_type}")
-            
+
             if analysis_type == "post_analysis":
                 # Load top posts data for post analysis
-                top_posts_data = load_top_posts(file_path)
-                loaded_data["top_posts"] = top_posts_data
+                loaders = {"top_posts": load_top_posts}
+            elif analysis_type == "map_reduce":
+                loaders = {"metrics": compute_metric_summary, "months": load_month_partitions}
+            else:
+                # Every section branch reads only the compact metric summary
+                loaders = {"metrics": compute_metric_summary}
+
+            # Sheets are loaded concurrently (the workbook itself is parsed once)
+            # while this upload is merged into the cross-export store
+            with ThreadPoolExecutor(max_workers=len(loaders) + 1) as pool:
+                ingest_future = pool.submit(ingest_export, file_path)
+                futures = {name: pool.submit(loader, file_path) for name, loader in loaders.items()}
+                loaded_data = {name: future.result() for name, future in futures.items()}
+                try:
+                    ingest_future.result()
+                except Exception as e:
+                    print(f"DEBUG: Could not ingest export into analytics store: {e}")
+
+            if analysis_type == "post_analysis":
+                top_posts_data = loaded_data["top_posts"]
                 print(f"DEBUG: Loaded top posts data type: {type(top_posts_data)}")
-                print(f"DEBUG: Loaded top posts data: {top_posts_data[:1] if isinstance(top_posts_data, list) else top_posts_data}")
-                
-            elif analysis_type == "general_analytics":
-                # Load all relevant data for general analytics
-                loaded_data["engagement"] = load_engagement(file_path)
-                loaded_data["top_posts"] = load_top_posts(file_path)
-                loaded_data["overall"] = load_overall_performance(file_path)
-                loaded_data["demographics"] = load_demographics(file_path)
+                print(f"DEBUG: Loaded top posts data: {top_posts_data[0] if isinstance(top_posts_data, Columns) and top_posts_data else top_posts_data}")
             
             return {
                 **state,
@@ -130,7 +210,7 @@ class LinkedInAnalyticsGraph:
         try:
             top_posts_data = state["loaded_data"].get("top_posts", [])
             print(f"DEBUG: URL extraction - top_posts_data type: {type(top_posts_data)}")
-            print(f"DEBUG: URL extraction - top_posts_data: {top_posts_data}")
+            print(f"DEBUG: URL extraction - top_posts_data: {top_posts_data!r}")
             
             if not top_posts_data or (isinstance(top_posts_data, dict) and "error" in top_posts_data):
                 print(f"DEBUG: No valid top posts data for URL extraction")
@@ -140,7 +220,7 @@ class LinkedInAnalyticsGraph:
                 }
             
             # Get the first (best performing) post
-            first_post = top_posts_data[0] if isinstance(top_posts_data, list) and len(top_posts_data) > 0 else {}
+            first_post = top_posts_data[0] if isinstance(top_posts_data, Columns) and len(top_posts_data) > 0 else {}
             print(f"DEBUG: First post data keys: {list(first_post.keys()) if first_post else 'No keys'}")
             print(f"DEBUG: First post data: {first_post}")
             
@@ -209,25 +289,25 @@ class LinkedInAnalyticsGraph:
             }
     
     def _analyze_node(self, state: AnalyticsState) -> AnalyticsState:
-        """Perform analysis based on the loaded data and scraped content"""
+        """Analyze the scraped content of the best performing post"""
         try:
-            analysis_type = state["analysis_type"]
+            content = state.get("scraped_content", "")
+            if not content:
+                return {
+                    **state,
+                    "error": "No content available for analysis"
+                }
             
-            if analysis_type == "post_analysis":
-                # Analyze the scraped post content
-                content = state.get("scraped_content", "")
-                if not content:
-                    return {
-                        **state,
-                        "error": "No content available for analysis"
-                    }
-                
-                prompt = f"""Analyze this LinkedIn post for engagement potential:
+            # Scored locally; the LLM only explains the score
+            engagement_score = score_post(content)
+            prompt = f"""Analyze this LinkedIn post for engagement potential:
 
 Content: {content}
 
+Engagement score: {describe_score(engagement_score)}
+
 Provide analysis including:
-1. Engagement score (1-10) with reasoning
+1. The engagement score above (keep it as given) with reasoning
 2. Key strengths (3-5 points)
 3. Areas for improvement (3-5 points)
 4. Expected reach potential (Low/Med/High) and why
@@ -235,21 +315,6 @@ Provide analysis including:
 6. CTA quality
 7. 3 concrete edits to boost engagement
 8. 2-3 line summary strategy
-"""
-                
-            else:
-                # General analytics analysis
-                loaded_data = state["loaded_data"]
-                prompt = f"""Analyze this LinkedIn profile analytics data:
-
-Data: {loaded_data}
-
-Provide insights including:
-1. Key performance trends
-2. Top performing content patterns
-3. Audience engagement insights
-4. Growth opportunities
-5. Content strategy recommendations
 """
             
             response = self.llm.invoke(prompt)
@@ -257,6 +322,7 @@ Provide insights including:
             
             return {
                 **state,
+                "engagement_score": engagement_score,
                 "analysis_result": analysis_result
             }
             
@@ -265,12 +331,134 @@ Provide insights including:
                 **state,
                 "error": f"Failed to analyze: {str(e)}"
             }
+
+    def _analyze_section(self, section: str, state: AnalyticsState) -> Dict[str, Any]:
+        """
+        Analyze one section of the general report from the compact metric summary.
+        Runs as a parallel branch, so it only returns its own section result.
+        """
+        heading, keys, instructions = ANALYSIS_SECTIONS[section]
+        try:
+            metrics = state["loaded_data"].get("metrics", {})
+            section_metrics = {key: metrics[key] for key in keys if key in metrics}
+            prompt = f"""Analyze the {heading.lower()} part of this LinkedIn profile analytics data.
+
+User question: {state["user_query"] or "Give me a strategy from the analytics."}
+
+Metric summary (JSON): {summary_to_prompt(section_metrics)}
+
+Provide concise insights including:
+{instructions}
+"""
+            response = self.llm.invoke(prompt)
+            result = response.content if hasattr(response, 'content') else str(response)
+        except Exception as e:
+            print(f"DEBUG: Section '{section}' analysis failed: {e}")
+            result = f"_This section could not be generated: {str(e)}_"
+        return {"section_results": {section: result}}
+
+    def _analyze_trends_node(self, state: AnalyticsState) -> Dict[str, Any]:
+        return self._analyze_section("trends", state)
+
+    def _analyze_content_node(self, state: AnalyticsState) -> Dict[str, Any]:
+        return self._analyze_section("content", state)
+
+    def _analyze_audience_node(self, state: AnalyticsState) -> Dict[str, Any]:
+        return self._analyze_section("audience", state)
     
+    def _batch(self, stage: str, prompts: List[str], stats: StageStats) -> List[str]:
+        """Run prompts concurrently (bounded by MAP_CONCURRENCY), recording tokens/latency under ``stage``"""
+        with stats.timed(stage):
+            responses = self.llm.batch(prompts, config={"max_concurrency": MAP_CONCURRENCY})
+        stats.record(stage, prompts, responses)
+        return [response.content if hasattr(response, 'content') else str(response) for response in responses]
+
+    def _map_months_node(self, state: AnalyticsState) -> Dict[str, Any]:
+        """Map: summarize every month of the export independently"""
+        try:
+            partitions = state["loaded_data"].get("months") or []
+            if not partitions:
+                return {"error": "No engagement data available for a month-by-month analysis"}
+            prompts = []
+            for i, partition in enumerate(partitions):
+                previous = partitions[i - 1]["totals"] if i else None
+                prompts.append(f"""Summarize {partition["month"]} of this LinkedIn account's performance in at most 120 words.
+Use exact numbers from the data. Cover totals and engagement rate, the change vs the previous month, the best and worst days, and the standout posts (by URL).
+
+Totals (JSON): {summary_to_prompt(partition["totals"])}
+Previous month totals (JSON): {summary_to_prompt(previous)}
+
+Daily (CSV):
+{partition["daily"]}
+
+Posts published this month (CSV):
+{partition["posts"] if len(partition["posts"]) else "none"}
+""")
+            stats = StageStats()
+            summaries = self._batch("map", prompts, stats)
+            summaries = [f"### {partition['month']}\n{summary}" for partition, summary in zip(partitions, summaries)]
+            print(f"DEBUG: Map stage summarized {len(summaries)} months")
+            return {"partition_summaries": summaries, "stage_stats": stats.as_dict()}
+        except Exception as e:
+            return {"error": f"Failed to summarize months: {str(e)}"}
+
+    def _reduce_report_node(self, state: AnalyticsState) -> Dict[str, Any]:
+        """Reduce: merge the monthly summaries (hierarchically if needed) into one report"""
+        if state.get("error"):
+            return {}
+        try:
+            stats = StageStats()
+            summaries = list(state.get("partition_summaries") or [])
+            level = 1
+            while len(summaries) > 1 and estimate_tokens("\n\n".join(summaries)) > REDUCE_TOKEN_BUDGET:
+                # Pack consecutive summaries into groups of about half the budget
+                groups, current = [], []
+                for summary in summaries:
+                    if current and estimate_tokens("\n\n".join(current + [summary])) > REDUCE_TOKEN_BUDGET // 2:
+                        groups.append(current)
+                        current = []
+                    current.append(summary)
+                groups.append(current)
+                if len(groups) == len(summaries):
+                    break
+                prompts = [
+                    "Condense these consecutive monthly LinkedIn summaries into one summary of the period "
+                    "(at most 200 words). Keep exact numbers, the trend and standout posts.\n\n" + "\n\n".join(group)
+                    for group in groups
+                ]
+                summaries = self._batch(f"reduce_{level}", prompts, stats)
+                level += 1
+
+            prompt = f"""Write a LinkedIn analytics report from these period summaries and the overall metrics.
+
+User question: {state["user_query"] or "Give me a strategy from the analytics."}
+
+Overall metrics (JSON): {summary_to_prompt(state["loaded_data"].get("metrics", {}))}
+
+Period summaries:
+{chr(10).join(summaries)}
+
+Structure the report with these sections: Overview, Month-by-Month Highlights, Trends, Content Performance, Audience, Strategy (5 concrete recommendations).
+Use exact numbers from the data; never invent URLs or figures.
+"""
+            report = self._batch("reduce", [prompt], stats)[0]
+            return {
+                "analysis_result": report,
+                "stage_stats": {**(state.get("stage_stats") or {}), **stats.as_dict()},
+            }
+        except Exception as e:
+            return {"error": f"Failed to reduce monthly summaries: {str(e)}"}
+
     def _format_response_node(self, state: AnalyticsState) -> AnalyticsState:
         """Format the final response"""
         analysis_result = state.get("analysis_result", "")
         
-        if state["analysis_type"] == "post_analysis":
+        if state["analysis_type"] == "map_reduce":
+            formatted_response = f"""# LinkedIn Analytics Report (month by month)
+
+{analysis_result}
+"""
+        elif state["analysis_type"] == "post_analysis":
             url = state.get("extracted_url", "")
             formatted_response = f"""# LinkedIn Post Analysis
 
@@ -280,9 +468,15 @@ Provide insights including:
 {analysis_result}
 """
         else:
+            sections = state.get("section_results") or {}
+            body = "\n\n".join(
+                f"## {heading}\n\n{sections[section]}"
+                for section, (heading, _, _) in ANALYSIS_SECTIONS.items()
+                if section in sections
+            )
             formatted_response = f"""# LinkedIn Analytics Report
 
-{analysis_result}
+{body}
 """
         
         return {
@@ -296,19 +490,37 @@ Provide insights including:
             return "error"
         return state.get("analysis_type", "general_analytics")
     
-    def _data_loaded_decision(self, state: AnalyticsState) -> str:
+    def _data_loaded_decision(self, state: AnalyticsState):
         """Decide next step after loading data"""
         if state.get("error"):
             return "error"
         
         if state["analysis_type"] == "post_analysis":
             return "extract_url"
+        elif state["analysis_type"] == "map_reduce":
+            return "map_months"
         else:
-            return "analyze"
+            # Fan out: one branch per report section
+            return [f"analyze_{section}" for section in ANALYSIS_SECTIONS]
     
-    def analyze(self, file_path: str, query: str) -> Dict[str, Any]:
+    def analyze(self, file_path: str, query: str, narrate: bool = False) -> Dict[str, Any]:
         """Run the analytics workflow"""
         try:
+            # Single sort/aggregation questions are answered without the LLM
+            fast_result = answer_fast(file_path, query, narrate=narrate, llm=self.llm)
+            if fast_result:
+                return fast_result
+
+            # Same question about the same export content -> reuse the stored report
+            analysis_type = classify_query(query)
+            cached = get_cached_result(file_path, analysis_type, query)
+            if not cached and analysis_type == "general_analytics" and is_general_report_request(query):
+                # The report pre-generated on upload, only when that report is what was asked for
+                cached = get_cached_result(file_path, analysis_type, GENERAL_REPORT_QUESTION)
+            if cached:
+                print(f"DEBUG: Serving cached {analysis_type} result")
+                return {**cached, "cached": True}
+
             initial_state = AnalyticsState(
                 user_query=query,
                 file_path=file_path,
@@ -316,6 +528,10 @@ Provide insights including:
                 loaded_data={},
                 extracted_url="",
                 scraped_content="",
+                section_results={},
+                partition_summaries=[],
+                stage_stats={},
+                engagement_score={},
                 analysis_result="",
                 error=""
             )
@@ -323,23 +539,40 @@ Provide insights including:
             if result.get("error"):
                 return {"success": False, "error": result["error"]}
             
-            return {
+            output = {
                 "success": True,
                 "analysis": result["analysis_result"],
                 "analysis_type": result["analysis_type"]
             }
+            if result.get("stage_stats"):
+                output["stage_stats"] = result["stage_stats"]
+            if result.get("engagement_score"):
+                output["engagement_score"] = result["engagement_score"]
+            put_cached_result(file_path, result["analysis_type"], query, output)
+            return output
             
         except Exception as e:
             return {"success": False, "error": f"Workflow failed: {str(e)}"}
 
-# Tool wrapper for compatibility
-@st.cache_data(ttl=3600)
-def profile_analytics_agent(file: str, question: str = "") -> Dict[str, Any]:
+_analytics_graph = None
+_analytics_graph_lock = threading.Lock()
+
+def get_analytics_graph() -> LinkedInAnalyticsGraph:
+    """Process-wide analytics engine; the StateGraph is compiled only once"""
+    global _analytics_graph
+    if _analytics_graph is None:
+        with _analytics_graph_lock:
+            if _analytics_graph is None:
+                _analytics_graph = LinkedInAnalyticsGraph()
+    return _analytics_graph
+
+# Tool wrapper for compatibility. Not memoized: results are reused through the
+# disk result cache, which also notices when a newer export supersedes them
+def profile_analytics_agent(file: str, question: str = "", narrate: bool = False) -> Dict[str, Any]:
     """
     LangGraph-based LinkedIn profile analytics agent
     """
     try:
-        graph_agent = LinkedInAnalyticsGraph()
-        return graph_agent.analyze(file, question)
+        return get_analytics_graph().analyze(file, question, narrate=narrate)
     except Exception as e:
         return {"success": False, "error": f"Graph analysis failed: {e}"}
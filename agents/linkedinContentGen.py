@@ -5,8 +5,10 @@ with LinkedIn automation for personalized content generation using LLM
 """
 import streamlit as st
 from utils.personal_info import PersonalInfo
+from utils.engagement_model import rank_posts, score_post
+from utils.speculation import claim
 from automation.linkedin_content_automation import LinkedInContentAutomation
-from langchain_groq import ChatGroq
+from utils.llm_scheduler import ScheduledChatGroq
 from langchain.prompts import PromptTemplate
 from langchain.docstore.document import Document
 
@@ -26,11 +28,13 @@ def setup_llm():
             if not api_key:
                 raise ValueError("GROQ_API_KEY not found in environment variables")
             
-            _LLM_INSTANCE = ChatGroq(
+            # Every call is admitted by the shared RPM/TPM scheduler, which also owns retries
+            _LLM_INSTANCE = ScheduledChatGroq(
                 model="llama3-8b-8192",
                 temperature=0.7,
                 max_tokens=3000,
                 api_key=api_key,
+                max_retries=0,
             )
             print("✅ LLM setup successful")
         except Exception as e:
@@ -46,9 +50,38 @@ class MockLLM:
             content = "Error: Unable to connect to LLM service. Please check your internet connection and API key."
         return MockResponse()
 
+    def batch(self, prompts, config=None):
+        return [self.invoke(prompt) for prompt in prompts]
+
 # Global LLM instance
 llm = setup_llm()
 
+# Opening angle per draft variant, so batched generations differ from each other
+VARIANT_ANGLES = [
+    "",
+    "Angle for this version: open with a concrete number or result.",
+    "Angle for this version: open with a short personal story.",
+    "Angle for this version: open with a bold, contrarian statement.",
+    "Angle for this version: open with a question to the reader.",
+]
+DEFAULT_VARIANTS = 3
+DUPLICATE_SIMILARITY = 0.7
+
+def _shingles(text: str) -> set:
+    words = text.lower().split()
+    return {" ".join(words[i:i + 3]) for i in range(max(len(words) - 2, 1))}
+
+def dedupe_drafts(drafts: list, threshold: float = DUPLICATE_SIMILARITY) -> list:
+    """Drop drafts whose word-trigram Jaccard similarity to an earlier draft reaches the threshold"""
+    kept, kept_shingles = [], []
+    for draft in drafts:
+        shingles = _shingles(draft)
+        if any(len(shingles & other) / max(len(shingles | other), 1) >= threshold for other in kept_shingles):
+            continue
+        kept.append(draft)
+        kept_shingles.append(shingles)
+    return kept
+
 class PersonalizedLinkedInContentAgent:
     """
     Combines Personal Information Agent with LinkedIn automation
@@ -97,27 +130,13 @@ class PersonalizedLinkedInContentAgent:
             Dictionary containing personalized content and metadata
         """
         try:
-            # Get relevant personal information
-            relevant_info = self.personal_agent.search_personal_info(topic)
-            
+            relevant_info, writing_style = self._retrieve_context(topic)
             if not relevant_info:
                 return {
                     "success": False,
                     "error": f"No relevant information found for topic: {topic}"
                 }
             
-            # Get writing style guidance
-            writing_style = self.personal_agent.personal_profile.get("writing_style_notes", "Professional and engaging")
-            
-            # Check if context is too long and use concise version if needed
-            context_length = sum(len(info.page_content) for info in relevant_info)
-            if context_length > 3000:  # If context is too long
-                print(f"⚠️ Context too long ({context_length} chars). Using concise version...")
-                relevant_info = [Document(
-                    page_content=self._get_concise_personal_context(topic),
-                    metadata={"type": "concise_context"}
-                )]
-            
             # Generate personalized content using LLM
             content = self._generate_llm_post(topic, relevant_info, writing_style)
             
@@ -126,7 +145,8 @@ class PersonalizedLinkedInContentAgent:
                 "content": content,
                 "topic": topic,
                 "personal_context": len(relevant_info),
-                "writing_style_applied": True
+                "writing_style_applied": True,
+                "engagement_score": score_post(content)
             }
             
         except Exception as e:
@@ -135,6 +155,107 @@ class PersonalizedLinkedInContentAgent:
                 "error": f"Error generating personalized content: {e}"
             }
     
+    def generate_content_variants(self, topic: str, n: int = DEFAULT_VARIANTS) -> dict:
+        """
+        Generate up to ``n`` alternative posts from a single retrieval.
+
+        The generations run concurrently in one ``batch`` call, each with a
+        different opening angle; near-identical drafts are dropped and the rest
+        are ranked best first by the local engagement model.
+        """
+        try:
+            n = max(1, min(n, len(VARIANT_ANGLES)))
+            relevant_info, writing_style = self._retrieve_context(topic)
+            if not relevant_info:
+                return {
+                    "success": False,
+                    "error": f"No relevant information found for topic: {topic}"
+                }
+
+            inputs = self._post_inputs(topic, relevant_info, writing_style)
+            try:
+                chain = self._post_template() | self.llm
+                responses = chain.batch(
+                    [{**inputs, "angle": angle} for angle in VARIANT_ANGLES[:n]],
+                    config={"max_concurrency": n},
+                )
+                drafts = [self._clean_generated(response.content) for response in responses]
+            except Exception as e:
+                print(f"Batched variant generation failed: {e}. Generating a single post.")
+                drafts = [self._generate_llm_post(topic, relevant_info, writing_style)]
+
+            unique = dedupe_drafts([draft for draft in drafts if draft])
+            ranked = rank_posts(unique)
+            if not ranked:
+                return {"success": False, "error": "No drafts were generated"}
+            best = ranked[0]
+            return {
+                "success": True,
+                "content": best["text"],
+                "variants": ranked,
+                "duplicates_removed": len(drafts) - len(unique),
+                "topic": topic,
+                "personal_context": len(relevant_info),
+                "writing_style_applied": True,
+                "engagement_score": {k: v for k, v in best.items() if k != "text"}
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Error generating content variants: {e}"
+            }
+
+    def revise_post(self, draft: str, instruction: str) -> str:
+        """
+        Apply one edit instruction ("make it shorter", "change the hook") to an
+        existing draft. Only the draft and the instruction are sent to the LLM.
+        """
+        revise_template = PromptTemplate(
+            input_variables=["draft", "instruction"],
+            template="""You are editing an existing LinkedIn post. Apply the instruction below and keep everything else as it is.
+
+Instruction: {instruction}
+
+Post:
+{draft}
+
+Rules:
+- Change only what the instruction asks for
+- Keep the author's voice, facts and hashtags unless the instruction says otherwise
+- Never use emoji!!
+- Return only the revised post, without any preamble
+
+Revised post:"""
+        )
+        response = self.llm.invoke(revise_template.format(draft=draft, instruction=instruction))
+        revised = self._clean_generated(response.content if hasattr(response, "content") else str(response))
+        if not revised or revised.startswith("Error:"):
+            raise RuntimeError(revised or "Empty revision")
+        return revised
+
+    def _retrieve_context(self, topic: str) -> tuple:
+        """Relevant personal information (concise when too long) and writing style for a topic"""
+        # Retrieval may already have been started speculatively while the query was routed
+        prefetched, relevant_info = claim("personal_context", topic)
+        if not prefetched:
+            relevant_info = self.personal_agent.search_personal_info(topic)
+        if not relevant_info:
+            return None, None
+        
+        # Get writing style guidance
+        writing_style = self.personal_agent.personal_profile.get("writing_style_notes", "Professional and engaging")
+        
+        # Check if context is too long and use concise version if needed
+        context_length = sum(len(info.page_content) for info in relevant_info)
+        if context_length > 3000:  # If context is too long
+            print(f"⚠️ Context too long ({context_length} chars). Using concise version...")
+            relevant_info = [Document(
+                page_content=self._get_concise_personal_context(topic),
+                metadata={"type": "concise_context"}
+            )]
+        return relevant_info, writing_style
+
     def _truncate_context(self, context_info: str, max_chars: int = 1500) -> str:
         """Truncate context to prevent token limit exceeded errors"""
         if len(context_info) <= max_chars:
@@ -145,9 +266,8 @@ class PersonalizedLinkedInContentAgent:
         print(f"⚠️ Context truncated from {len(context_info)} to {len(truncated)} characters to prevent token limit exceeded")
         return truncated
 
-    def _generate_llm_post(self, topic: str, relevant_info: list, writing_style: str) -> str:
-        """Generate LinkedIn post content using LLM with PromptTemplate"""
-        
+    def _post_inputs(self, topic: str, relevant_info: list, writing_style: str) -> dict:
+        """Prompt variables for a post: truncated personal context and writing style"""
         # Create context from relevant personal information
         context_info = "\n".join([info.page_content for info in relevant_info])
         
@@ -156,11 +276,12 @@ class PersonalizedLinkedInContentAgent:
         
         # Truncate writing style if too long
         writing_style = self._truncate_context(writing_style, max_chars=500)
-        
-        # Define post type specific prompt templates
-        post_template = PromptTemplate(
-                input_variables=["topic", "context_info", "writing_style"],
-                template="""You are a professional LinkedIn content creator. Create an engaging LinkedIn post about {topic}.
+        return {"topic": topic, "context_info": context_info, "writing_style": writing_style, "angle": ""}
+
+    def _post_template(self) -> PromptTemplate:
+        return PromptTemplate(
+            input_variables=["topic", "context_info", "writing_style", "angle"],
+            template="""You are a professional LinkedIn content creator. Create an engaging LinkedIn post about {topic}.
 
 You have to idenify the post_type based on the topic .. it could be either these 
 [acheivements, insights, question, story, general]
@@ -183,22 +304,32 @@ Requirements:
 - Make it sound like a real person sharing their experience with a touch of humor
 - Don't miss to ask the Follow-up or P.S. relevant to the topic (Don't write like : **Follow-up** but can write **P.S.**) just keep it engaging
 - Don't write like `Here's is the linkedin post for you` just start the content about topic
+{angle}
 Generate a compelling LinkedIn post:
 """
-            ),
+        )
+
+    @staticmethod
+    def _clean_generated(generated_content: str) -> str:
+        generated_content = generated_content.strip()
+        # Clean up the response if needed
+        if generated_content.startswith("```"):
+            generated_content = generated_content.split("```")[1]
+        if generated_content.endswith("```"):
+            generated_content = generated_content.rsplit("```", 1)[0]
+        return generated_content
+
+    def _generate_llm_post(self, topic: str, relevant_info: list, writing_style: str) -> str:
+        """Generate LinkedIn post content using LLM with PromptTemplate"""
+        inputs = self._post_inputs(topic, relevant_info, writing_style)
+        post_template = self._post_template()
         
         try:
             
             chain = post_template | self.llm 
             # Generate content using LLM
-            response = chain.invoke({"topic": topic, "context_info": context_info, "writing_style": writing_style})
-            generated_content = response.content.strip()
-            
-            # Clean up the response if needed
-            if generated_content.startswith("```"):
-                generated_content = generated_content.split("```")[1]
-            if generated_content.endswith("```"):
-                generated_content = generated_content.rsplit("```", 1)[0]
+            response = chain.invoke(inputs)
+            generated_content = self._clean_generated(response.content)
             print(f"Generated content: {generated_content}")
             return generated_content
             
@@ -2,18 +2,38 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from langchain_google_community.calendar.create_event import CalendarCreateEvent
-from automation.linkedin_content_automation import LinkedInContentAutomation
 from agents.graphagent import maingraph
-from agents.email_graph import graph
-from typing import Optional
-from fastapi import Form
-import streamlit as st
+from agents.email_graph import email_app
+from agents.calender_graph import calender_app
+from utils.memo import cache_stats
+from utils.analytics_result_cache import result_cache_stats
+from utils.speculation import speculation_stats
+from utils.llm_scheduler import llm_scheduler_stats
+from utils.analytics_precompute import UploadWatcher, enqueue_precompute, precompute_status
+from utils.uploads import UploadWriter, resolve_file_id
+from utils.columnar import to_jsonable
+from utils.analytics_metrics import load_engagement_series
+from utils.downsample import SERIES_POINTS
+from utils.engagement_model import rank_posts, score_post
+from utils.draft_store import add_version, draft_history, edit_draft, get_draft, record_action
+from agents.content_graph import content_agent, content_app
+from utils.checkpoints import resume_thread, thread_config
+from typing import Any, Dict, List, Optional
 from fastapi import Request
+import threading
 # Data model matching frontend's request
 class QueryRequest(BaseModel):
     query: str
     file_path: Optional[str] = None  # Optional path to uploaded file
+    file_id: Optional[str] = None  # ID returned by /upload (preferred over file_path)
+    variants: Optional[int] = None  # Alternative LinkedIn post drafts to generate and rank
+
+class ReviseRequest(BaseModel):
+    draft_id: str
+    instruction: str  # e.g. "make it shorter", "change the hook"
+
+class ScoreRequest(BaseModel):
+    texts: List[str]  # Post drafts to score, returned best first
 
 app = FastAPI(
     title="Personal Content Agent WhatsApp Bot",
@@ -30,22 +50,55 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+upload_watcher = UploadWatcher()
+
+
+@app.on_event("startup")
+def start_upload_watcher():
+    # Precompute analytics for exports as soon as they land in the upload dir
+    upload_watcher.start()
+
+
+@app.on_event("shutdown")
+def stop_upload_watcher():
+    upload_watcher.stop()
+
+@app.post("/upload")
+async def upload_file(request: Request, filename: str):
+    # Stream the raw request body to disk instead of buffering it in memory
+    try:
+        writer = UploadWriter(filename)
+    except ValueError as e:
+        return {"success": False, "error": str(e)}
+    try:
+        async for chunk in request.stream():
+            if chunk:
+                writer.write(chunk)
+        result = writer.finish()
+    except Exception as e:
+        writer.abort()
+        return {"success": False, "error": str(e)}
+    enqueue_precompute(resolve_file_id(result["file_id"]))
+    return {"success": True, **result}
+
+
 @app.post("/get_response")
 async def get_linkedin_post(req: QueryRequest):
     try:
+        file_path = resolve_file_id(req.file_id) if req.file_id else req.file_path
         main = maingraph.compile()
-        query = main.invoke({"query": req.query, "uploaded_file_path": req.file_path,"choice":""})
+        # Loader tables stay columnar inside the graphs; records are built only here
+        result = main.invoke({"query": req.query, "uploaded_file_path": file_path,"choice":"", "variants": req.variants})
+        # Only the route and its output go back; drafts stay server-side under their IDs
+        query = to_jsonable({"route": result.get("route"), "output": result.get("output")})
         if "email" == query["route"]:
             return {"message": query, "status": "draft_generated"}
         elif "content" == query["route"]:
             return {"message": query, "status": "content_generated"}
         elif "calender" == query["route"]:
-            print("Got the query: ", query)
             return {"message": query, "status": "calender_generated"}
         elif "compound" == query["route"]:
-            print("Got compound query: ", query)
             return {"message": query, "status": "compound_completed"}
-        print(f"DEBUG RESULT: {query}")  
         return {"message": query}        
     except Exception as e:
         import traceback
@@ -54,57 +107,122 @@ async def get_linkedin_post(req: QueryRequest):
         return {"error": str(e), "message": "An error occurred while processing your request."}
 
 
+class ActionRequest(BaseModel):
+    draft_id: str
+    edits: Optional[Any] = None  # Only the fields the user changed (the full text for posts)
+
+
+# draft kind -> (paused graph, state updates that hand it the draft's latest version)
+DRAFT_ACTIONS = {
+    "email": (email_app, lambda values, content: {"approved": True, "draft": content}),
+    "post": (content_app, lambda values, content: {"content": {**(values.get("content") or {}), "content": content}}),
+    "event": (calender_app, lambda values, content: {"output": {**(values.get("output") or {}), "event": content}}),
+}
+
+
+_draft_locks: Dict[str, threading.Lock] = {}
+_draft_locks_lock = threading.Lock()
+
+
+def _run_draft_action(req: ActionRequest, kind: str) -> dict:
+    """
+    Apply the user's edits to a stored draft and resume its paused graph run.
+    The result is recorded on the draft, so repeating the request replays it
+    instead of sending, posting or creating twice.
+    """
+    # One request per draft at a time: a concurrent duplicate waits and then replays
+    with _draft_locks_lock:
+        lock = _draft_locks.setdefault(req.draft_id, threading.Lock())
+    with lock:
+        try:
+            draft = get_draft(req.draft_id)
+        except KeyError as e:
+            return {"success": False, "error": str(e)}
+        if draft["kind"] != kind:
+            return {"success": False, "error": f"Draft {req.draft_id} is of kind '{draft['kind']}', expected '{kind}'"}
+        if draft["action"] is not None:
+            return {**draft["action"], "replayed": True}
+
+        if req.edits:
+            draft = edit_draft(req.draft_id, req.edits)
+        app_graph, to_updates = DRAFT_ACTIONS[kind]
+        thread_id = draft["metadata"].get("thread_id")
+        if not thread_id:
+            return {"success": False, "error": f"Draft {req.draft_id} has no paused run to resume"}
+        values = app_graph.get_state(thread_config(thread_id)).values
+        try:
+            result = resume_thread(app_graph, thread_id, to_updates(values, draft["content"]))
+        except ValueError as e:
+            return {"success": False, "error": str(e)}
+        output = result.get("output") or {"success": False, "error": "No output from graph"}
+        record_action(req.draft_id, output)
+        return output
+
+
 @app.post("/send_email")
-def send_email(req: dict):
-    draft = req.get("draft")
-    if not draft:
-        return {"output": {"success": False, "error": "Draft missing"}}
-
-    state = {
-        "query": "",           
-        "draft": draft,        
-        "approved": True,
-        "output": None
-    }
-    comp = graph.compile()
-    result = comp.invoke(state, start_at="send")
-    if result.get("draft", {}).get("to") == "default@example.com":
-        print("Graph corrupted draft, using direct send")
-        from automation.mail_send import gmail_send_message
-        direct_result = gmail_send_message(draft["subject"], draft["body"], draft["to"])
-        return {"output": direct_result}
-
-    return {"output": result.get("output", {"success": False, "error": "No output from graph"})}
+def send_email(req: ActionRequest):
+    return {"output": _run_draft_action(req, "email")}
 
 
 @app.post("/post_content")
-def post_content(req: dict):
-    content = req.get("content")
-    if not content:
-        return {"output": {"success": False, "error": "Content missing"}}
-    
-    automation = LinkedInContentAutomation()
-    automation.create_post(content)
-    return {"output": {"success": True, "result": "Submitted Successfully"}}
+def post_content(req: ActionRequest):
+    return {"output": _run_draft_action(req, "post")}
 
 @app.post("/create_event")
-def create_event(req: dict):
-    event = req.get("event")
-    if not event:
-        return {"output": {"success": False, "error": "Event missing"}}
-    
-    tool = CalendarCreateEvent()
-    tool.invoke(
-        {
-            "summary": event["summary"],
-            "start_datetime": event["start_datetime"],
-            "end_datetime": event["end_datetime"],
-            "timezone": event["timezone"],
-            "location": event["location"],
-            "description": event["description"],
-            "reminders": event["reminders"],
-            "conference_data": event["conference_data"],
-            "color_id": event["color_id"],
-        }
-    )
-    return {"output": {"success": True, "result": "Submitted Successfully"}}
+def create_event(req: ActionRequest):
+    return {"output": _run_draft_action(req, "event")}
+
+@app.get("/cache_stats")
+def get_cache_stats():
+    return {"caches": cache_stats(), "analytics_results": result_cache_stats(), "speculation": speculation_stats(),
+            "llm_scheduler": llm_scheduler_stats()}
+
+@app.get("/precompute_status")
+def get_precompute_status(file_path: Optional[str] = None):
+    try:
+        return precompute_status(file_path)
+    except OSError as e:
+        return {"error": str(e)}
+
+
+@app.get("/engagement_series")
+def get_engagement_series(file_id: Optional[str] = None, file_path: Optional[str] = None, points: int = SERIES_POINTS):
+    # Bounded number of points for charting, whatever the export length
+    try:
+        path = resolve_file_id(file_id) if file_id else file_path
+    except ValueError as e:
+        return {"error": str(e)}
+    if not path:
+        return {"error": "file_id or file_path is required"}
+    return load_engagement_series(path, max(3, min(points, 1000)))
+
+
+@app.post("/score_posts")
+def score_posts(request: ScoreRequest):
+    # Local engagement model, no LLM call
+    return {"ranked": rank_posts(request.texts)}
+
+
+@app.post("/revise_draft")
+def revise_draft(req: ReviseRequest):
+    # Edits the latest version in place: no routing, retrieval or regeneration
+    try:
+        draft = get_draft(req.draft_id)
+    except KeyError as e:
+        return {"success": False, "error": str(e)}
+    if draft["kind"] != "post":
+        return {"success": False, "error": f"Drafts of kind '{draft['kind']}' can't be revised"}
+    try:
+        revised = content_agent.revise_post(draft["content"], req.instruction)
+    except Exception as e:
+        return {"success": False, "error": f"Revision failed: {e}"}
+    draft = add_version(req.draft_id, revised, req.instruction)
+    return {"success": True, **draft, "engagement_score": score_post(revised)}
+
+
+@app.get("/drafts/{draft_id}")
+def get_draft_history(draft_id: str):
+    try:
+        return {"draft_id": draft_id, "versions": draft_history(draft_id)}
+    except KeyError as e:
+        return {"error": str(e)}
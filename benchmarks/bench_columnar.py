@@ -0,0 +1,71 @@
+"""
+Peak memory of loader results: ``to_dict(orient="records")`` vs ``Columns``.
+
+Builds a synthetic multi-year ENGAGEMENT / TOP POSTS / DEMOGRAPHICS export,
+converts each table both ways under tracemalloc and also compares the size
+of the text each representation puts into an LLM prompt.
+
+    python benchmarks/bench_columnar.py [rows]
+"""
+
+import json
+import os
+import sys
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.columnar import Columns  # noqa: E402
+
+
+def synthetic_tables(rows: int):
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2015-01-01", periods=rows, freq="h")
+    engagement = pd.DataFrame({
+        "Date": dates,
+        "Impressions": rng.integers(0, 5000, rows),
+        "Engagements": rng.integers(0, 300, rows),
+    })
+    posts = pd.DataFrame({
+        "Post URL": [f"https://www.linkedin.com/feed/update/urn:li:activity:{7000000000000000000 + i}" for i in range(rows)],
+        "Post publish date": dates,
+        "Engagements": rng.integers(0, 300, rows).astype(float),
+        "Impressions": rng.integers(0, 5000, rows).astype(float),
+    })
+    categories = np.array(["Industries", "Locations", "Job titles", "Seniority", "Company size"], dtype=object)
+    demographics = pd.DataFrame({
+        "Top Demographics": categories[rng.integers(0, len(categories), rows)],
+        "Value": [f"Value {i % 997}" for i in range(rows)],
+        "Percentage": rng.random(rows),
+    })
+    return {"engagement": engagement, "top_posts": posts, "demographics": demographics}
+
+
+def peak(fn):
+    tracemalloc.start()
+    result = fn()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak_bytes
+
+
+def main(rows: int) -> None:
+    print(f"rows per table: {rows:,}")
+    print(f"{'table':<14}{'records peak':>16}{'columns peak':>16}{'records prompt':>18}{'columns prompt':>18}")
+    for name, df in synthetic_tables(rows).items():
+        records, records_peak = peak(lambda: df.to_dict(orient="records"))
+        columns, columns_peak = peak(lambda: Columns.from_frame(df))
+        records_prompt = len(json.dumps(records, separators=(",", ":"), default=str))
+        columns_prompt = len(str(columns))
+        print(
+            f"{name:<14}{records_peak / 1e6:>13.1f} MB{columns_peak / 1e6:>13.1f} MB"
+            f"{records_prompt / 1e6:>15.1f} MB{columns_prompt / 1e6:>15.1f} MB"
+        )
+        del records, columns
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
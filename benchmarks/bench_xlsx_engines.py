@@ -0,0 +1,102 @@
+"""
+Parse time and peak RSS of each XLSX engine on synthetic exports.
+
+Writes LinkedIn-shaped workbooks (DISCOVERY, ENGAGEMENT, TOP POSTS, FOLLOWERS,
+DEMOGRAPHICS) with the requested number of ENGAGEMENT/FOLLOWERS rows, then
+parses each one with every available engine in a fresh process so peak RSS is
+measured per run.
+
+    python benchmarks/bench_xlsx_engines.py                 # 1k, 100k, 1M rows
+    python benchmarks/bench_xlsx_engines.py 1000 100000     # custom sizes
+"""
+
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.analytics_ingest import _parse_workbook, available_engines  # noqa: E402
+
+DEFAULT_ROWS = (1_000, 100_000, 1_000_000)
+
+
+def write_export(path: str, rows: int) -> None:
+    import openpyxl
+
+    workbook = openpyxl.Workbook(write_only=True)
+    start = date(2000, 1, 1)
+
+    discovery = workbook.create_sheet("DISCOVERY")
+    discovery.append(["Overall Performance", f"{start:%m/%d/%Y} - {start + timedelta(days=rows - 1):%m/%d/%Y}"])
+    discovery.append(["Impressions", rows * 50])
+    discovery.append(["Members reached", rows * 10])
+
+    engagement = workbook.create_sheet("ENGAGEMENT")
+    engagement.append(["Date", "Impressions", "Engagements"])
+    for i in range(rows):
+        engagement.append([f"{start + timedelta(days=i % 36500):%m/%d/%Y}", (i * 37) % 500, (i * 11) % 40])
+
+    posts = workbook.create_sheet("TOP POSTS")
+    posts.append(["Maximum of 50 posts available to include in this list"])
+    posts.append([])
+    posts.append(["Post URL", "Post publish date", "Engagements", None, "Post URL", "Post publish date", "Impressions"])
+    for i in range(50):
+        url = f"https://www.linkedin.com/feed/update/urn:li:activity:{7000000000000000000 + i}"
+        published = f"{start + timedelta(days=i):%m/%d/%Y}"
+        posts.append([url, published, 500 - i, None, url, published, 5000 - i * 10])
+
+    followers = workbook.create_sheet("FOLLOWERS")
+    followers.append(["Total followers on 1/1/2000:", rows])
+    followers.append([])
+    followers.append(["Date", "New followers"])
+    for i in range(rows):
+        followers.append([f"{start + timedelta(days=i % 36500):%m/%d/%Y}", i % 7])
+
+    demographics = workbook.create_sheet("DEMOGRAPHICS")
+    demographics.append(["Top Demographics", "Value", "Percentage"])
+    for i in range(30):
+        demographics.append(["Job titles", f"Title {i}", 0.05 - i * 0.001])
+
+    workbook.save(path)
+
+
+def _measure(path: str, engine: str, queue) -> None:
+    started = time.perf_counter()
+    sheets = _parse_workbook(path, engine)
+    elapsed = time.perf_counter() - started
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    queue.put((elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale, sum(len(df) for df in sheets.values())))
+
+
+def measure(path: str, engine: str):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_measure, args=(path, engine, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main(sizes) -> None:
+    engines = available_engines()
+    print(f"engines: {', '.join(engines)}")
+    print(f"{'rows':>10}{'file':>10}  {'engine':<18}{'parse time':>12}{'peak RSS':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            path = os.path.join(tmp, f"export_{rows}.xlsx")
+            write_export(path, rows)
+            size_mb = os.path.getsize(path) / 1e6
+            for engine in engines:
+                elapsed, rss, parsed_rows = measure(path, engine)
+                print(f"{rows:>10,}{size_mb:>8.1f}MB  {engine:<18}{elapsed:>10.2f} s{rss / 1e6:>9.0f} MB")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_ROWS)
@@ -1,4 +1,7 @@
 # # frontend.py
+import hashlib
+
+import pandas as pd
 import requests
 import streamlit as st
 
@@ -9,21 +12,53 @@ with st.sidebar:
     uploaded_file = st.file_uploader("Choose a file", type=["xlsx",'csv'])
 
     if uploaded_file is not None:
-        st.write("File uploaded successfully!")
-        # store it temporarily 
-        with open(f"./uploaded_files/{uploaded_file.name}", "wb") as f:
-            f.write(uploaded_file.getbuffer())
-        st.success("File saved!")
+        # Upload once per file content; reruns reuse the file id returned by the API
+        upload_key = hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+        if st.session_state.get("upload_key") != upload_key:
+            uploaded_file.seek(0)
+            res = requests.post(
+                "http://127.0.0.1:8000/upload",
+                params={"filename": uploaded_file.name},
+                data=uploaded_file,  # streamed from the file object
+            )
+            result = res.json() if res.status_code == 200 else {"success": False, "error": res.text}
+            if result.get("success"):
+                st.session_state["upload_key"] = upload_key
+                st.session_state["file_id"] = result["file_id"]
+            else:
+                st.error(f"Upload failed: {result.get('error')}")
+        if st.session_state.get("upload_key") == upload_key:
+            st.success("File uploaded successfully!")
+            # The API returns a bounded number of points, however long the export
+            if st.session_state.get("series_file_id") != st.session_state["file_id"]:
+                series = requests.get(
+                    "http://127.0.0.1:8000/engagement_series",
+                    params={"file_id": st.session_state["file_id"]},
+                ).json()
+                st.session_state["series"] = series
+                st.session_state["series_file_id"] = st.session_state["file_id"]
+            series = st.session_state["series"]
+            if series.get("dates"):
+                st.caption(f"Engagement ({series['points']} of {series['total_days']} days shown)")
+                st.line_chart(
+                    pd.DataFrame(
+                        {"Impressions": series["impressions"], "Engagements": series["engagements"]},
+                        index=pd.to_datetime(series["dates"]),
+                    )
+                )
+    else:
+        st.session_state.pop("upload_key", None)
+        st.session_state.pop("file_id", None)
+        st.session_state.pop("series_file_id", None)
 
 event = ""
 input_text = st.text_input("What do you want to perform? (e.g., 'Analyze a post', 'Get post content')")
 
 if st.button("Done!!"):
     try:
-        uploaded_file_path = f"./uploaded_files/{uploaded_file.name}" if uploaded_file else None
         res = requests.post(
             "http://127.0.0.1:8000/get_response",
-            json={"query": input_text, "file_path":uploaded_file_path}  # Must match FastAPI's expected key
+            json={"query": input_text, "file_id": st.session_state.get("file_id")}  # Must match FastAPI's expected key
         )
         if res.status_code == 200:
             resp = res.json()
@@ -31,10 +66,12 @@ if st.button("Done!!"):
             # Check if this is an email response with draft
             if "email" == resp["message"]["route"]:
                 st.session_state["draft"] = resp["message"]["output"]["draft"]
+                st.session_state["email_draft_id"] = resp["message"]["output"].get("draft_id")
                 st.success("Draft generated!")
             elif "calender" == resp["message"]["route"]:
                 try:
                     st.session_state["event"] = resp["message"]["output"]["output"]["event"]
+                    st.session_state["event_draft_id"] = resp["message"]["output"]["output"].get("draft_id")
                     st.success("Event generated!")
                 except KeyError as e:
                     st.error(f"Calendar event structure error: {e}")
@@ -43,27 +80,36 @@ if st.button("Done!!"):
                 st.session_state["content"] = resp["message"]["output"]["content"]
                 st.success("Content Draft generated!")
             elif "compound" == resp["message"]["route"]:
-                # Handle compound responses (calendar + email)
+                # Handle compound responses: one result per planned action, keyed by action id
                 compound_output = resp["message"]["output"]
-                
-                # Check if calendar was created
-                if "calendar" in compound_output:
-                    try:
-                        st.session_state["event"] = compound_output["calendar"]["output"]["event"]
-                        st.success("✅ Calendar event created!")
-                    except KeyError as e:
-                        st.error(f"Calendar event structure error: {e}")
-                
-                # Check if email was sent
-                if "email" in compound_output:
-                    email_result = compound_output["email"].get("output", {})
-                    if email_result.get("success"):
-                        st.success("✅ Email sent successfully!")
-                        st.info(f"Email sent to: {email_result.get('to', 'recipient')}")
-                    else:
-                        st.error(f"❌ Email failed: {email_result.get('error', 'Unknown error')}")
-                
-                st.success("🎉 Compound action completed: Calendar event created and email sent!")
+                plan = compound_output.get("plan", [])
+                results = compound_output.get("results", {})
+                for action in plan:
+                    result = results.get(action["id"]) or {}
+                    if action["action"] == "calendar":
+                        # The event is only drafted; it is created from the review form below
+                        try:
+                            st.session_state["event"] = result["output"]["event"]
+                            st.session_state["event_draft_id"] = result["output"].get("draft_id")
+                            st.success(f"✅ Event generated! Review draft {st.session_state['event_draft_id']} below and create it.")
+                        except (KeyError, TypeError) as e:
+                            st.error(f"Calendar event structure error: {e}")
+                    elif action["action"] == "email":
+                        # Check if email was sent
+                        email_result = result.get("output") or result
+                        if email_result.get("success"):
+                            st.success("✅ Email sent successfully!")
+                            st.info(f"Email sent to: {email_result.get('to', 'recipient')}")
+                        else:
+                            st.error(f"❌ Email failed: {email_result.get('error', 'Unknown error')}")
+                    elif action["action"] == "post" and result.get("content"):
+                        st.session_state["content"] = result["content"]
+                        st.success("✅ Content Draft generated!")
+                    elif action["action"] == "analytics":
+                        st.subheader("Analytics")
+                        st.write(result.get("analysis") or result)
+
+                st.success(f"🎉 Compound action completed: {', '.join(a['id'] for a in plan)}")
             else:
 
                 if isinstance(resp, dict):
@@ -88,6 +134,7 @@ if st.button("Done!!"):
 
 if "event" in st.session_state:
     st.subheader("Review Event")
+    st.caption(f"Draft ID: {st.session_state.get('event_draft_id')}")
     summary = st.text_input("Summary", st.session_state["event"]["summary"])
     start_datetime = st.text_input("Start DateTime", st.session_state["event"]["start_datetime"])
     end_datetime = st.text_input("End DateTime", st.session_state["event"]["end_datetime"])
@@ -118,7 +165,12 @@ if "event" in st.session_state:
             "conference_data": conference_data_bool, 
             "color_id": color_id
         }
-        res = requests.post("http://127.0.0.1:8000/create_event", json={"event": event})
+        # The event stays on the server; only edited fields are sent back
+        edits = {k: v for k, v in event.items() if v != st.session_state["event"].get(k)}
+        res = requests.post(
+            "http://127.0.0.1:8000/create_event",
+            json={"draft_id": st.session_state.get("event_draft_id"), "edits": edits},
+        )
         st.write(res.json())
 if "draft" in st.session_state:
 
@@ -129,12 +181,51 @@ if "draft" in st.session_state:
 
     if st.button("Send Email"):
         draft = {"subject": subject, "body": body, "to": to}
-        res = requests.post("http://127.0.0.1:8000/send_email", json={"draft": draft})
+        edits = {k: v for k, v in draft.items() if v != st.session_state["draft"].get(k)}
+        res = requests.post(
+            "http://127.0.0.1:8000/send_email",
+            json={"draft_id": st.session_state.get("email_draft_id"), "edits": edits},
+        )
         st.write(res)
 
 if "content" in st.session_state:
     st.subheader("Review Draft Content")
-    content = st.text_area("Content", st.session_state["content"]["content"])
+    draft = st.session_state["content"]["content"]
+    variants = st.session_state["content"].get("variants") or []
+    if len(variants) > 1:
+        # Ranked best first by the local engagement model
+        choice = st.radio(
+            "Variants",
+            range(len(variants)),
+            format_func=lambda i: f"Variant {i + 1} - score {variants[i]['score']}/10",
+        )
+        draft = variants[choice]["text"]
+        st.session_state["content"]["draft_id"] = variants[choice].get("draft_id")
+    content = st.text_area("Content", draft)
+    instruction = st.text_input("Revise draft (e.g. 'make it shorter', 'change the hook')")
+    if st.button("Revise") and instruction and st.session_state["content"].get("draft_id"):
+        res = requests.post(
+            "http://127.0.0.1:8000/revise_draft",
+            json={"draft_id": st.session_state["content"]["draft_id"], "instruction": instruction},
+        ).json()
+        if res.get("success"):
+            # Continue editing the revised version; variants no longer apply
+            st.session_state["content"] = {
+                "content": res["content"],
+                "draft_id": res["draft_id"],
+                "engagement_score": res["engagement_score"],
+            }
+            st.success(f"Revised (version {res['version']}, score {res['engagement_score']['score']}/10)")
+            st.rerun()
+        else:
+            st.error(res.get("error", "Revision failed"))
     if st.button("Post"):
-        res = requests.post("http://127.0.0.1:8000/post_content", json={"content": content})
+        res = requests.post(
+            "http://127.0.0.1:8000/post_content",
+            json={
+                "draft_id": st.session_state["content"].get("draft_id"),
+                # The server posts its latest version; send the text only if edited here
+                "edits": content if content != draft else None,
+            },
+        )
         st.write(res.json())
\ No newline at end of file
@@ -0,0 +1,73 @@
+import os
+
+import pandas as pd
+import pytest
+
+from utils import analytics_ingest, analytics_store
+from utils.analytics_fastpath import answer_fast
+from utils.analytics_ingest import load_sheets
+from utils.analytics_metrics import daily_engagement, post_table
+
+EXPORT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "uploaded_files",
+    "Content_2024-08-11_2025-08-10_AbdulWahab.xlsx",
+)
+
+
+@pytest.fixture(autouse=True)
+def isolated_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(analytics_store, "ANALYTICS_STORE_DIR", str(tmp_path / "store"))
+    monkeypatch.setattr(analytics_ingest, "ANALYTICS_CACHE_DIR", str(tmp_path / "cache"))
+
+
+@pytest.fixture
+def daily():
+    return daily_engagement(load_sheets(EXPORT))
+
+
+@pytest.mark.parametrize("question", [
+    "What is the growth in followers?",
+    "How many impressions did I get in Q1?",
+    "What is my average engagement rate?",
+    "Which posts got the most comments? Show my top posts by comments",
+    "Am I growing this year?",
+])
+def test_unrecognised_questions_fall_back_to_llm(question):
+    assert answer_fast(EXPORT, question) is None
+
+
+def test_top_posts_by_engagement_rate():
+    result = answer_fast(EXPORT, "top posts in terms of engagement rate")
+    posts = result["data"]["posts"]
+    assert result["data"]["ranked_by"] == "engagement_rate"
+    assert len(posts) > 1
+    rates = [post["engagement_rate"] for post in posts]
+    assert rates == sorted(rates, reverse=True)
+
+    table = post_table(load_sheets(EXPORT)).dropna(subset=["engagements", "impressions"])
+    best = (table["engagements"] / table["impressions"]).max()
+    assert rates[0] == round(best * 100, 2)
+
+
+@pytest.mark.parametrize("question, count", [
+    ("top 3 posts by impressions", 3),
+    ("what are my seven best posts", 7),
+    ("what's my best performing post", 1),
+])
+def test_requested_number_of_posts(question, count):
+    assert len(answer_fast(EXPORT, question)["data"]["posts"]) == count
+
+
+def test_this_year(daily):
+    result = answer_fast(EXPORT, "How many impressions did my posts get this year?")
+    end = daily.index.max()
+    expected = daily.loc[pd.Timestamp(f"{end.year}-01-01"):end, "Impressions"].sum()
+    assert result["data"]["total"] == int(expected)
+    assert result["data"]["days"] < len(daily)
+
+
+def test_month_only_range_runs_to_month_end(daily):
+    result = answer_fast(EXPORT, "total impressions from January 2025 to March 2025")
+    assert result["data"]["days"] == 90
+    assert result["data"]["total"] == int(daily.loc["2025-01-01":"2025-03-31", "Impressions"].sum())
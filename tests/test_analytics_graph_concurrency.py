@@ -0,0 +1,72 @@
+"""The shared compiled analytics graph gives the same results under concurrent calls."""
+
+import hashlib
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+graph_module = pytest.importorskip("agents.linkedinAnalyticsGraph")
+
+from utils import analytics_store
+from utils.analytics_metrics import compute_metric_summary, load_month_partitions
+
+UPLOADS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "uploaded_files")
+EXPORTS = ["Content_2024-08-11_2025-08-10_AbdulWahab.xlsx", "Content_2025-08-04_2025-08-10_AbdulWahab.xlsx"]
+QUESTIONS = ["Give me a strategy from the analytics.", "Give me a month by month breakdown."]
+
+
+class _Response:
+    def __init__(self, content):
+        self.content = content
+
+
+class PromptEchoLLM:
+    """Deterministic stand-in for the Groq model: the answer identifies the prompt it was given."""
+
+    def invoke(self, prompt, config=None):
+        return _Response(f"answer-{hashlib.sha256(str(prompt).encode()).hexdigest()[:16]}")
+
+    def batch(self, prompts, config=None):
+        return [self.invoke(prompt) for prompt in prompts]
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    monkeypatch.setattr(graph_module, "setup_llm", PromptEchoLLM)
+    # Every call must run the graph rather than replay the result cache
+    monkeypatch.setattr(graph_module, "get_cached_result", lambda *args: None)
+    monkeypatch.setattr(graph_module, "put_cached_result", lambda *args: None)
+    monkeypatch.setattr(analytics_store, "ANALYTICS_STORE_DIR", str(tmp_path / "store"))
+    return graph_module.LinkedInAnalyticsGraph()
+
+
+@pytest.fixture
+def exports(tmp_path):
+    paths = []
+    for name in EXPORTS:
+        path = tmp_path / name
+        shutil.copyfile(os.path.join(UPLOADS, name), path)
+        paths.append(str(path))
+    return paths
+
+
+def _comparable(result):
+    # Stage stats carry wall-clock latencies, which legitimately differ between runs
+    return {key: value for key, value in result.items() if key != "stage_stats"}
+
+
+def test_concurrent_analyze_matches_sequential(engine, exports):
+    cases = [(file, question) for file in exports for question in QUESTIONS]
+    expected = {case: _comparable(engine.analyze(*case)) for case in cases}
+    assert all(result["success"] for result in expected.values()), expected
+
+    compute_metric_summary.cache_clear()
+    load_month_partitions.cache_clear()
+    calls = cases * 3
+    with ThreadPoolExecutor(max_workers=len(calls)) as pool:
+        results = list(pool.map(lambda case: engine.analyze(*case), calls))
+
+    for case, result in zip(calls, results):
+        assert _comparable(result) == expected[case], case
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.downsample import downsample_series
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(0)
+    index = pd.date_range("2024-01-01", periods=500, freq="D")
+    return pd.DataFrame(
+        {"Impressions": rng.integers(0, 1000, 500), "Engagements": rng.integers(0, 80, 500)}, index=index
+    )
+
+
+@pytest.mark.parametrize("target", range(3, 11))
+def test_never_exceeds_target(series, target):
+    out = downsample_series(series, target)
+    assert len(out) <= target
+    assert out.index[0] == series.index[0] and out.index[-1] == series.index[-1]
+
+
+def test_keeps_extremes(series):
+    out = downsample_series(series, 60)
+    assert len(out) == 60
+    for col in series.columns:
+        assert out[col].max() == series[col].max()
+        assert out[col].min() == series[col].min()
+
+
+def test_short_series_unchanged(series):
+    assert downsample_series(series.head(10), 60).equals(series.head(10))
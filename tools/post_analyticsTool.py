@@ -1,9 +1,11 @@
 from langchain.tools import tool
 from automation.post_content_automation import LinkedInPostContentAutomation
+from utils.memo import memoize
 
 posts = LinkedInPostContentAutomation()
 
 @tool
+@memoize(ttl=6 * 3600, should_cache=lambda text: not text.startswith("Error scraping post"))
 def get_linkedin_post(url: str) -> str:
     """
     Scrape the content of a LinkedIn post from the provided URL.
@@ -1,15 +1,25 @@
 from langchain.tools import tool
 import pandas as pd
 from automation.linkedin_content_automation import LinkedInContentAutomation
-import streamlit as st
+from utils.analytics_ingest import get_sheet
+from utils.analytics_store import query_engagement, store_coverage
+from utils.analytics_sql import run_sql
+from utils.columnar import Columns
+from utils.memo import memoize
 automation = LinkedInContentAutomation()
 
+
+def _loaded(result):
+    """Cache loader results but not errors (missing sheet, upload still being written)"""
+    return not (isinstance(result, dict) and "error" in result)
+
+
 @tool
-@st.cache_data(ttl=3600) 
+@memoize(ttl=3600, should_cache=_loaded)
 def load_engagement(file):
         """Load engagement data from an Excel file."""
         try:
-            engagement_df = pd.read_excel(file,sheet_name="ENGAGEMENT")
+            engagement_df = get_sheet(file, "ENGAGEMENT")
             engagement_df["Date"] = pd.to_datetime(engagement_df["Date"])
             engagement_df = engagement_df.sort_values("Date")
             if 'Date' in engagement_df.columns:
@@ -26,17 +36,17 @@ def load_engagement(file):
             # Calculate growth rates month-to-month
             df_monthly['Engagement Growth %'] = df_monthly['Engagements'].pct_change() * 100
             df_monthly['Impression Growth %'] = df_monthly['Impressions'].pct_change() * 100
-            return df_monthly.to_dict(orient="records")
+            return Columns.from_frame(df_monthly)
         except Exception as e:
             print("Could not load the file", e)
             return {"error": f"Failed to load engagement data: {str(e)}"}
 
-@st.cache_data(ttl=3600) 
+@memoize(ttl=3600, should_cache=_loaded)
 def load_top_posts(file):
         """Load top posts data from an Excel file."""
         try:
-            # Skip the first 2 rows (header text and empty row) and use row 3 as column names
-            df_top_posts = pd.read_excel(file, sheet_name="TOP POSTS", skiprows=2)
+            # Header row (row 3, below the banner text) is promoted during ingestion
+            df_top_posts = get_sheet(file, "TOP POSTS")
             print(f"DEBUG: Column names in TOP POSTS sheet: {list(df_top_posts.columns)}")
             
             # Clean column names (remove extra spaces)
@@ -91,7 +101,7 @@ def load_top_posts(file):
                 cols = [c for c in [engagement_col, impression_col] if c]
                 df_top_posts = df_top_posts.dropna(subset=cols, how='all')
             
-            result = df_top_posts.head(10).to_dict(orient="records")
+            result = Columns.from_frame(df_top_posts.head(10))
             print(f"DEBUG: First top post data: {result[0] if result else 'No data'}")
             print(f"DEBUG: Total posts loaded: {len(result)}")
             return result
@@ -101,27 +111,48 @@ def load_top_posts(file):
             return {"error": f"Failed to load top posts data: {str(e)}"}
 
 @tool
-@st.cache_data(ttl=3600) 
+@memoize(ttl=3600, should_cache=_loaded)
 def load_overall_performance(file):
         """Load overall performance data from an Excel file."""
         try:
-            df_overall = pd.read_excel(file, sheet_name="DISCOVERY")
-            return df_overall.to_dict(orient="records")
+            df_overall = get_sheet(file, "DISCOVERY")
+            return Columns.from_frame(df_overall)
             
         except Exception as e:
             print("Could not load the file", e)
             return {"error": f"Failed to load overall performance data: {str(e)}"}
     
 @tool 
-@st.cache_data(ttl=3600) 
+@memoize(ttl=3600, should_cache=_loaded)
 def load_demographics(file):
         """Load demographics data from an Excel file."""
         try:
-            demographics_df = pd.read_excel(file, sheet_name="DEMOGRAPHICS")
+            demographics_df = get_sheet(file, "DEMOGRAPHICS")
             demographics_df["Percentage"] = pd.to_numeric(demographics_df["Percentage"], errors='coerce')
             demographics_df = demographics_df.sort_values(by="Percentage", ascending=False)
-            return demographics_df.to_dict(orient="records")
+            return Columns.from_frame(demographics_df)
         except Exception as e:
             print("Could not load the file", e)
             return {"error": f"Failed to load demographics data: {str(e)}"}
 
+# Not memoized: the store changes whenever an export is ingested and the Parquet query is cheap
+@tool
+def load_engagement_history(start: str = "", end: str = ""):
+        """Load monthly engagement/impression totals across ALL uploaded exports between start and end (YYYY-MM-DD, optional)."""
+        try:
+            daily = query_engagement(start or None, end or None)
+            if daily.empty:
+                return {"error": "No uploaded exports cover the requested period", "coverage": store_coverage()}
+            df_monthly = daily.resample("MS").sum()
+            df_monthly['Engagement Growth %'] = df_monthly['Engagements'].pct_change() * 100
+            df_monthly['Impression Growth %'] = df_monthly['Impressions'].pct_change() * 100
+            df_monthly.index = df_monthly.index.to_period("M")
+            return Columns.from_frame(df_monthly.reset_index(names="Date"))
+        except Exception as e:
+            print("Could not query the analytics store", e)
+            return {"error": f"Failed to load engagement history: {str(e)}"}
+
+@tool
+def query_analytics_sql(file: str, query: str):
+        """Run ONE read-only DuckDB SELECT over the export's tables (engagement, posts, followers, demographics, engagement_history) and return at most 50 rows."""
+        return run_sql(file, query)
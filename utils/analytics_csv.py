@@ -0,0 +1,181 @@
+"""
+Chunked ingestion of CSV analytics exports.
+
+A CSV holds a single table, so its header decides which normalized sheets it
+feeds (the same ones the XLSX path produces):
+
+    Date + Impressions/Engagements          -> ENGAGEMENT (summed per day)
+    Post URL + Engagements/Impressions      -> TOP POSTS  (summed per post)
+    Date + New followers                    -> FOLLOWERS  (summed per day)
+    Top Demographics + Value + Percentage   -> DEMOGRAPHICS
+
+Event-level exports (one row per post per day) feed both ENGAGEMENT and TOP
+POSTS. The file is read ``CSV_CHUNK_ROWS`` rows at a time and each chunk is
+folded into running per-day / per-post aggregates, so memory is bounded by the
+number of distinct days and posts rather than by the file size.
+"""
+
+import csv
+import os
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+CSV_CHUNK_ROWS = int(os.getenv("CSV_CHUNK_ROWS", 100_000))
+
+# Lines scanned for the header row (exports may start with banner text)
+_HEADER_SCAN_LINES = 10
+
+
+def _find(columns: List[str], *tokens: str, exact: bool = False) -> Optional[str]:
+    for col in columns:
+        name = col.strip().lower()
+        if (name in tokens) if exact else any(token in name for token in tokens):
+            return col
+    return None
+
+
+def _detect_header(file: str) -> int:
+    """Index of the first line that looks like a known table header."""
+    with open(file, "r", encoding="utf-8-sig", newline="") as f:
+        for i, row in enumerate(csv.reader(f)):
+            if i >= _HEADER_SCAN_LINES:
+                break
+            names = [cell.strip().lower() for cell in row]
+            if "date" in names or "top demographics" in names or any("url" in n for n in names):
+                return i
+    return 0
+
+
+def _numeric(series: pd.Series) -> pd.Series:
+    return pd.to_numeric(series.astype(str).str.replace(",", "", regex=False), errors="coerce")
+
+
+def _dates(series: pd.Series) -> pd.Series:
+    # Exports repeat the same few thousand dates, so parse each distinct string once
+    uniques = series.dropna().unique()
+    parsed = pd.Series(pd.to_datetime(pd.Series(uniques), errors="coerce").to_numpy(), index=uniques)
+    return pd.to_datetime(series.map(parsed))
+
+
+def _percentage(series: pd.Series) -> pd.Series:
+    """Fractions as in the XLSX export; "4.9%" style values are scaled down."""
+    text = series.astype(str).str.strip()
+    values = _numeric(text.str.rstrip("%"))
+    return values.where(~text.str.endswith("%"), values / 100)
+
+
+class _DailySum:
+    """Running per-day sums of some metric columns."""
+
+    def __init__(self, date_col: str, metrics: Dict[str, str]):
+        self.date_col = date_col
+        self.metrics = metrics  # output name -> source column
+        self.total: Optional[pd.DataFrame] = None
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        part = pd.DataFrame({name: _numeric(chunk[col]) for name, col in self.metrics.items()})
+        part["Date"] = _dates(chunk[self.date_col]).dt.normalize()
+        part = part.dropna(subset=["Date"]).groupby("Date").sum()
+        self.total = part if self.total is None else self.total.add(part, fill_value=0)
+
+    def result(self) -> pd.DataFrame:
+        if self.total is None:
+            return pd.DataFrame(columns=["Date", *self.metrics])
+        return self.total.sort_index().reset_index()
+
+
+class _PostSum:
+    """Running per-post metric sums and earliest publish date."""
+
+    def __init__(self, url_col: str, date_col: Optional[str], metrics: Dict[str, str]):
+        self.url_col = url_col
+        self.date_col = date_col
+        self.metrics = metrics
+        self.total: Optional[pd.DataFrame] = None
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        part = pd.DataFrame({name: _numeric(chunk[col]) for name, col in self.metrics.items()})
+        part["Post URL"] = chunk[self.url_col].astype(str).str.strip()
+        part["Post publish date"] = (
+            _dates(chunk[self.date_col]) if self.date_col else pd.NaT
+        )
+        part = part[chunk[self.url_col].notna()]
+        part = part.groupby("Post URL").agg({**{name: "sum" for name in self.metrics}, "Post publish date": "min"})
+        if self.total is not None:
+            part = pd.concat([self.total, part]).groupby(level=0).agg(
+                {**{name: "sum" for name in self.metrics}, "Post publish date": "min"}
+            )
+        self.total = part
+
+    def result(self) -> pd.DataFrame:
+        if self.total is None:
+            return pd.DataFrame(columns=["Post URL", "Post publish date", *self.metrics])
+        posts = self.total.reset_index()[["Post URL", "Post publish date", *self.metrics]]
+        return posts.sort_values(list(self.metrics)[0], ascending=False).reset_index(drop=True)
+
+
+def parse_csv_export(file: str, chunk_rows: int = CSV_CHUNK_ROWS) -> Dict[str, pd.DataFrame]:
+    """Stream a CSV export and map it onto the normalized analytics sheets."""
+    header_row = _detect_header(file)
+    columns = list(pd.read_csv(file, skiprows=header_row, nrows=0, encoding="utf-8-sig").columns)
+
+    url_col = _find(columns, "url") or _find(columns, "link", "post link", exact=True)
+    date_col = _find(columns, "date", exact=True)
+    publish_col = _find(columns, "publish") or date_col
+    metrics = {
+        name: col
+        for name, col in (("Engagements", _find(columns, "engagement")), ("Impressions", _find(columns, "impression")))
+        if col
+    }
+    followers_col = _find(columns, "new followers")
+    demo_cols = (_find(columns, "top demographics"), _find(columns, "value", exact=True), _find(columns, "percentage"))
+
+    aggregators = {}
+    if date_col and metrics:
+        aggregators["ENGAGEMENT"] = _DailySum(date_col, metrics)
+    if url_col and metrics:
+        aggregators["TOP POSTS"] = _PostSum(url_col, publish_col, metrics)
+    if date_col and followers_col:
+        aggregators["FOLLOWERS"] = _DailySum(date_col, {"New followers": followers_col})
+    demographics = [] if all(demo_cols) else None
+
+    if not aggregators and demographics is None:
+        raise ValueError(f"Unrecognized CSV export; columns were {columns}")
+
+    rows = 0
+    reader = pd.read_csv(
+        file, skiprows=header_row, chunksize=chunk_rows, dtype=str, encoding="utf-8-sig", skip_blank_lines=True
+    )
+    for chunk in reader:
+        chunk = chunk.dropna(how="all")
+        rows += len(chunk)
+        for aggregator in aggregators.values():
+            aggregator.add(chunk)
+        if demographics is not None:
+            top, value, pct = demo_cols
+            demographics.append(pd.DataFrame({
+                "Top Demographics": chunk[top],
+                "Value": chunk[value],
+                "Percentage": _percentage(chunk[pct]),
+            }))
+
+    sheets = {name: aggregator.result() for name, aggregator in aggregators.items()}
+    if "ENGAGEMENT" in sheets:
+        # Downstream code expects both metrics; a missing one counts as zero
+        daily = sheets["ENGAGEMENT"].reindex(columns=["Date", "Impressions", "Engagements"], fill_value=0)
+        sheets["ENGAGEMENT"] = daily
+        if not daily.empty:
+            start, end = daily["Date"].min(), daily["Date"].max()
+            period = f"{start.month}/{start.day}/{start.year} - {end.month}/{end.day}/{end.year}"
+            sheets["DISCOVERY"] = pd.DataFrame(
+                {"Overall Performance": ["Impressions"], period: [float(daily["Impressions"].sum())]}
+            )
+    if demographics is not None:
+        sheets["DEMOGRAPHICS"] = (
+            pd.concat(demographics, ignore_index=True).sort_values("Percentage", ascending=False).reset_index(drop=True)
+            if demographics else pd.DataFrame(columns=["Top Demographics", "Value", "Percentage"])
+        )
+
+    print(f"DEBUG: Streamed {rows:,} CSV rows from {file} into {sorted(sheets)}")
+    return sheets
@@ -0,0 +1,371 @@
+"""
+Deterministic fast-path answers for common profile analytics questions.
+
+Questions such as "what's my best performing post" or "total impressions
+last month" are a single sort/aggregation over the cached sheets, so they are
+answered from templates in milliseconds. LLM narration on top is optional.
+
+A question the templates only partly understand (a metric, ranking basis or
+period they don't know) raises ``UnsupportedQuestion`` in its handler and
+falls back to the LLM instead of getting a confident answer to a different
+question.
+"""
+
+import re
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+
+from utils.analytics_ingest import load_sheets
+from utils.analytics_metrics import daily_engagement, post_table
+from utils.analytics_store import ingest_export, query_engagement, query_table
+
+# Questions asking *why* or for an analysis still need the LLM/scraping path
+# (and so do questions about what a post says, which post_analysis scrapes and critiques)
+_NEEDS_REASONING = re.compile(
+    r"\b(analy[sz]e|analysis|why|improve|strategy|suggest|recommend|rewrite|read|content|say|said|says|write|wrote|written)\b"
+)
+
+# Follower questions about a period or gains are answered from the daily new-follower counts
+_FOLLOWER_GAINS = re.compile(r"\b(new|gain(ed|s)?|grew|growth|grow|got|last|past|previous|this|since|from|between|in\s+20\d{2})\b")
+
+_MONTHS = (
+    "january|february|march|april|june|july|august|september|october|november|december"
+    "|jan|feb|mar|apr|jun|jul|aug|sept|sep|oct|nov|dec"
+)
+# Anything that looks like a time period; one that no parser below understands sends the question to the LLM
+_PERIOD_WORDS = rf"today|yesterday|ytd|years?|quarters?|q[1-4]|weeks?|days?|weekends?|since|from|between|during|{_MONTHS}|20\d{{2}}"
+_PERIOD_CUE = re.compile(rf"\b({_PERIOD_WORDS}|months?)\b")
+# Month-over-month growth only compares the last two complete months
+_NON_MONTHLY_PERIOD = re.compile(rf"\b({_PERIOD_WORDS})\b")
+
+# Metrics the templates don't compute
+_UNSUPPORTED_TOTALS = re.compile(
+    r"\b(rate|ratio|percent(age)?|average|avg|mean|median|reactions?|comments?|shares?|reposts?|clicks?|members|reach(ed)?|per post)\b"
+)
+_UNSUPPORTED_GROWTH = re.compile(r"\b(followers?|rate|ratio|reach|members|reactions?|comments?|shares?|reposts?|clicks?)\b")
+_UNSUPPORTED_RANKINGS = re.compile(
+    r"\b(comments?|reactions?|likes?|shares?|reposts?|clicks?|ctr|followers?|saves?|members|reach)\b"
+)
+
+_NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10}
+_COUNT = "|".join([r"\d+", *_NUMBER_WORDS])
+# "top posts" without a number
+DEFAULT_TOP_POSTS = 5
+
+
+class UnsupportedQuestion(ValueError):
+    """The question has a fast-path intent but asks for something its template can't answer."""
+
+
+_AUDIENCE_CATEGORIES = {
+    "industr": "Industries",
+    "location": "Locations",
+    "countr": "Locations",
+    "city": "Locations",
+    "job title": "Job titles",
+    "title": "Job titles",
+    "role": "Job titles",
+    "seniority": "Seniority",
+    "company size": "Company size",
+    "compan": "Companies",
+}
+
+_INTENTS = [
+    ("best_post", re.compile(rf"\b(best|top|most (engaging|popular|viewed))[\s-]*(({_COUNT})\s+)?(performing\s+)?posts?\b")),
+    ("total_metric", re.compile(r"\b(total|how many|sum of|number of)\b.*\b(impressions|engagements|followers)\b")),
+    ("top_audience", re.compile(r"\b(top|main|biggest|largest|most common|which|what)\b.*\baudience\b|\baudience\b.*\b(industr|location|countr|city|title|role|seniority|compan)")),
+    ("growth", re.compile(r"\b(engagement|impression)s?\s+(growth|trend)|\bgrowth\b|\bam i growing\b")),
+]
+
+
+def _parse_period(question: str, end: pd.Timestamp) -> Tuple[Optional[pd.Timestamp], Optional[pd.Timestamp], str]:
+    """
+    Resolve relative periods against the last day covered by the export.
+    Raises UnsupportedQuestion for a period it doesn't recognise instead of
+    silently using the whole export.
+    """
+    q = question.lower()
+    match = re.search(r"\b(?:last|past)\s+(\d+)\s+(day|week|month)s?\b", q)
+    if match:
+        n, unit = int(match.group(1)), match.group(2)
+        if unit == "month":
+            start = end - pd.DateOffset(months=n) + pd.Timedelta(days=1)
+        else:
+            start = end - pd.Timedelta(days=n * (7 if unit == "week" else 1) - 1)
+        return start, end, f"the last {n} {unit}s"
+    if re.search(r"\b(last|past|previous)\s+week\b", q):
+        return end - pd.Timedelta(days=6), end, "the last 7 days"
+    if re.search(r"\b(last|previous|past)\s+month\b", q):
+        first_of_month = end.replace(day=1)
+        start = (first_of_month - pd.Timedelta(days=1)).replace(day=1)
+        return start, first_of_month - pd.Timedelta(days=1), start.strftime("%B %Y")
+    if re.search(r"\bthis month\b", q):
+        return end.replace(day=1), end, end.strftime("%B %Y") + " (to date)"
+    if re.search(r"\b(this year|year to date|ytd)\b", q):
+        return end.replace(month=1, day=1), end, f"{end.year} (to date)"
+    if re.search(r"\b(last|previous|past)\s+year\b", q):
+        year = end.year - 1
+        return pd.Timestamp(f"{year}-01-01"), pd.Timestamp(f"{year}-12-31"), str(year)
+    if _PERIOD_CUE.search(q):
+        raise UnsupportedQuestion(f"unrecognised period in {question!r}")
+    return None, None, "the whole export period"
+
+
+def _range_end(text: str) -> pd.Timestamp:
+    """Last day of the period a date names: "2025" is a year, "March 2025" or "2025-03" a month, else a day."""
+    text = text.strip()
+    ts = pd.Timestamp(text)
+    if re.fullmatch(r"\d{4}", text):
+        return ts + pd.offsets.YearEnd(0)
+    if re.fullmatch(r"\d{4}[-/]\d{1,2}", text) or not re.search(r"\d", re.sub(r"\b\d{4}\b", "", text)):
+        return ts + pd.offsets.MonthEnd(0)
+    return ts
+
+
+def _explicit_range(question: str) -> Optional[Tuple[pd.Timestamp, Optional[pd.Timestamp], str]]:
+    """Absolute ranges ("from Jan 2024 to March 2025", "since 2024-06-01", "in May 2025", "in 2024")."""
+    q = question.lower()
+    match = re.search(r"\b(?:from|between)\s+(.+?)\s+(?:to|and|until)\s+(.+?)(?:[?.!]|$)", q)
+    try:
+        if match:
+            start, end = pd.Timestamp(match.group(1)), _range_end(match.group(2))
+            return start, end, f"the period {start:%Y-%m-%d} to {end:%Y-%m-%d}"
+        match = re.search(r"\bsince\s+(.+?)(?:[?.!]|$)", q)
+        if match:
+            start = pd.Timestamp(match.group(1))
+            return start, None, f"the period since {start:%Y-%m-%d}"
+        match = re.search(rf"\bin\s+((?:{_MONTHS}|may)\s+20\d{{2}})\b", q)
+        if match:
+            start = pd.Timestamp(match.group(1))
+            return start, _range_end(match.group(1)), start.strftime("%B %Y")
+    except ValueError:
+        return None
+    match = re.search(r"\bin\s+(20\d{2})\b", q)
+    if match:
+        year = match.group(1)
+        return pd.Timestamp(f"{year}-01-01"), pd.Timestamp(f"{year}-12-31"), year
+    return None
+
+
+def detect_intent(question: str) -> Optional[str]:
+    """Return the fast-path intent for a question, or None if it needs the LLM."""
+    q = (question or "").lower()
+    if not q or _NEEDS_REASONING.search(q):
+        return None
+    for intent, pattern in _INTENTS:
+        if pattern.search(q):
+            return intent
+    return None
+
+
+def _requested_count(question: str) -> int:
+    """N of "top 3 posts" / "five best posts"; several posts when "posts" is plural, else one."""
+    match = re.search(rf"\b(?:top|best)\s+({_COUNT})\b|\b({_COUNT})\s+(?:top|best|most)\b", question)
+    if match:
+        count = match.group(1) or match.group(2)
+        return int(count) if count.isdigit() else _NUMBER_WORDS[count]
+    return DEFAULT_TOP_POSTS if re.search(r"\bposts\b", question) else 1
+
+
+def _best_post(file: str, sheets, question: str) -> Tuple[str, Dict[str, Any]]:
+    q = question.lower()
+    if _UNSUPPORTED_RANKINGS.search(q):
+        raise UnsupportedQuestion(f"unsupported ranking in {question!r}")
+    posts = post_table(sheets)
+    if re.search(r"\b(engagement\s+)?rate\b", q):
+        metric = "engagement_rate"
+        posts = posts.dropna(subset=["engagements", "impressions"])
+        posts = posts[posts["impressions"] > 0].assign(engagement_rate=lambda df: df["engagements"] / df["impressions"])
+        order = ["engagement_rate", "engagements"]
+    elif re.search(r"\b(impressions?|viewed|views)\b", q):
+        metric, order = "impressions", ["impressions", "engagements"]
+    else:
+        metric, order = "engagements", ["engagements", "impressions"]
+
+    explicit = _explicit_range(q)
+    if explicit or _PERIOD_CUE.search(q):
+        last_day = daily_engagement(sheets).index.max() if "ENGAGEMENT" in sheets else posts["published"].max()
+        start, end, label = explicit or _parse_period(q, last_day)
+        posts = posts[posts["published"] >= start]
+        if end is not None:
+            posts = posts[posts["published"] <= end]
+    else:
+        label = None
+
+    posts = posts.dropna(subset=[order[0]]).sort_values(order, ascending=False)
+    if posts.empty:
+        if label:
+            return f"None of the top posts in this export were published in {label}.", {"period": label}
+        return "No posts were found in this export.", {}
+    n = _requested_count(q)
+    records = [
+        {
+            "url": row["url"],
+            "published": row["published"].strftime("%Y-%m-%d") if pd.notna(row["published"]) else None,
+            "engagements": None if pd.isna(row["engagements"]) else int(row["engagements"]),
+            "impressions": None if pd.isna(row["impressions"]) else int(row["impressions"]),
+            **({"engagement_rate": round(float(row["engagement_rate"]) * 100, 2)} if metric == "engagement_rate" else {}),
+        }
+        for _, row in posts.head(n).iterrows()
+    ]
+    lines = [
+        f"{i}. {r['url']} — {r['engagements'] if r['engagements'] is not None else 'n/a'} engagements, "
+        f"{r['impressions'] if r['impressions'] is not None else 'n/a'} impressions"
+        + (f", {r['engagement_rate']}% engagement rate" if "engagement_rate" in r else "")
+        + (f" (published {r['published']})" if r["published"] else "")
+        for i, r in enumerate(records, 1)
+    ]
+    title = "Your best performing post" if len(records) == 1 else f"Your top {len(records)} posts"
+    data = {"posts": records, "ranked_by": metric}
+    if label:
+        data["period"] = label
+    return f"{title} by {metric.replace('_', ' ')}" + (f" in {label}" if label else "") + ":\n" + "\n".join(lines), data
+
+
+def _total_followers(sheets) -> Optional[Tuple[int, str]]:
+    """Follower count from the DISCOVERY sheet's "Total followers on <date>:" row."""
+    discovery = sheets.get("DISCOVERY")
+    if discovery is None or discovery.shape[1] < 2:
+        return None
+    for label, value in zip(discovery.iloc[:, 0].astype(str), pd.to_numeric(discovery.iloc[:, 1], errors="coerce")):
+        if "total followers" in label.lower() and pd.notna(value):
+            as_of = re.search(r"\bon\s+([^:]+)", label)
+            return int(value), as_of.group(1).strip() if as_of else "the end of the export"
+    return None
+
+
+def _total_metric(file: str, sheets, question: str) -> Tuple[str, Dict[str, Any]]:
+    q = question.lower()
+    if _UNSUPPORTED_TOTALS.search(q):
+        raise UnsupportedQuestion(f"unsupported metric in {question!r}")
+    if "follower" in q and not _FOLLOWER_GAINS.search(q):
+        followers = _total_followers(sheets)
+        if followers is not None:
+            total, as_of = followers
+            return f"You have {total:,} followers (as of {as_of}).", {"metric": "total_followers", "total": total, "as_of": as_of}
+
+    # Absolute date ranges are answered across every upload via the store
+    explicit = _explicit_range(q)
+    if explicit:
+        ingest_export(file)
+
+    if "follower" in q and "FOLLOWERS" in sheets:
+        if explicit:
+            start, end, label = explicit
+            df = query_table("followers", start, end).set_index("Date")["New followers"]
+        else:
+            df = sheets["FOLLOWERS"].dropna(subset=["Date"]).set_index("Date")["New followers"]
+            start, end, label = _parse_period(q, df.index.max())
+            if start is not None:
+                df = df[(df.index >= start) & (df.index <= end)]
+        total = int(pd.to_numeric(df, errors="coerce").sum())
+        return f"You gained {total:,} new followers in {label}.", {"metric": "new_followers", "total": total, "period": label}
+
+    metric = "Impressions" if "impression" in q else "Engagements"
+    if explicit:
+        start, end, label = explicit
+        daily = query_engagement(start, end)
+        if daily.empty:
+            return f"None of your uploaded exports cover {label}.", {"metric": metric.lower(), "period": label}
+    else:
+        daily = daily_engagement(sheets)
+        start, end, label = _parse_period(q, daily.index.max())
+        if start is not None:
+            daily = daily.loc[start:end]
+    total = int(daily[metric].sum())
+    return (
+        f"Total {metric.lower()} in {label}: {total:,} (over {len(daily)} days, {total / max(len(daily), 1):,.1f}/day).",
+        {"metric": metric.lower(), "total": total, "period": label, "days": int(len(daily))},
+    )
+
+
+def _top_audience(file: str, sheets, question: str) -> Tuple[str, Dict[str, Any]]:
+    q = question.lower()
+    if _PERIOD_CUE.search(q) or _explicit_range(q):
+        # Demographics are a snapshot, not a dated series
+        raise UnsupportedQuestion(f"audience for a period in {question!r}")
+    category = next((cat for token, cat in _AUDIENCE_CATEGORIES.items() if token in q), "Industries")
+    df = sheets["DEMOGRAPHICS"].copy()
+    df["Percentage"] = pd.to_numeric(df["Percentage"], errors="coerce")
+    df = df[df["Top Demographics"] == category].dropna(subset=["Percentage"]).sort_values("Percentage", ascending=False)
+    if df.empty:
+        return f"No '{category}' demographics were found in this export.", {}
+    top = df.iloc[0]
+    others = ", ".join(f"{row['Value']} ({row['Percentage'] * 100:.1f}%)" for _, row in df.iloc[1:3].iterrows())
+    answer = f"Your top audience {category.lower()}: {top['Value']} ({top['Percentage'] * 100:.1f}% of your audience)."
+    if others:
+        answer += f" Followed by {others}."
+    return answer, {
+        "category": category,
+        "top": [{"value": row["Value"], "pct": round(row["Percentage"] * 100, 2)} for _, row in df.head(3).iterrows()],
+    }
+
+
+def _growth(file: str, sheets, question: str) -> Tuple[str, Dict[str, Any]]:
+    q = question.lower()
+    if _UNSUPPORTED_GROWTH.search(q):
+        raise UnsupportedQuestion(f"growth of an unsupported metric in {question!r}")
+    if _NON_MONTHLY_PERIOD.search(q):
+        raise UnsupportedQuestion(f"growth over an unsupported period in {question!r}")
+    monthly = daily_engagement(sheets).resample("MS").sum()
+    # The last month is usually partial, so compare the last two complete months
+    if len(monthly) > 2:
+        monthly = monthly.iloc[:-1]
+    if len(monthly) < 2:
+        return "The export covers less than two months, so month-over-month growth is not available.", {}
+    prev, last = monthly.iloc[-2], monthly.iloc[-1]
+
+    def pct(new, old):
+        return None if old == 0 else round((new - old) / abs(old) * 100, 1)
+
+    eng, imp = pct(last["Engagements"], prev["Engagements"]), pct(last["Impressions"], prev["Impressions"])
+    month, prev_month = monthly.index[-1].strftime("%B %Y"), monthly.index[-2].strftime("%B %Y")
+    fmt = lambda v: "n/a" if v is None else f"{v:+.1f}%"
+    answer = (
+        f"{month} vs {prev_month}: engagements {int(last['Engagements']):,} ({fmt(eng)}), "
+        f"impressions {int(last['Impressions']):,} ({fmt(imp)})."
+    )
+    return answer, {"month": month, "previous_month": prev_month, "engagement_growth_pct": eng, "impression_growth_pct": imp}
+
+
+_HANDLERS = {
+    "best_post": _best_post,
+    "total_metric": _total_metric,
+    "top_audience": _top_audience,
+    "growth": _growth,
+}
+
+
+def answer_fast(file: str, question: str, narrate: bool = False, llm=None) -> Optional[Dict[str, Any]]:
+    """
+    Answer a common analytics question directly from the export.
+
+    Returns None when the question has no fast-path intent (or the data is
+    missing), in which case the caller should fall back to the LLM workflow.
+    """
+    intent = detect_intent(question)
+    if intent is None:
+        return None
+    try:
+        answer, data = _HANDLERS[intent](file, load_sheets(file), question)
+    except UnsupportedQuestion as e:
+        print(f"DEBUG: Fast path '{intent}' can't answer this, using the LLM: {e}")
+        return None
+    except Exception as e:
+        print(f"DEBUG: Fast path '{intent}' failed, falling back to LLM: {e}")
+        return None
+
+    if narrate and llm is not None:
+        try:
+            response = llm.invoke(
+                f"""Rewrite this LinkedIn analytics answer as 2-3 friendly sentences. Keep every number exactly as given.
+
+Question: {question}
+Answer: {answer}"""
+            )
+            answer = response.content if hasattr(response, "content") else str(response)
+        except Exception as e:
+            print(f"DEBUG: Fast path narration failed, returning templated answer: {e}")
+
+    return {"success": True, "analysis": answer, "analysis_type": "fast_path", "intent": intent, "data": data}
@@ -0,0 +1,229 @@
+"""
+Single-pass ingestion of LinkedIn analytics exports.
+
+The workbook is parsed once with ``sheet_name=None``, every sheet gets its
+header promoted and its types normalized (CSV exports are streamed into the
+same sheets by ``utils.analytics_csv``), and the result is persisted as
+Parquet under a directory named after the file's content hash. Loaders then
+read sheets from memory / Parquet instead of re-opening the XLSX.
+"""
+
+import importlib.util
+import os
+import shutil
+import threading
+from typing import Callable, Dict
+
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype, is_numeric_dtype
+
+from utils.analytics_csv import parse_csv_export
+from utils.hashing import file_sha256
+from utils.memo import MemoCache
+
+ANALYTICS_CACHE_DIR = os.getenv("ANALYTICS_CACHE_DIR", "./analytics_cache")
+
+# "auto" or one of XLSX_ENGINES (see select_engine)
+XLSX_ENGINE = os.getenv("ANALYTICS_XLSX_ENGINE", "auto")
+XLSX_LARGE_FILE_BYTES = int(os.getenv("ANALYTICS_XLSX_LARGE_FILE_BYTES", 1024 * 1024))
+
+# Row holding the column names for each known sheet (everything above it is
+# banner text such as "Maximum of 50 posts available to include in this list")
+SHEET_HEADER_ROWS = {
+    "DISCOVERY": 0,
+    "ENGAGEMENT": 0,
+    "TOP POSTS": 2,
+    "FOLLOWERS": 2,
+    "DEMOGRAPHICS": 0,
+}
+
+# Cell strings read_excel treats as missing (its default na_values)
+_NA_STRINGS = {"", "#N/A", "#N/A N/A", "#NA", "N/A", "NA", "NULL", "NaN", "nan", "null", "n/a", "None", "<NA>"}
+
+# Parsed workbooks by content hash; large exports fall back to Parquet on eviction
+_sheets_cache = MemoCache("analytics_sheets", ttl=None, max_bytes=512 * 1024 * 1024)
+_parse_locks_guard = threading.Lock()
+_parse_locks: Dict[str, threading.Lock] = {}
+
+
+def _promote_header(raw: pd.DataFrame, header_row: int) -> pd.DataFrame:
+    """Use ``header_row`` as column names, naming columns the way read_excel does."""
+    names, seen = [], {}
+    for i, value in enumerate(raw.iloc[header_row].tolist() if len(raw) > header_row else []):
+        name = f"Unnamed: {i}" if pd.isna(value) or str(value).strip() == "" else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+
+    df = raw.iloc[header_row + 1:].reset_index(drop=True)
+    df.columns = names or list(df.columns)
+    return df
+
+
+def _normalize_types(df: pd.DataFrame) -> pd.DataFrame:
+    """Coerce date-like columns to datetime, numeric columns to numbers, the rest to str."""
+    for col in df.columns:
+        series = df[col]
+        if is_numeric_dtype(series) or is_datetime64_any_dtype(series):
+            continue
+        if "date" in col.lower():
+            df[col] = pd.to_datetime(series, errors="coerce")
+            continue
+        numeric = pd.to_numeric(series, errors="coerce")
+        if numeric.notna().sum() == series.notna().sum():
+            # Whole-number cells become ints whichever engine read them (read_excel's behaviour)
+            if numeric.dtype.kind == "f" and numeric.notna().all() and (numeric % 1 == 0).all():
+                numeric = numeric.astype("int64")
+            df[col] = numeric
+        else:
+            df[col] = series.where(series.isna(), series.astype(str))
+    return df
+
+
+def _read_openpyxl(file: str) -> Dict[str, pd.DataFrame]:
+    return pd.read_excel(file, sheet_name=None, header=None, engine="openpyxl")
+
+
+def _read_openpyxl_readonly(file: str) -> Dict[str, pd.DataFrame]:
+    """Stream rows straight out of openpyxl's read-only mode, skipping pandas' cell conversion."""
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheets = {}
+        for worksheet in workbook.worksheets:
+            # Exports don't always carry reliable <dimension> info
+            worksheet.reset_dimensions()
+            raw = pd.DataFrame(list(worksheet.iter_rows(values_only=True)))
+            raw = raw.mask(raw.isin(_NA_STRINGS))
+            # Trailing empty columns are dropped, as read_excel does
+            filled = raw.notna().any().to_numpy().nonzero()[0]
+            sheets[worksheet.title] = raw.iloc[:, : filled[-1] + 1] if len(filled) else raw
+        return sheets
+    finally:
+        workbook.close()
+
+
+def _read_calamine(file: str) -> Dict[str, pd.DataFrame]:
+    return pd.read_excel(file, sheet_name=None, header=None, engine="calamine")
+
+
+XLSX_ENGINES: Dict[str, Callable[[str], Dict[str, pd.DataFrame]]] = {
+    "openpyxl": _read_openpyxl,
+    "openpyxl_readonly": _read_openpyxl_readonly,
+    "calamine": _read_calamine,
+}
+
+
+def available_engines() -> list:
+    """XLSX engines usable in this environment (calamine is optional)."""
+    engines = ["openpyxl", "openpyxl_readonly"]
+    if importlib.util.find_spec("python_calamine") is not None:
+        engines.append("calamine")
+    return engines
+
+
+def select_engine(file: str) -> str:
+    """
+    Configured engine, or the fastest available one: calamine when installed,
+    otherwise the streaming openpyxl reader for files above the size threshold
+    (see benchmarks/bench_xlsx_engines.py).
+    """
+    engines = available_engines()
+    if XLSX_ENGINE != "auto":
+        if XLSX_ENGINE not in engines:
+            raise ValueError(f"XLSX engine '{XLSX_ENGINE}' is not available; choose from {engines}")
+        return XLSX_ENGINE
+    if "calamine" in engines:
+        return "calamine"
+    return "openpyxl_readonly" if os.path.getsize(file) >= XLSX_LARGE_FILE_BYTES else "openpyxl"
+
+
+def _parse_workbook(file: str, engine: str = None) -> Dict[str, pd.DataFrame]:
+    engine = engine or select_engine(file)
+    print(f"DEBUG: Reading {file} with the {engine} engine")
+    raw_sheets = XLSX_ENGINES[engine](file)
+    sheets = {}
+    for name, raw in raw_sheets.items():
+        df = _promote_header(raw, SHEET_HEADER_ROWS.get(name, 0))
+        df = df.dropna(how="all")
+        sheets[name] = _normalize_types(df)
+    return sheets
+
+
+def _cache_dir(digest: str) -> str:
+    return os.path.join(ANALYTICS_CACHE_DIR, digest)
+
+
+def _read_parquet_cache(digest: str):
+    directory = _cache_dir(digest)
+    if not os.path.isdir(directory):
+        return None
+    try:
+        return {
+            name[: -len(".parquet")]: pd.read_parquet(os.path.join(directory, name))
+            for name in os.listdir(directory)
+            if name.endswith(".parquet")
+        } or None
+    except Exception as e:
+        print(f"DEBUG: Ignoring unreadable analytics cache {directory}: {e}")
+        return None
+
+
+def _write_parquet_cache(digest: str, sheets: Dict[str, pd.DataFrame]) -> None:
+    directory = _cache_dir(digest)
+    tmp_dir = f"{directory}.tmp-{os.getpid()}-{threading.get_ident()}"
+    try:
+        os.makedirs(tmp_dir, exist_ok=True)
+        for name, df in sheets.items():
+            df.to_parquet(os.path.join(tmp_dir, f"{name}.parquet"), index=False)
+        os.replace(tmp_dir, directory)
+    except Exception as e:
+        print(f"DEBUG: Could not persist analytics cache for {digest[:12]}: {e}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def load_sheets(file: str) -> Dict[str, pd.DataFrame]:
+    """
+    Return every sheet of an analytics export as normalized DataFrames.
+
+    Parsed at most once per file content: results are served from memory,
+    then from the Parquet cache, and only then from the workbook itself.
+    The returned frames are shared, so callers must copy before mutating
+    (or use ``get_sheet``).
+    """
+    digest = file_sha256(file)
+    sheets = _sheets_cache.get(digest)
+    if sheets is not None:
+        return sheets
+    with _parse_locks_guard:
+        parse_lock = _parse_locks.setdefault(digest, threading.Lock())
+
+    # One parse per digest even when several loaders ask at the same time
+    with parse_lock:
+        sheets = _sheets_cache.get(digest)
+        if sheets is not None:
+            return sheets
+
+        sheets = _read_parquet_cache(digest)
+        if sheets is not None:
+            print(f"DEBUG: Analytics sheets for {digest[:12]} served from Parquet cache")
+        else:
+            print(f"DEBUG: Parsing analytics export {file}")
+            # CSV exports are streamed in chunks; workbooks are parsed in one pass
+            sheets = parse_csv_export(file) if file.lower().endswith(".csv") else _parse_workbook(file)
+            _write_parquet_cache(digest, sheets)
+
+        _sheets_cache.set(digest, sheets)
+        return sheets
+
+
+def get_sheet(file: str, sheet_name: str) -> pd.DataFrame:
+    """Return a private copy of one normalized sheet."""
+    sheets = load_sheets(file)
+    if sheet_name not in sheets:
+        raise ValueError(f"Worksheet named '{sheet_name}' not found")
+    return sheets[sheet_name].copy()
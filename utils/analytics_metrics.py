@@ -0,0 +1,333 @@
+"""
+Vectorized engagement metrics over the cached analytics sheets.
+
+``compute_metric_summary`` turns an export of any length into a compact,
+fixed-size dict (bounded lists only) that is small enough to hand to the LLM
+instead of raw sheet records.
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.analytics_ingest import load_sheets
+from utils.columnar import Columns
+from utils.downsample import SERIES_POINTS, downsample_series
+from utils.memo import memoize
+
+TOP_N = 5
+ANOMALY_Z = 3.5
+DAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+def _round(value: Any, digits: int = 2) -> Optional[float]:
+    if value is None or pd.isna(value) or np.isinf(value):
+        return None
+    return round(float(value), digits)
+
+
+def _find_col(df: pd.DataFrame, *tokens: str, exclude_suffix: bool = False) -> Optional[str]:
+    for col in df.columns:
+        name = str(col).strip().lower()
+        if exclude_suffix and name.endswith(".1"):
+            continue
+        if any(token in name for token in tokens):
+            return col
+    return None
+
+
+def daily_engagement(sheets: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """ENGAGEMENT sheet as a gap-free daily series indexed by date."""
+    df = sheets["ENGAGEMENT"][["Date", "Impressions", "Engagements"]].copy()
+    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+    df = df.dropna(subset=["Date"])
+    df[["Impressions", "Engagements"]] = df[["Impressions", "Engagements"]].apply(pd.to_numeric, errors="coerce")
+    daily = df.groupby("Date")[["Impressions", "Engagements"]].sum().sort_index()
+    return daily.asfreq("D", fill_value=0)
+
+
+def post_table(sheets: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    One row per post with url, published, engagements and impressions.
+
+    The XLSX TOP POSTS sheet holds two side-by-side rankings (by engagements
+    and by impressions) which are outer-joined on the post URL.
+    """
+    df = sheets.get("TOP POSTS")
+    if df is None or df.empty:
+        return pd.DataFrame(columns=["url", "published", "engagements", "impressions"])
+
+    url_col = _find_col(df, "url", exclude_suffix=True)
+    date_col = _find_col(df, "date", exclude_suffix=True)
+    eng_col = _find_col(df, "engagement", exclude_suffix=True)
+    imp_col = _find_col(df, "impression", exclude_suffix=True)
+    right_url = f"{url_col}.1" if url_col and f"{url_col}.1" in df.columns else None
+
+    left = pd.DataFrame({
+        "url": df[url_col] if url_col else None,
+        "published": df[date_col] if date_col else pd.NaT,
+        "engagements": pd.to_numeric(df[eng_col], errors="coerce") if eng_col else np.nan,
+    })
+    if right_url and imp_col:
+        right_date = f"{date_col}.1" if date_col and f"{date_col}.1" in df.columns else None
+        right = pd.DataFrame({
+            "url": df[right_url],
+            "published_r": df[right_date] if right_date else pd.NaT,
+            "impressions": pd.to_numeric(df[imp_col], errors="coerce"),
+        })
+        left = left.dropna(subset=["url"]).drop_duplicates("url")
+        right = right.dropna(subset=["url"]).drop_duplicates("url")
+        posts = left.merge(right, on="url", how="outer")
+        posts["published"] = posts["published"].fillna(posts.pop("published_r"))
+    else:
+        left["impressions"] = pd.to_numeric(df[imp_col], errors="coerce") if imp_col else np.nan
+        posts = left.dropna(subset=["url"]).drop_duplicates("url")
+
+    posts["published"] = pd.to_datetime(posts["published"], errors="coerce")
+    return posts.reset_index(drop=True)
+
+
+def _trend_metrics(daily: pd.DataFrame) -> Dict[str, Any]:
+    impressions = daily["Impressions"].to_numpy(dtype=float)
+    engagements = daily["Engagements"].to_numpy(dtype=float)
+    rate = np.divide(engagements, impressions, out=np.full_like(engagements, np.nan), where=impressions > 0)
+    daily = daily.assign(rate=rate)
+
+    rolling = {}
+    for window in (7, 28):
+        means = daily.rolling(window, min_periods=1).mean().iloc[-1]
+        rolling[f"{window}d"] = {
+            "avg_impressions": _round(means["Impressions"]),
+            "avg_engagements": _round(means["Engagements"]),
+            "avg_engagement_rate_pct": _round(means["rate"] * 100),
+        }
+
+    weekly = daily[["Impressions", "Engagements"]].resample("W").sum()
+    growth = weekly.pct_change().replace([np.inf, -np.inf], np.nan) * 100
+    recent_weeks = [
+        {
+            "week_ending": idx.strftime("%Y-%m-%d"),
+            "impressions": int(row["Impressions"]),
+            "engagements": int(row["Engagements"]),
+            "impressions_wow_pct": _round(growth.loc[idx, "Impressions"]),
+            "engagements_wow_pct": _round(growth.loc[idx, "Engagements"]),
+        }
+        for idx, row in weekly.tail(4).iterrows()
+    ]
+
+    by_dow = daily.groupby(daily.index.dayofweek)[["Impressions", "Engagements", "rate"]].mean()
+    dow_heatmap = {
+        DAY_NAMES[int(dow)]: {
+            "avg_impressions": _round(row["Impressions"]),
+            "avg_engagements": _round(row["Engagements"]),
+            "avg_engagement_rate_pct": _round(row["rate"] * 100),
+        }
+        for dow, row in by_dow.iterrows()
+    }
+
+    # Robust z-score against a trailing 28-day median/MAD
+    median = daily["Engagements"].rolling(28, min_periods=7).median()
+    mad = (daily["Engagements"] - median).abs().rolling(28, min_periods=7).median()
+    z = 0.6745 * (daily["Engagements"] - median) / mad.replace(0, np.nan)
+    flagged = z[z.abs() >= ANOMALY_Z].dropna()
+    anomalies = [
+        {
+            "date": idx.strftime("%Y-%m-%d"),
+            "engagements": int(daily.loc[idx, "Engagements"]),
+            "z_score": _round(score),
+            "type": "spike" if score > 0 else "drop",
+        }
+        for idx, score in flagged.reindex(flagged.abs().sort_values(ascending=False).index).head(TOP_N).items()
+    ]
+
+    total_impressions = float(impressions.sum())
+    total_engagements = float(engagements.sum())
+    return {
+        "period": {
+            "start": daily.index.min().strftime("%Y-%m-%d"),
+            "end": daily.index.max().strftime("%Y-%m-%d"),
+            "days": int(len(daily)),
+        },
+        "totals": {
+            "impressions": int(total_impressions),
+            "engagements": int(total_engagements),
+            "engagement_rate_pct": _round(total_engagements / total_impressions * 100) if total_impressions else None,
+        },
+        "rolling": rolling,
+        "recent_weeks": recent_weeks,
+        "day_of_week": dow_heatmap,
+        "best_day_of_week": DAY_NAMES[int(by_dow["Engagements"].idxmax())] if not by_dow.empty else None,
+        "anomalies": {"count": int(len(flagged)), "top": anomalies},
+    }
+
+
+def _post_metrics(posts: pd.DataFrame) -> Dict[str, Any]:
+    if posts.empty:
+        return {"count": 0, "top": [], "hour_of_day": None}
+
+    posts = posts.copy()
+    posts["engagement_rate"] = posts["engagements"] / posts["impressions"].where(posts["impressions"] > 0)
+    for col in ("engagements", "impressions", "engagement_rate"):
+        posts[f"{col}_pctile"] = posts[col].rank(pct=True) * 100
+
+    top = posts.sort_values(["engagements", "impressions"], ascending=False).head(TOP_N)
+    top_posts = [
+        {
+            "url": row["url"],
+            "published": row["published"].strftime("%Y-%m-%d") if pd.notna(row["published"]) else None,
+            "engagements": _round(row["engagements"], 0),
+            "impressions": _round(row["impressions"], 0),
+            "engagement_rate_pct": _round(row["engagement_rate"] * 100),
+            "engagements_pctile": _round(row["engagements_pctile"], 0),
+            "impressions_pctile": _round(row["impressions_pctile"], 0),
+        }
+        for _, row in top.iterrows()
+    ]
+
+    # Exports are usually day-granular; only report hours when timestamps carry them
+    hour_of_day = None
+    published = posts["published"].dropna()
+    if not published.empty and (published.dt.hour != 0).any():
+        by_hour = posts.groupby(posts["published"].dt.hour)["engagements"].mean().nlargest(3)
+        hour_of_day = {int(hour): _round(value) for hour, value in by_hour.items()}
+
+    by_dow = posts.groupby(posts["published"].dt.dayofweek)["engagements"].mean()
+    return {
+        "count": int(len(posts)),
+        "median_engagements": _round(posts["engagements"].median()),
+        "median_impressions": _round(posts["impressions"].median()),
+        "median_engagement_rate_pct": _round(posts["engagement_rate"].median() * 100),
+        "best_publish_day": DAY_NAMES[int(by_dow.idxmax())] if not by_dow.empty else None,
+        "hour_of_day": hour_of_day,
+        "top": top_posts,
+    }
+
+
+def _audience_metrics(sheets: Dict[str, pd.DataFrame]) -> Dict[str, List[Dict[str, Any]]]:
+    df = sheets.get("DEMOGRAPHICS")
+    if df is None or df.empty:
+        return {}
+    df = df.copy()
+    df["Percentage"] = pd.to_numeric(df["Percentage"], errors="coerce")
+    df = df.dropna(subset=["Percentage"]).sort_values("Percentage", ascending=False)
+    return {
+        category: [
+            {"value": row["Value"], "pct": _round(row["Percentage"] * 100)}
+            for _, row in group.head(3).iterrows()
+        ]
+        for category, group in df.groupby("Top Demographics", sort=False)
+    }
+
+
+def _follower_metrics(sheets: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
+    followers = {}
+    df = sheets.get("FOLLOWERS")
+    if df is not None and "New followers" in df.columns:
+        new = pd.to_numeric(df["New followers"], errors="coerce")
+        followers["new_followers"] = int(new.sum())
+        followers["avg_new_per_day"] = _round(new.mean())
+    discovery = sheets.get("DISCOVERY")
+    if discovery is not None and discovery.shape[1] >= 2:
+        labels = discovery.iloc[:, 0].astype(str).str.lower()
+        values = pd.to_numeric(discovery.iloc[:, 1], errors="coerce")
+        for label, value in zip(labels, values):
+            if "members reached" in label:
+                followers["members_reached"] = _round(value, 0)
+            elif "total followers" in label:
+                followers["total_followers"] = _round(value, 0)
+    return followers
+
+
+def engagement_series(sheets: Dict[str, pd.DataFrame], points: int = SERIES_POINTS) -> Dict[str, Any]:
+    """Daily impressions/engagements downsampled to at most ``points`` (LTTB + peaks/troughs)."""
+    daily = daily_engagement(sheets)
+    sampled = downsample_series(daily, points, columns=["Impressions", "Engagements"])
+    return {
+        "total_days": int(len(daily)),
+        "points": int(len(sampled)),
+        "dates": [d.strftime("%Y-%m-%d") for d in sampled.index],
+        "impressions": [int(v) for v in sampled["Impressions"]],
+        "engagements": [int(v) for v in sampled["Engagements"]],
+    }
+
+
+def summarize_sheets(sheets: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
+    """Compute the fixed-size metric summary from already loaded sheets."""
+    summary: Dict[str, Any] = {}
+    if "ENGAGEMENT" in sheets:
+        summary.update(_trend_metrics(daily_engagement(sheets)))
+        summary["series"] = engagement_series(sheets)
+    summary["posts"] = _post_metrics(post_table(sheets))
+    summary["audience"] = _audience_metrics(sheets)
+    summary["followers"] = _follower_metrics(sheets)
+    return summary
+
+
+def month_partitions(sheets: Dict[str, pd.DataFrame]) -> List[Dict[str, Any]]:
+    """
+    Split an export into calendar months for map-reduce analysis.
+
+    Each partition carries the month's totals, its daily rows and the posts
+    published in it, so it can be summarized independently of the others.
+    """
+    daily = daily_engagement(sheets) if "ENGAGEMENT" in sheets else pd.DataFrame(columns=["Impressions", "Engagements"])
+    posts = post_table(sheets)
+    followers = sheets.get("FOLLOWERS")
+    new_followers = pd.Series(dtype=float)
+    if followers is not None and {"Date", "New followers"} <= set(followers.columns):
+        new_followers = pd.to_numeric(
+            followers.set_index(pd.to_datetime(followers["Date"], errors="coerce"))["New followers"], errors="coerce"
+        )
+        new_followers = new_followers[new_followers.index.notna()]
+
+    partitions = []
+    for month, rows in daily.groupby(daily.index.to_period("M")):
+        impressions, engagements = rows["Impressions"].sum(), rows["Engagements"].sum()
+        month_posts = posts[posts["published"].dt.to_period("M") == month] if not posts.empty else posts
+        month_followers = new_followers[new_followers.index.to_period("M") == month] if len(new_followers) else new_followers
+        partitions.append({
+            "month": str(month),
+            "totals": {
+                "days": int(len(rows)),
+                "impressions": int(impressions),
+                "engagements": int(engagements),
+                "engagement_rate_pct": _round(engagements / impressions * 100) if impressions else None,
+                "new_followers": int(month_followers.sum()) if len(month_followers) else None,
+            },
+            "daily": Columns.from_frame(rows.reset_index(names="Date")),
+            "posts": Columns.from_frame(month_posts.sort_values("engagements", ascending=False)),
+        })
+    return partitions
+
+
+@memoize(ttl=3600)
+def load_month_partitions(file: str) -> List[Dict[str, Any]]:
+    """Monthly partitions of an analytics export (see ``month_partitions``)."""
+    return month_partitions(load_sheets(file))
+
+
+@memoize(ttl=3600)
+def compute_metric_summary(file: str) -> Dict[str, Any]:
+    """Compact engagement/post/audience metrics for an analytics export."""
+    try:
+        return summarize_sheets(load_sheets(file))
+    except Exception as e:
+        print("Could not compute metric summary", e)
+        return {"error": f"Failed to compute metric summary: {str(e)}"}
+
+
+@memoize(ttl=3600)
+def load_engagement_series(file: str, points: int = SERIES_POINTS) -> Dict[str, Any]:
+    """Chart-ready, bounded-size engagement series for an analytics export."""
+    try:
+        return engagement_series(load_sheets(file), points)
+    except Exception as e:
+        print("Could not build engagement series", e)
+        return {"error": f"Failed to build engagement series: {str(e)}"}
+
+
+def summary_to_prompt(summary: Dict[str, Any]) -> str:
+    """Serialize a metric summary compactly for inclusion in an LLM prompt."""
+    return json.dumps(summary, separators=(",", ":"), default=str)
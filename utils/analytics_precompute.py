@@ -0,0 +1,208 @@
+"""
+Background precomputation of analytics for freshly uploaded exports.
+
+When an export lands in ``UPLOAD_DIR`` a job is queued that parses every
+sheet, merges it into the analytics store and computes the metric summary.
+Optionally it also retrains the local engagement model when the export added
+new data (``ANALYTICS_PRECOMPUTE_TRAIN_MODEL``), pre-scrapes the top posts and
+pre-generates the general report (stored under the question-independent
+``GENERAL_REPORT_QUESTION`` key that answers the default report request).
+All results land in the existing caches, so the first ``profile_analytics``
+question about the file is served from precomputed data.
+
+Interactive requests only wait for the parse/ingest/metrics stage of a job
+(``wait_for_precompute``). Scraping, training and the report run on a separate
+background executor, so they never delay that stage for later uploads.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from utils.analytics_ingest import load_sheets
+from utils.analytics_metrics import compute_metric_summary, post_table
+from utils.analytics_result_cache import GENERAL_REPORT_QUESTION
+from utils.analytics_store import ingest_export
+from utils.engagement_model import ENGAGEMENT_MODEL_PATH, train_engagement_model
+from utils.hashing import file_sha256
+from utils.uploads import ALLOWED_EXTENSIONS, UPLOAD_DIR
+
+PRECOMPUTE_SCRAPE_TOP_POSTS = int(os.getenv("ANALYTICS_PRECOMPUTE_SCRAPE_TOP_POSTS", "0"))
+PRECOMPUTE_REPORT = os.getenv("ANALYTICS_PRECOMPUTE_REPORT", "false").lower() in ("1", "true", "yes")
+PRECOMPUTE_TRAIN_MODEL = os.getenv("ANALYTICS_PRECOMPUTE_TRAIN_MODEL", "false").lower() in ("1", "true", "yes")
+PRECOMPUTE_WORKERS = int(os.getenv("ANALYTICS_PRECOMPUTE_WORKERS", "1"))
+PRECOMPUTE_BACKGROUND_WORKERS = int(os.getenv("ANALYTICS_PRECOMPUTE_BACKGROUND_WORKERS", "1"))
+
+# Parse/ingest/metrics only, so a new upload's metrics never queue behind slow work
+_executor = ThreadPoolExecutor(max_workers=PRECOMPUTE_WORKERS, thread_name_prefix="analytics-precompute")
+# Scraping, model training and report generation
+_background_executor = ThreadPoolExecutor(
+    max_workers=PRECOMPUTE_BACKGROUND_WORKERS, thread_name_prefix="analytics-precompute-background"
+)
+_jobs: Dict[str, Dict[str, Any]] = {}
+_jobs_lock = threading.Lock()
+
+
+def _finish(job: Dict[str, Any], file: str, error: Optional[Exception] = None) -> None:
+    if error is not None:
+        print(f"DEBUG: Analytics precompute failed for {file}: {error}")
+        job["error"] = str(error)
+    job["status"] = "failed" if error is not None else "done"
+    job["finished_at"] = time.time()
+    job["ready"].set()
+
+
+def _run_job(file: str, digest: str, scrape_top_posts: int, generate_report: bool) -> None:
+    """Parse, ingest and summarize; anything slower is handed to the background executor."""
+    job = _jobs[digest]
+    job["status"] = "running"
+    job["started_at"] = time.time()
+    try:
+        sheets = load_sheets(file)
+        job["steps"].append("parse")
+        ingested = ingest_export(file)
+        job["steps"].append("ingest")
+        compute_metric_summary(file)
+        job["steps"].append("metrics")
+    except Exception as e:
+        _finish(job, file, e)
+        return
+    # Everything an interactive request needs is cached now
+    job["ready"].set()
+
+    # Retrain as new exports arrive (or until a first model could be trained)
+    new_export = ingested.get("ingested_at", 0) >= job["started_at"]
+    train = PRECOMPUTE_TRAIN_MODEL and (new_export or not os.path.exists(ENGAGEMENT_MODEL_PATH))
+    if scrape_top_posts or train or generate_report:
+        job["background"] = _background_executor.submit(
+            _run_background, file, job, sheets, scrape_top_posts, train, generate_report
+        )
+    else:
+        _finish(job, file)
+
+
+def _run_background(
+    file: str, job: Dict[str, Any], sheets, scrape_top_posts: int, train: bool, generate_report: bool
+) -> None:
+    """Scraping, training and the report, kept off the executor that later uploads' metrics need."""
+    try:
+        if scrape_top_posts:
+            from tools.post_analyticsTool import get_linkedin_post
+
+            posts = post_table(sheets).sort_values(["engagements", "impressions"], ascending=False)
+            for url in posts["url"].head(scrape_top_posts):
+                get_linkedin_post(url)
+            job["steps"].append("scrape")
+
+        if train:
+            from tools.post_analyticsTool import get_linkedin_post
+
+            # Posts of every ingested export; only texts not stored yet are scraped
+            if train_engagement_model(get_linkedin_post):
+                job["steps"].append("train")
+
+        if generate_report:
+            # Imported lazily: the graph module pulls in the LLM stack
+            from agents.linkedinAnalyticsGraph import get_analytics_graph
+            from utils.llm_scheduler import BACKGROUND, llm_priority
+
+            # Report generation must not hold up interactive LLM calls
+            with llm_priority(BACKGROUND):
+                get_analytics_graph().analyze(file, GENERAL_REPORT_QUESTION)
+            job["steps"].append("report")
+    except Exception as e:
+        _finish(job, file, e)
+        return
+    _finish(job, file)
+
+
+def enqueue_precompute(
+    file: str,
+    scrape_top_posts: Optional[int] = None,
+    generate_report: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """Queue precomputation for an export; returns the (possibly existing) job status."""
+    digest = file_sha256(file)
+    with _jobs_lock:
+        job = _jobs.get(digest)
+        if job and job["status"] != "failed":
+            return precompute_status(file)
+        job = {
+            "file": file, "status": "queued", "steps": [], "queued_at": time.time(), "error": None,
+            "ready": threading.Event(),
+        }
+        _jobs[digest] = job
+        job["future"] = _executor.submit(
+            _run_job,
+            file,
+            digest,
+            PRECOMPUTE_SCRAPE_TOP_POSTS if scrape_top_posts is None else scrape_top_posts,
+            PRECOMPUTE_REPORT if generate_report is None else generate_report,
+        )
+    print(f"DEBUG: Queued analytics precompute for {file}")
+    return precompute_status(file)
+
+
+def wait_for_precompute(file: str, timeout: float = 30.0) -> bool:
+    """
+    Block until an in-flight job for this export has cached its parsed sheets
+    and metric summary; True if they are ready. Scraping, training and report
+    generation keep running in the background.
+    """
+    try:
+        job = _jobs.get(file_sha256(file))
+    except OSError:
+        return False
+    if not job:
+        return False
+    job["ready"].wait(timeout)
+    return "metrics" in job["steps"]
+
+
+def precompute_status(file: Optional[str] = None) -> Dict[str, Any]:
+    """Status of one export's job, or of every job when no file is given."""
+    def public(job):
+        return {k: v for k, v in job.items() if k not in ("future", "background", "ready")}
+
+    if file is None:
+        with _jobs_lock:
+            return {digest: public(job) for digest, job in _jobs.items()}
+    job = _jobs.get(file_sha256(file))
+    return public(job) if job else {"file": file, "status": "not_queued"}
+
+
+class UploadWatcher(threading.Thread):
+    """Polls the upload directory and queues precomputation for new or changed exports."""
+
+    def __init__(self, directory: str = UPLOAD_DIR, interval: float = 5.0):
+        super().__init__(name="analytics-upload-watcher", daemon=True)
+        self.directory = directory
+        self.interval = interval
+        self._seen: Dict[str, float] = {}
+        self._stop_event = threading.Event()
+
+    def scan(self) -> None:
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not name.lower().endswith(ALLOWED_EXTENSIONS) or not os.path.isfile(path):
+                continue
+            mtime = os.path.getmtime(path)
+            if self._seen.get(path) == mtime:
+                continue
+            self._seen[path] = mtime
+            try:
+                enqueue_precompute(path)
+            except OSError as e:
+                print(f"DEBUG: Could not queue precompute for {path}: {e}")
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            self.scan()
+            self._stop_event.wait(self.interval)
+
+    def stop(self) -> None:
+        self._stop_event.set()
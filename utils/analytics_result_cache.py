@@ -0,0 +1,127 @@
+"""
+Disk-backed cache of analytics workflow results.
+
+Entries are keyed by (workbook content hash, routed analysis type,
+normalized question) and expire after ``ANALYTICS_RESULT_TTL`` seconds. An
+entry is also dropped once a newer export (one whose data ends later) has been
+ingested into the analytics store after the entry was written.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from utils.analytics_ingest import ANALYTICS_CACHE_DIR
+from utils.analytics_store import load_manifest
+from utils.hashing import file_sha256
+
+RESULT_CACHE_DIR = os.path.join(ANALYTICS_CACHE_DIR, "results")
+ANALYTICS_RESULT_TTL = float(os.getenv("ANALYTICS_RESULT_TTL", 24 * 3600))
+
+# Question-independent key of the general report (pre-generated on upload); it
+# answers only requests for the general report itself (empty or the default request)
+GENERAL_REPORT_QUESTION = ""
+DEFAULT_REPORT_REQUEST = "Give me a strategy from the analytics."
+
+_stats = {"hits": 0, "misses": 0, "expired": 0, "superseded": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(*keys: str) -> None:
+    with _stats_lock:
+        for key in keys:
+            _stats[key] += 1
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    question = re.sub(r"[^\w\s]", " ", (question or "").lower())
+    return " ".join(question.split())
+
+
+def is_general_report_request(question: str) -> bool:
+    """True for an empty question or the default report request."""
+    return normalize_question(question) in (GENERAL_REPORT_QUESTION, normalize_question(DEFAULT_REPORT_REQUEST))
+
+
+def _entry_path(digest: str, analysis_type: str, question: str) -> str:
+    key = hashlib.sha256(f"{digest}|{analysis_type}|{normalize_question(question)}".encode()).hexdigest()
+    return os.path.join(RESULT_CACHE_DIR, f"{key}.json")
+
+
+def _is_superseded(entry: Dict[str, Any]) -> bool:
+    manifest = load_manifest()
+    own = manifest.get(entry["file_hash"])
+    if own is None:
+        # Its export was never ingested (or the store was reset): nothing to compare against
+        return False
+    own_end = own.get("end") or ""
+    return any(
+        other.get("end") and other["end"] > own_end and other.get("ingested_at", 0) > entry["created_at"]
+        for digest, other in manifest.items()
+        if digest != entry["file_hash"]
+    )
+
+
+def get_cached_result(file: str, analysis_type: str, question: str) -> Optional[Dict[str, Any]]:
+    """Cached workflow result, or None on miss/expiry/supersession."""
+    path = _entry_path(file_sha256(file), analysis_type, question)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        _count("misses")
+        return None
+
+    reason = None
+    if entry["expires_at"] < time.time():
+        reason = "expired"
+    elif _is_superseded(entry):
+        reason = "superseded"
+    if reason:
+        _count(reason, "misses")
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+
+    _count("hits")
+    return entry["result"]
+
+
+def put_cached_result(file: str, analysis_type: str, question: str, result: Dict[str, Any]) -> None:
+    """Persist a successful workflow result."""
+    if not result.get("success"):
+        return
+    digest = file_sha256(file)
+    now = time.time()
+    entry = {
+        "file_hash": digest,
+        "analysis_type": analysis_type,
+        "question": normalize_question(question),
+        "created_at": now,
+        "expires_at": now + ANALYTICS_RESULT_TTL,
+        "result": result,
+    }
+    path = _entry_path(digest, analysis_type, question)
+    try:
+        os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+        # A unique temp file per writer, so concurrent writers of one key never publish a partial file
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=RESULT_CACHE_DIR, suffix=".tmp", delete=False) as f:
+            json.dump(entry, f)
+        os.replace(f.name, path)
+    except Exception as e:
+        print(f"DEBUG: Could not persist analytics result: {e}")
+
+
+def result_cache_stats() -> Dict[str, Any]:
+    entries = len([n for n in os.listdir(RESULT_CACHE_DIR) if n.endswith(".json")]) if os.path.isdir(RESULT_CACHE_DIR) else 0
+    with _stats_lock:
+        stats = dict(_stats)
+    return {**stats, "entries": entries, "ttl": ANALYTICS_RESULT_TTL}
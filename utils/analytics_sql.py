@@ -0,0 +1,150 @@
+"""
+Read-only SQL over the normalized export tables (DuckDB, optional).
+
+Ad-hoc questions ("which weekday gets most impressions for posts with >500
+engagements?") are answered by one LLM-written SELECT instead of dumping raw
+records into the prompt. Every query runs on a fresh in-memory DuckDB
+connection that only sees the registered DataFrames: file system access and
+configuration changes are disabled, only a single SELECT/WITH statement is
+accepted, results are capped at ``SQL_MAX_ROWS`` and long queries are
+interrupted after ``SQL_TIMEOUT`` seconds.
+"""
+
+import os
+import re
+import threading
+from typing import Any, Dict, Union
+
+import pandas as pd
+
+from utils.analytics_ingest import load_sheets
+from utils.analytics_metrics import daily_engagement, post_table
+from utils.analytics_store import query_engagement
+from utils.columnar import Columns
+
+try:
+    import duckdb
+except ImportError:  # optional dependency
+    duckdb = None
+
+SQL_MAX_ROWS = int(os.getenv("ANALYTICS_SQL_MAX_ROWS", 50))
+SQL_TIMEOUT = float(os.getenv("ANALYTICS_SQL_TIMEOUT", 10))
+
+_FORBIDDEN = re.compile(
+    r"\b(attach|detach|copy|export|import|install|load|pragma|set|reset|call|create|insert|update|delete|"
+    r"drop|alter|truncate|checkpoint|vacuum|use)\b",
+    re.IGNORECASE,
+)
+
+# table -> description shown to the LLM next to its columns
+TABLE_DESCRIPTIONS = {
+    "engagement": "one row per day of this export",
+    "posts": "one row per top post of this export",
+    "followers": "new followers per day of this export",
+    "demographics": "audience share per category/value (percentage is a 0-1 fraction)",
+    "engagement_history": "one row per day across ALL uploaded exports",
+}
+
+
+def sql_available() -> bool:
+    return duckdb is not None
+
+
+def _tables(file: str) -> Dict[str, pd.DataFrame]:
+    sheets = load_sheets(file)
+    tables = {}
+    if "ENGAGEMENT" in sheets:
+        daily = daily_engagement(sheets)
+        tables["engagement"] = pd.DataFrame({
+            "date": daily.index,
+            "impressions": daily["Impressions"].to_numpy(),
+            "engagements": daily["Engagements"].to_numpy(),
+        })
+    posts = post_table(sheets)
+    if not posts.empty:
+        tables["posts"] = posts.assign(
+            published=pd.to_datetime(posts["published"], errors="coerce"),
+            weekday=pd.to_datetime(posts["published"], errors="coerce").dt.day_name(),
+        )
+    followers = sheets.get("FOLLOWERS")
+    if followers is not None and {"Date", "New followers"} <= set(followers.columns):
+        tables["followers"] = pd.DataFrame({
+            "date": pd.to_datetime(followers["Date"], errors="coerce"),
+            "new_followers": pd.to_numeric(followers["New followers"], errors="coerce"),
+        }).dropna(subset=["date"])
+    demographics = sheets.get("DEMOGRAPHICS")
+    if demographics is not None and {"Top Demographics", "Value", "Percentage"} <= set(demographics.columns):
+        tables["demographics"] = pd.DataFrame({
+            "category": demographics["Top Demographics"],
+            "value": demographics["Value"],
+            "percentage": pd.to_numeric(demographics["Percentage"], errors="coerce"),
+        })
+    history = query_engagement()
+    if not history.empty:
+        tables["engagement_history"] = pd.DataFrame({
+            "date": history.index,
+            "impressions": history["Impressions"].to_numpy(),
+            "engagements": history["Engagements"].to_numpy(),
+        })
+    return tables
+
+
+def schema_hint(file: str) -> str:
+    """Tables, column types and row counts, formatted for an LLM prompt."""
+    lines = []
+    for name, df in _tables(file).items():
+        columns = ", ".join(f"{col} {_sql_type(df[col])}" for col in df.columns)
+        lines.append(f"- {name}({columns}) -- {TABLE_DESCRIPTIONS[name]}, {len(df)} rows")
+    return "\n".join(lines)
+
+
+def _sql_type(series: pd.Series) -> str:
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "DATE"
+    if pd.api.types.is_integer_dtype(series):
+        return "BIGINT"
+    if pd.api.types.is_numeric_dtype(series):
+        return "DOUBLE"
+    return "VARCHAR"
+
+
+def validate_query(query: str) -> str:
+    """Return the query without trailing semicolons, or raise ValueError if it isn't a single read-only SELECT."""
+    # Strip a ```sql fence the LLM may have added
+    query = re.sub(r"^```(?:sql)?\s*|\s*```$", "", (query or "").strip(), flags=re.IGNORECASE)
+    query = query.strip().rstrip(";").strip()
+    if not re.match(r"^(select|with)\b", query, re.IGNORECASE):
+        raise ValueError("Only SELECT queries are allowed")
+    if ";" in query:
+        raise ValueError("Only a single statement is allowed")
+    if _FORBIDDEN.search(re.sub(r"'[^']*'", "''", query)):
+        raise ValueError("Query contains a statement that is not allowed")
+    return query
+
+
+def run_sql(file: str, query: str, max_rows: int = SQL_MAX_ROWS) -> Union[Columns, Dict[str, Any]]:
+    """Run one read-only SELECT over the export's tables; returns at most ``max_rows`` rows."""
+    if duckdb is None:
+        return {"error": "SQL queries need the optional 'duckdb' package"}
+    try:
+        query = validate_query(query)
+    except ValueError as e:
+        return {"error": str(e), "query": query}
+
+    con = duckdb.connect(":memory:", config={"enable_external_access": False})
+    timer = threading.Timer(SQL_TIMEOUT, con.interrupt)
+    try:
+        for name, df in _tables(file).items():
+            con.register(name, df)
+        con.execute("SET lock_configuration = true")
+        timer.start()
+        result = con.execute(f"SELECT * FROM ({query}) AS q LIMIT {int(max_rows) + 1}").df()
+    except Exception as e:
+        return {"error": f"SQL query failed: {e}", "query": query}
+    finally:
+        timer.cancel()
+        con.close()
+
+    truncated = len(result) > max_rows
+    print(f"DEBUG: SQL returned {min(len(result), max_rows)} rows{' (truncated)' if truncated else ''}")
+    return Columns.from_frame(result.head(max_rows))
@@ -0,0 +1,199 @@
+"""
+Incremental time-series store across all uploaded analytics exports.
+
+Every export is appended into year-partitioned Parquet tables under
+``ANALYTICS_STORE_DIR``:
+
+    engagement/year=2024/data.parquet   daily impressions/engagements (key: Date)
+    posts/year=2024/data.parquet        per-post metrics (key: url)
+    followers/year=2024/data.parquet    daily new followers (key: Date)
+    manifest.json                       ingested exports by content hash
+
+Overlapping exports are deduplicated by date / post URL. Daily rows keep the
+value from the export that ends latest (its counts are the most up to date);
+post rows keep the value from the export with the widest window, since
+TOP POSTS metrics only cover the export's own period. Only the year
+partitions an export touches are rewritten.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from utils.analytics_ingest import load_sheets
+from utils.analytics_metrics import daily_engagement, post_table
+from utils.hashing import file_sha256
+
+ANALYTICS_STORE_DIR = os.getenv("ANALYTICS_STORE_DIR", "./analytics_store")
+
+# table -> (date column used for partitioning/range queries, dedup key,
+#           precedence columns - the last row after sorting by them wins)
+TABLES = {
+    "engagement": ("Date", ["Date"], ["_export_end", "_ingested_at"]),
+    "posts": ("published", ["url"], ["_export_days", "_export_end", "_ingested_at"]),
+    "followers": ("Date", ["Date"], ["_export_end", "_ingested_at"]),
+}
+
+_store_lock = threading.RLock()
+
+
+def _manifest_path() -> str:
+    return os.path.join(ANALYTICS_STORE_DIR, "manifest.json")
+
+
+def load_manifest() -> Dict[str, Dict[str, Any]]:
+    """Ingested exports keyed by content hash."""
+    path = _manifest_path()
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_manifest(manifest: Dict[str, Dict[str, Any]]) -> None:
+    os.makedirs(ANALYTICS_STORE_DIR, exist_ok=True)
+    tmp = _manifest_path() + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, _manifest_path())
+
+
+def _partition_path(table: str, year: str) -> str:
+    return os.path.join(ANALYTICS_STORE_DIR, table, f"year={year}", "data.parquet")
+
+
+def _year_of(series: pd.Series) -> pd.Series:
+    return series.dt.year.astype("Int64").astype(str).replace("<NA>", "unknown")
+
+
+def _upsert(table: str, rows: pd.DataFrame) -> int:
+    """Merge rows into the affected year partitions; returns rows written."""
+    if rows.empty:
+        return 0
+    date_col, key, precedence = TABLES[table]
+    written = 0
+    for year, part in rows.groupby(_year_of(rows[date_col])):
+        path = _partition_path(table, year)
+        if os.path.exists(path):
+            part = pd.concat([pd.read_parquet(path), part], ignore_index=True)
+        part = (
+            part.sort_values(precedence)
+            .drop_duplicates(subset=key, keep="last")
+            .sort_values(key)
+            .reset_index(drop=True)
+        )
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        part.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+        written += len(part)
+    return written
+
+
+def _tables_from_export(file: str) -> Dict[str, pd.DataFrame]:
+    sheets = load_sheets(file)
+    tables = {}
+    if "ENGAGEMENT" in sheets:
+        daily = daily_engagement(sheets)
+        tables["engagement"] = daily.reset_index().rename(columns={"index": "Date"})
+    posts = post_table(sheets)
+    if not posts.empty:
+        tables["posts"] = posts
+    followers = sheets.get("FOLLOWERS")
+    if followers is not None and {"Date", "New followers"} <= set(followers.columns):
+        followers = followers[["Date", "New followers"]].dropna(subset=["Date"])
+        tables["followers"] = followers.assign(Date=pd.to_datetime(followers["Date"], errors="coerce"))
+    return tables
+
+
+def ingest_export(file: str) -> Dict[str, Any]:
+    """
+    Append an export into the store; a no-op for exports already ingested.
+
+    Returns the export's manifest entry (hash, covered dates, row counts).
+    """
+    digest = file_sha256(file)
+    with _store_lock:
+        manifest = load_manifest()
+        if digest in manifest:
+            return manifest[digest]
+
+        tables = _tables_from_export(file)
+        engagement = tables.get("engagement")
+        start = engagement["Date"].min() if engagement is not None and not engagement.empty else None
+        end = engagement["Date"].max() if engagement is not None and not engagement.empty else None
+        export_end = end if end is not None else pd.Timestamp(datetime.now().date())
+        export_days = int((end - start).days) + 1 if start is not None else 0
+        ingested_at = time.time()
+
+        for table, df in tables.items():
+            _upsert(table, df.assign(
+                _export_end=export_end, _export_days=export_days, _ingested_at=ingested_at, _source=digest
+            ))
+
+        entry = {
+            "hash": digest,
+            "file": os.path.basename(file),
+            "start": start.strftime("%Y-%m-%d") if start is not None else None,
+            "end": end.strftime("%Y-%m-%d") if end is not None else None,
+            "ingested_at": ingested_at,
+            "rows": {table: int(len(df)) for table, df in tables.items()},
+        }
+        manifest[digest] = entry
+        _save_manifest(manifest)
+        print(f"DEBUG: Ingested {entry['file']} ({entry['start']} - {entry['end']}) into analytics store")
+        return entry
+
+
+def query_table(table: str, start: Optional[str] = None, end: Optional[str] = None) -> pd.DataFrame:
+    """Rows of a store table whose date falls in [start, end], across all exports."""
+    date_col, key, _ = TABLES[table]
+    table_dir = os.path.join(ANALYTICS_STORE_DIR, table)
+    if not os.path.isdir(table_dir):
+        return pd.DataFrame()
+
+    start_ts = pd.Timestamp(start) if start else None
+    end_ts = pd.Timestamp(end) if end else None
+    frames = []
+    for partition in sorted(os.listdir(table_dir)):
+        year = partition.split("=", 1)[-1]
+        # Skip partitions outside the requested range without reading them
+        if year.isdigit() and (
+            (start_ts is not None and int(year) < start_ts.year) or (end_ts is not None and int(year) > end_ts.year)
+        ):
+            continue
+        path = os.path.join(table_dir, partition, "data.parquet")
+        if os.path.exists(path):
+            frames.append(pd.read_parquet(path))
+    if not frames:
+        return pd.DataFrame()
+
+    df = pd.concat(frames, ignore_index=True)
+    if start_ts is not None:
+        df = df[df[date_col] >= start_ts]
+    if end_ts is not None:
+        df = df[df[date_col] <= end_ts]
+    return df.sort_values(key).reset_index(drop=True)
+
+
+def query_engagement(start: Optional[str] = None, end: Optional[str] = None) -> pd.DataFrame:
+    """Daily impressions/engagements across every ingested export."""
+    df = query_table("engagement", start, end)
+    return df.set_index("Date")[["Impressions", "Engagements"]] if not df.empty else df
+
+
+def store_coverage() -> Dict[str, Any]:
+    """Date range and exports currently covered by the store."""
+    manifest = load_manifest()
+    starts = [e["start"] for e in manifest.values() if e.get("start")]
+    ends = [e["end"] for e in manifest.values() if e.get("end")]
+    return {
+        "exports": len(manifest),
+        "start": min(starts) if starts else None,
+        "end": max(ends) if ends else None,
+    }
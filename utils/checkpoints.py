@@ -0,0 +1,78 @@
+"""
+Shared LangGraph checkpointer for the human-in-the-loop graphs.
+
+The email, content and calendar graphs are compiled with this checkpointer and
+``interrupt_before`` their side-effect node (send / publish / create). A run
+pauses after drafting, keyed by its thread ID; approving resumes the paused run
+from its checkpoint, optionally after applying the user's edits to the state.
+
+Checkpoints are persisted in SQLite at ``CHECKPOINT_DB_PATH`` when the optional
+``langgraph-checkpoint-sqlite`` package is installed, and kept in memory
+otherwise.
+"""
+
+import os
+import sqlite3
+import threading
+import uuid
+from typing import Any, Dict, Optional
+
+from langgraph.checkpoint.memory import MemorySaver
+
+try:
+    from langgraph.checkpoint.sqlite import SqliteSaver
+except ImportError:  # optional dependency
+    SqliteSaver = None
+
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", "./checkpoints.sqlite3")
+
+_checkpointer = None
+_checkpointer_lock = threading.Lock()
+_thread_locks: Dict[str, threading.Lock] = {}
+
+
+def get_checkpointer():
+    """Process-wide checkpointer (SQLite when available, else in-memory)."""
+    global _checkpointer
+    if _checkpointer is None:
+        with _checkpointer_lock:
+            if _checkpointer is None:
+                if SqliteSaver is not None:
+                    conn = sqlite3.connect(CHECKPOINT_DB_PATH, check_same_thread=False)
+                    _checkpointer = SqliteSaver(conn)
+                else:
+                    print("DEBUG: langgraph-checkpoint-sqlite not installed, keeping checkpoints in memory")
+                    _checkpointer = MemorySaver()
+    return _checkpointer
+
+
+def new_thread_id(kind: str) -> str:
+    return f"{kind}-{uuid.uuid4().hex}"
+
+
+def thread_config(thread_id: str) -> Dict[str, Any]:
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def pending_node(app, thread_id: str) -> Optional[str]:
+    """Node a paused thread will run next, or None if unknown or finished."""
+    snapshot = app.get_state(thread_config(thread_id))
+    return snapshot.next[0] if snapshot and snapshot.next else None
+
+
+def resume_thread(app, thread_id: str, updates: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Apply ``updates`` to a paused thread's state and run it to completion.
+    Raises ValueError when the thread is unknown or already finished, so an
+    approval can't trigger the side effect twice.
+    """
+    config = thread_config(thread_id)
+    with _checkpointer_lock:
+        lock = _thread_locks.setdefault(thread_id, threading.Lock())
+    # Concurrent approvals of the same thread run one after the other; the second sees it finished
+    with lock:
+        if pending_node(app, thread_id) is None:
+            raise ValueError(f"Thread {thread_id} has no pending step (unknown or already completed)")
+        if updates:
+            app.update_state(config, updates)
+        return app.invoke(None, config)
@@ -0,0 +1,122 @@
+"""
+Compact column-oriented container for loader results.
+
+Loaders used to return ``df.to_dict(orient="records")``, which builds one
+Python dict (plus boxed scalars) per row. ``Columns`` keeps one NumPy array per
+column instead and only materializes rows on demand: indexing/iterating yields
+row dicts, ``str()`` renders compact CSV for prompts and ``to_records()``
+produces JSON-safe records at the API boundary.
+"""
+
+import io
+from typing import Any, Dict, Iterator, List, Union
+
+import numpy as np
+import pandas as pd
+
+
+def _to_array(series: pd.Series) -> np.ndarray:
+    if isinstance(series.dtype, pd.PeriodDtype):
+        return series.astype(str).to_numpy(dtype=object)
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        if series.isna().any() and not pd.api.types.is_float_dtype(series):
+            return series.astype("float64").to_numpy()
+        return series.to_numpy()
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.dt.tz_localize(None).to_numpy() if series.dt.tz is not None else series.to_numpy()
+    return series.to_numpy(dtype=object)
+
+
+def _py(value: Any) -> Any:
+    """NumPy/pandas scalar -> plain JSON-safe Python value."""
+    if value is None:
+        return None
+    if isinstance(value, np.datetime64):
+        return None if np.isnat(value) else pd.Timestamp(value).isoformat()
+    if isinstance(value, (pd.Timestamp, pd.Period)):
+        return value.isoformat() if isinstance(value, pd.Timestamp) else str(value)
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+class Columns:
+    """Read-only table stored as one array per column."""
+
+    __slots__ = ("_data", "_length")
+
+    def __init__(self, data: Dict[str, np.ndarray]):
+        lengths = {len(values) for values in data.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+        self._data = data
+        self._length = lengths.pop() if lengths else 0
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "Columns":
+        return cls({str(name): _to_array(df[name]) for name in df.columns})
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._data)
+
+    @property
+    def nbytes(self) -> int:
+        # Object columns only hold references; count the strings they point to
+        total = 0
+        for values in self._data.values():
+            total += values.nbytes
+            if values.dtype == object:
+                total += sum(len(v) for v in values if isinstance(v, str))
+        return total
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __bool__(self) -> bool:
+        return self._length > 0
+
+    def __getitem__(self, key: Union[int, str]) -> Any:
+        if isinstance(key, str):
+            return self._data[key]
+        if key < 0:
+            key += self._length
+        if not 0 <= key < self._length:
+            raise IndexError("row index out of range")
+        return {name: _py(values[key]) for name, values in self._data.items()}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(self._length):
+            yield self[i]
+
+    def head(self, n: int = 5) -> "Columns":
+        return Columns({name: values[:n] for name, values in self._data.items()})
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self._data, copy=False)
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        return list(self)
+
+    def __str__(self) -> str:
+        buffer = io.StringIO()
+        self.to_frame().to_csv(buffer, index=False, float_format="%.4g", date_format="%Y-%m-%d")
+        return buffer.getvalue().strip()
+
+    def __repr__(self) -> str:
+        return f"Columns(rows={self._length}, columns={self.columns})"
+
+
+def to_jsonable(value: Any) -> Any:
+    """Recursively replace ``Columns`` (and NumPy scalars) with JSON-safe values."""
+    if isinstance(value, Columns):
+        return value.to_records()
+    if isinstance(value, dict):
+        return {k: to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(v) for v in value]
+    if isinstance(value, (np.generic, np.datetime64, pd.Timestamp)):
+        return _py(value)
+    return value
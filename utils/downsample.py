@@ -0,0 +1,96 @@
+"""
+Shape-preserving downsampling of long engagement time series.
+
+``lttb`` implements Largest-Triangle-Three-Buckets: the first and last points
+are kept and every bucket in between contributes the point forming the largest
+triangle with its neighbours, which preserves the visual shape of the line.
+``downsample_series`` additionally reserves slots (inside the budget, after
+the first and last rows) for each column's highest and lowest days so spikes
+and drops survive, and never returns more than ``target`` rows.
+"""
+
+import os
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+SERIES_POINTS = int(os.getenv("ANALYTICS_SERIES_POINTS", 60))
+
+
+def lttb(x: np.ndarray, y: np.ndarray, target: int) -> np.ndarray:
+    """Indices of the ``target`` points LTTB selects from (x, y)."""
+    n = len(y)
+    if target >= n:
+        return np.arange(n)
+    if target < 3:
+        return np.array([0, n - 1][:max(target, 0)], dtype=int)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # Bucket edges over the points strictly between the first and the last
+    edges = np.linspace(1, n - 1, target - 1).astype(int)
+    selected = np.empty(target, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(target - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point for the final bucket)
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        areas = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample_series(
+    df: pd.DataFrame,
+    target: int = SERIES_POINTS,
+    columns: Optional[List[str]] = None,
+    extremes: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Reduce a date-indexed frame to at most ``target`` rows.
+
+    LTTB runs on the first column; the ``extremes`` highest and lowest rows of
+    every column are always kept.
+    """
+    columns = columns or list(df.columns)
+    if len(df) <= target or not columns:
+        return df
+    if extremes is None:
+        extremes = max(1, target // 20)
+
+    x = np.arange(len(df), dtype=float)
+    y = pd.to_numeric(df[columns[0]], errors="coerce").fillna(0).to_numpy(dtype=float)
+    if target < 3:
+        return df.iloc[lttb(x, y, target)]
+
+    # First and last rows, then each column's highest and lowest rows while they fit
+    keep = {0, len(df) - 1}
+    orders = [
+        np.argsort(pd.to_numeric(df[col], errors="coerce").fillna(0).to_numpy(dtype=float), kind="stable")
+        for col in columns
+    ]
+    for rank in range(extremes):
+        for order in orders:
+            for index in (order[-1 - rank], order[rank]):
+                if len(keep) < target:
+                    keep.add(int(index))
+
+    # LTTB fills the remaining slots; its picks may coincide with kept rows, so
+    # grow its budget (at most target - 2 buckets) while the union still fits
+    budget = target - len(keep) + 2
+    chosen = keep | set(lttb(x, y, budget).tolist())
+    while len(chosen) < target and budget < target:
+        candidate_budget = min(target, budget + target - len(chosen))
+        candidate = keep | set(lttb(x, y, candidate_budget).tolist())
+        if len(candidate) > target:
+            break
+        budget, chosen = candidate_budget, candidate
+    return df.iloc[sorted(chosen)]
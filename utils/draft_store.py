@@ -0,0 +1,188 @@
+"""
+Server-side drafts (posts, emails, events) with version history.
+
+Every generated draft gets an ID, so clients send back only the ID plus the
+fields they edited instead of the whole payload. Each revision or edit appends
+a new version instead of overwriting, and the result of the draft's action
+(send / publish / create) is recorded once, so repeating the action replays the
+stored result instead of running it again.
+
+Drafts are persisted in SQLite; the latest version of recently used drafts is
+served from an in-memory LRU cache.
+
+    drafts          id, kind, metadata, created_at, updated_at, version, action, acted_at
+    draft_versions  draft_id, version, content, instruction, created_at
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from utils.memo import MemoCache
+
+DRAFT_DB_PATH = os.getenv("DRAFT_DB_PATH", "./drafts.sqlite3")
+DRAFT_CACHE_BYTES = int(os.getenv("DRAFT_CACHE_BYTES", 8 * 1024 * 1024))
+
+_cache = MemoCache("drafts", max_bytes=DRAFT_CACHE_BYTES)
+
+_conn: Optional[sqlite3.Connection] = None
+_conn_lock = threading.Lock()
+
+
+def _db() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        directory = os.path.dirname(DRAFT_DB_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(DRAFT_DB_PATH, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS drafts (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                metadata TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                version INTEGER NOT NULL,
+                action TEXT,
+                acted_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS draft_versions (
+                draft_id TEXT NOT NULL REFERENCES drafts(id),
+                version INTEGER NOT NULL,
+                content TEXT NOT NULL,
+                instruction TEXT,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (draft_id, version)
+            );
+            """
+        )
+        # Databases created before actions were recorded
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(drafts)")}
+        for column, sql_type in (("action", "TEXT"), ("acted_at", "REAL")):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE drafts ADD COLUMN {column} {sql_type}")
+        _conn = conn
+    return _conn
+
+
+def _row_to_draft(draft: sqlite3.Row, version: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "draft_id": draft["id"],
+        "kind": draft["kind"],
+        "version": version["version"],
+        "latest_version": draft["version"],
+        "content": json.loads(version["content"]),
+        "instruction": version["instruction"],
+        "metadata": json.loads(draft["metadata"]),
+        "created_at": draft["created_at"],
+        "updated_at": version["created_at"],
+        "action": json.loads(draft["action"]) if draft["action"] else None,
+        "acted_at": draft["acted_at"],
+    }
+
+
+def create_draft(kind: str, content: Any, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Store a new draft as version 1 and return it with its ID."""
+    draft_id = uuid.uuid4().hex
+    now = time.time()
+    with _conn_lock:
+        conn = _db()
+        with conn:
+            conn.execute(
+                "INSERT INTO drafts (id, kind, metadata, created_at, updated_at, version) VALUES (?, ?, ?, ?, ?, 1)",
+                (draft_id, kind, json.dumps(metadata or {}), now, now),
+            )
+            conn.execute(
+                "INSERT INTO draft_versions (draft_id, version, content, instruction, created_at) VALUES (?, 1, ?, NULL, ?)",
+                (draft_id, json.dumps(content), now),
+            )
+    return get_draft(draft_id)
+
+
+def get_draft(draft_id: str, version: Optional[int] = None) -> Dict[str, Any]:
+    """A draft at its latest (or the given) version; raises KeyError if unknown."""
+    if version is None:
+        cached = _cache.get(draft_id)
+        if cached is not None:
+            return cached
+    with _conn_lock:
+        conn = _db()
+        draft = conn.execute("SELECT * FROM drafts WHERE id = ?", (draft_id,)).fetchone()
+        if draft is None:
+            raise KeyError(f"Unknown draft_id: {draft_id}")
+        row = conn.execute(
+            "SELECT * FROM draft_versions WHERE draft_id = ? AND version = ?",
+            (draft_id, version or draft["version"]),
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"Draft {draft_id} has no version {version}")
+        result = _row_to_draft(draft, row)
+        # Cached under the lock so a concurrent write can't be overwritten by this older read
+        if version is None:
+            _cache.set(draft_id, result)
+    return result
+
+
+def add_version(draft_id: str, content: Any, instruction: Optional[str] = None) -> Dict[str, Any]:
+    """Append a revision as the draft's new latest version."""
+    now = time.time()
+    with _conn_lock:
+        conn = _db()
+        with conn:
+            draft = conn.execute("SELECT version FROM drafts WHERE id = ?", (draft_id,)).fetchone()
+            if draft is None:
+                raise KeyError(f"Unknown draft_id: {draft_id}")
+            version = draft["version"] + 1
+            conn.execute(
+                "INSERT INTO draft_versions (draft_id, version, content, instruction, created_at) VALUES (?, ?, ?, ?, ?)",
+                (draft_id, version, json.dumps(content), instruction, now),
+            )
+            conn.execute("UPDATE drafts SET version = ?, updated_at = ? WHERE id = ?", (version, now, draft_id))
+        _cache.delete(draft_id)
+    return get_draft(draft_id)
+
+
+def edit_draft(draft_id: str, edits: Any, instruction: str = "edited") -> Dict[str, Any]:
+    """
+    Apply user edits as a new version: dict drafts (emails, events) merge the
+    edited fields, text drafts are replaced. Unchanged edits add no version.
+    """
+    draft = get_draft(draft_id)
+    content = draft["content"]
+    edited = {**content, **edits} if isinstance(content, dict) and isinstance(edits, dict) else edits
+    if edited == content:
+        return draft
+    return add_version(draft_id, edited, instruction)
+
+
+def record_action(draft_id: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Store the result of the draft's action; later requests replay it."""
+    with _conn_lock:
+        conn = _db()
+        with conn:
+            conn.execute(
+                "UPDATE drafts SET action = ?, acted_at = ? WHERE id = ?", (json.dumps(result), time.time(), draft_id)
+            )
+        _cache.delete(draft_id)
+    return get_draft(draft_id)
+
+
+def draft_history(draft_id: str) -> List[Dict[str, Any]]:
+    """Every version of a draft, oldest first."""
+    with _conn_lock:
+        conn = _db()
+        draft = conn.execute("SELECT * FROM drafts WHERE id = ?", (draft_id,)).fetchone()
+        if draft is None:
+            raise KeyError(f"Unknown draft_id: {draft_id}")
+        rows = conn.execute(
+            "SELECT * FROM draft_versions WHERE draft_id = ? ORDER BY version", (draft_id,)
+        ).fetchall()
+    return [_row_to_draft(draft, row) for row in rows]
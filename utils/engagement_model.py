@@ -0,0 +1,297 @@
+"""
+Local engagement-prediction model for LinkedIn post text.
+
+Scores a post or draft in milliseconds without an LLM call. Features are a
+handful of hand-crafted text signals (length, hook, hashtags, questions, line
+breaks, CTA ...) plus a small TF-IDF vocabulary, fed to a ridge regression on
+log(1 + engagements). Training data is the user's own TOP POSTS history from
+the analytics store joined with the scraped post text; scraped texts are kept
+in ``post_texts.json`` next to the model so retraining only scrapes new posts.
+
+Scores are 1-10: the share of the user's past posts the predicted engagements
+would beat, interpolated between past posts and still rising (falling) beyond
+the best (worst) one, so predictions outside the history stay distinguishable.
+Until enough posts are available a rule-based heuristic is used.
+"""
+
+import json
+import math
+import os
+import pickle
+import re
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.analytics_store import ANALYTICS_STORE_DIR, query_table
+
+ENGAGEMENT_MODEL_PATH = os.path.join(ANALYTICS_STORE_DIR, "engagement_model.pkl")
+POST_TEXTS_PATH = os.path.join(ANALYTICS_STORE_DIR, "post_texts.json")
+MIN_TRAIN_POSTS = int(os.getenv("ENGAGEMENT_MODEL_MIN_POSTS", 10))
+MAX_TRAIN_POSTS = int(os.getenv("ENGAGEMENT_MODEL_MAX_POSTS", 200))
+TFIDF_FEATURES = 500
+
+_TOKEN = re.compile(r"[a-z][a-z0-9']+")
+_URL = re.compile(r"https?://\S+")
+_BULLET = re.compile(r"^\s*(?:[-*•▪➡→✅]|\d+[.)])\s+", re.MULTILINE)
+# Emoji blocks: pictographs, emoticons, transport, supplemental symbols, flags, misc symbols and dingbats
+_EMOJI = re.compile(
+    "[\U0001F000-\U0001F2FF\U0001F300-\U0001FAFF\u2600-\u27BF\u2B05-\u2B07\u2B1B\u2B1C\u2B50\u2B55"
+    "\u231A\u231B\u23E9-\u23FA]"
+)
+_CTA = re.compile(
+    r"\b(comment|share|repost|follow|thoughts|what do you think|agree|let me know|drop a|dm me)\b", re.IGNORECASE
+)
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have i in is it its my of on or our so that the this to was we "
+    "were will with you your".split()
+)
+
+
+def text_features(text: str) -> Dict[str, float]:
+    """Hand-crafted signals of one post's text."""
+    text = text or ""
+    lines = [line for line in text.splitlines() if line.strip()]
+    hook = lines[0].strip() if lines else ""
+    words = text.split()
+    return {
+        "chars": len(text),
+        "words": len(words),
+        "lines": len(lines),
+        "paragraphs": len([p for p in re.split(r"\n\s*\n", text) if p.strip()]),
+        "hashtags": text.count("#"),
+        "mentions": len(re.findall(r"(?<!\w)@\w", text)),
+        "questions": text.count("?"),
+        "ends_with_question": float(text.rstrip().endswith("?")),
+        "hook_chars": len(hook),
+        "hook_has_number": float(bool(re.search(r"\d", hook))),
+        "hook_is_question": float(hook.endswith("?")),
+        "bullets": len(_BULLET.findall(text)),
+        "urls": len(_URL.findall(text)),
+        "emojis": len(_EMOJI.findall(text)),
+        "cta": float(bool(_CTA.search(text))),
+        "has_ps": float(bool(re.search(r"^\s*p\.?s\.?\b", text, re.IGNORECASE | re.MULTILINE))),
+    }
+
+
+FEATURE_NAMES = list(text_features("").keys())
+
+
+def _tokens(text: str) -> List[str]:
+    return [tok for tok in _TOKEN.findall(_URL.sub(" ", (text or "").lower())) if tok not in _STOPWORDS]
+
+
+def heuristic_score(text: str) -> Dict[str, Any]:
+    """Rule-based 1-10 score used until a model has been trained."""
+    f = text_features(text)
+    points = 5.0
+    points += 1.0 if 30 <= f["hook_chars"] <= 150 else -0.5
+    points += 1.0 if 600 <= f["chars"] <= 2000 else (-1.0 if f["chars"] < 200 else 0.0)
+    points += 0.5 if f["lines"] >= 4 else -0.5
+    points += 0.5 if 1 <= f["hashtags"] <= 5 else (-1.0 if f["hashtags"] > 8 else 0.0)
+    points += 1.0 if f["ends_with_question"] or f["cta"] else 0.0
+    points += 0.5 if f["hook_has_number"] or f["hook_is_question"] else 0.0
+    points -= 0.5 if f["urls"] else 0.0
+    return {
+        "score": int(min(10, max(1, round(points)))),
+        "model": "heuristic",
+        "features": f,
+    }
+
+
+class EngagementModel:
+    """TF-IDF + hand-crafted features -> ridge regression on log(1 + engagements)."""
+
+    def __init__(self, alpha: float = 1.0, max_features: int = TFIDF_FEATURES):
+        self.alpha = alpha
+        self.max_features = max_features
+        self.vocabulary: Dict[str, int] = {}
+        self.idf = np.zeros(0)
+        self.feature_mean = np.zeros(len(FEATURE_NAMES))
+        self.feature_std = np.ones(len(FEATURE_NAMES))
+        self.coef = np.zeros(0)
+        self.intercept = 0.0
+        self.history = np.zeros(0)  # sorted log engagements of the training posts
+        self.n_posts = 0
+
+    def _tfidf(self, texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), len(self.vocabulary)))
+        for row, text in enumerate(texts):
+            for token, count in Counter(_tokens(text)).items():
+                col = self.vocabulary.get(token)
+                if col is not None:
+                    matrix[row, col] = 1.0 + math.log(count)
+        matrix *= self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1.0, norms)
+
+    def _design(self, texts: List[str]) -> np.ndarray:
+        hand = np.array([[f[name] for name in FEATURE_NAMES] for f in map(text_features, texts)], dtype=float)
+        hand = (hand - self.feature_mean) / self.feature_std
+        # Scale hand features down so each weighs about as much as a whole TF-IDF row
+        return np.hstack([hand / math.sqrt(len(FEATURE_NAMES)), self._tfidf(texts)])
+
+    def fit(self, texts: List[str], engagements: Iterable[float]) -> "EngagementModel":
+        y = np.log1p(np.clip(np.asarray(list(engagements), dtype=float), 0, None))
+        documents = [set(_tokens(text)) for text in texts]
+        df = Counter(token for doc in documents for token in doc)
+        # Terms seen in at least two posts, most frequent first
+        terms = [t for t, n in sorted(df.items(), key=lambda kv: (-kv[1], kv[0])) if n >= 2][: self.max_features]
+        self.vocabulary = {term: i for i, term in enumerate(terms)}
+        self.idf = np.array([math.log((1 + len(texts)) / (1 + df[t])) + 1.0 for t in terms])
+
+        hand = np.array([[f[name] for name in FEATURE_NAMES] for f in map(text_features, texts)], dtype=float)
+        self.feature_mean = hand.mean(axis=0)
+        std = hand.std(axis=0)
+        self.feature_std = np.where(std == 0, 1.0, std)
+
+        X = self._design(texts)
+        self.intercept = float(y.mean())
+        # Dual ridge solution: there are far fewer posts than features
+        gram = X @ X.T + self.alpha * np.eye(len(texts))
+        self.coef = X.T @ np.linalg.solve(gram, y - self.intercept)
+        self.history = np.sort(y)
+        self.n_posts = len(texts)
+        return self
+
+    def predict(self, texts: List[str]) -> np.ndarray:
+        """Predicted engagements for each text."""
+        return np.expm1(self._design(texts) @ self.coef + self.intercept).clip(min=0)
+
+    def beats(self, log_value: float) -> float:
+        """Share (0-1) of past posts a predicted log engagement beats."""
+        n = len(self.history)
+        if n == 0:
+            return 0.5
+        # Empirical CDF at each distinct past value (ties share their mid-rank), interpolated in between
+        values, first, counts = np.unique(self.history, return_index=True, return_counts=True)
+        cdf = (first + counts / 2) / n
+        lo, hi = values[0], values[-1]
+        if lo <= log_value <= hi:
+            return float(np.interp(log_value, values, cdf))
+        # Beyond the history keep approaching 1 (or 0) with the distance from it,
+        # measured in units of the history's spread (at least a factor of e)
+        spread = max(hi - lo, 1.0)
+        if log_value > hi:
+            return float(cdf[-1] + (1 - cdf[-1]) * (1 - math.exp(-(log_value - hi) / spread)))
+        return float(cdf[0] * math.exp(-(lo - log_value) / spread))
+
+    def score(self, texts: List[str]) -> List[Dict[str, Any]]:
+        predicted = self.predict(texts)
+        results = []
+        for text, value in zip(texts, predicted):
+            beats = self.beats(math.log1p(value))
+            results.append({
+                "score": int(min(10, max(1, 1 + round(beats * 9)))),
+                "predicted_engagements": round(float(value), 1),
+                "beats_past_posts": round(beats, 2),
+                "model": "trained",
+                "trained_on": self.n_posts,
+                "features": text_features(text),
+            })
+        return results
+
+
+def _load_post_texts() -> Dict[str, str]:
+    try:
+        with open(POST_TEXTS_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def train_engagement_model(
+    fetch_text: Callable[[str], str],
+    posts: Optional[pd.DataFrame] = None,
+    max_posts: int = MAX_TRAIN_POSTS,
+) -> Optional[EngagementModel]:
+    """
+    Fit the model on past posts (default: every post in the analytics store)
+    and save it; returns None when fewer than ``MIN_TRAIN_POSTS`` have text.
+    ``fetch_text`` is called only for posts whose text isn't stored yet.
+    """
+    if posts is None:
+        posts = query_table("posts")
+    if posts.empty:
+        return None
+    posts = (
+        posts.dropna(subset=["url", "engagements"])
+        .drop_duplicates("url")
+        .sort_values("published", ascending=False)
+        .head(max_posts)
+    )
+
+    texts = _load_post_texts()
+    for url in posts["url"]:
+        if url not in texts:
+            text = fetch_text(url) or ""
+            if text.strip() and not text.startswith("Error scraping post"):
+                texts[url] = text
+    os.makedirs(ANALYTICS_STORE_DIR, exist_ok=True)
+    with open(POST_TEXTS_PATH, "w", encoding="utf-8") as f:
+        json.dump(texts, f)
+
+    known = posts[posts["url"].isin(texts)]
+    if len(known) < MIN_TRAIN_POSTS:
+        print(f"DEBUG: Engagement model needs {MIN_TRAIN_POSTS} posts with text, have {len(known)}")
+        return None
+
+    model = EngagementModel().fit([texts[url] for url in known["url"]], known["engagements"])
+    tmp_path = f"{ENGAGEMENT_MODEL_PATH}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(model, f)
+    os.replace(tmp_path, ENGAGEMENT_MODEL_PATH)
+    print(f"DEBUG: Trained engagement model on {len(known)} posts")
+    return model
+
+
+_model: Optional[EngagementModel] = None
+_model_mtime: Optional[float] = None
+_model_lock = threading.Lock()
+
+
+def get_engagement_model() -> Optional[EngagementModel]:
+    """The saved model, reloaded when it has been retrained; None if none exists."""
+    global _model, _model_mtime
+    try:
+        mtime = os.path.getmtime(ENGAGEMENT_MODEL_PATH)
+    except OSError:
+        return None
+    with _model_lock:
+        if mtime != _model_mtime:
+            with open(ENGAGEMENT_MODEL_PATH, "rb") as f:
+                _model = pickle.load(f)
+            _model_mtime = mtime
+        return _model
+
+
+def score_posts(texts: List[str]) -> List[Dict[str, Any]]:
+    """Score each text with the trained model, or the heuristic when there is none."""
+    model = get_engagement_model()
+    if model is None:
+        return [heuristic_score(text) for text in texts]
+    return model.score(texts)
+
+
+def score_post(text: str) -> Dict[str, Any]:
+    return score_posts([text])[0]
+
+
+def rank_posts(texts: List[str]) -> List[Dict[str, Any]]:
+    """Texts with their scores, best first."""
+    scored = [{"text": text, **score} for text, score in zip(texts, score_posts(texts))]
+    return sorted(scored, key=lambda s: (s["score"], s.get("predicted_engagements", 0)), reverse=True)
+
+
+def describe_score(score: Dict[str, Any]) -> str:
+    """One-line summary of a score for LLM prompts."""
+    if score["model"] == "trained":
+        return (
+            f"{score['score']}/10 from a local model trained on {score['trained_on']} of the author's posts "
+            f"(~{score['predicted_engagements']:.0f} predicted engagements, beats "
+            f"{score['beats_past_posts']:.0%} of past posts)"
+        )
+    return f"{score['score']}/10 from text heuristics (no trained model yet)"
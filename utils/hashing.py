@@ -0,0 +1,40 @@
+import hashlib
+import os
+import threading
+
+_CHUNK_SIZE = 1024 * 1024
+
+# (abs path, size, mtime) -> sha256, so unchanged files are only hashed once
+_hash_memo = {}
+_hash_lock = threading.Lock()
+
+
+def _stat_key(path: str):
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+
+def file_sha256(path: str) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    key = _stat_key(path)
+    with _hash_lock:
+        digest = _hash_memo.get(key)
+    if digest:
+        return digest
+
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    with _hash_lock:
+        _hash_memo[key] = digest
+    return digest
+
+
+def remember_sha256(path: str, digest: str) -> None:
+    """Record a digest computed elsewhere (e.g. while streaming an upload)."""
+    key = _stat_key(path)
+    with _hash_lock:
+        _hash_memo[key] = digest
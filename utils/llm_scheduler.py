@@ -0,0 +1,260 @@
+"""
+Central rate-limit scheduler for Groq LLM calls.
+
+Every chat completion, whether it comes from ``invoke``, ``batch``, ``stream``,
+their async variants, a prompt chain or a tool-calling agent, goes through
+``ScheduledChatGroq._generate`` / ``_stream`` (the async methods run those in a
+worker thread) and therefore through one ``LLMScheduler``:
+
+* requests-per-minute and tokens-per-minute token buckets; a call waits until
+  both budgets can cover it (tokens are reserved from the prompt size plus a
+  completion allowance, then settled against the reported usage),
+* at most ``LLM_MAX_CONCURRENCY`` calls in flight,
+* a priority queue: interactive requests go before background work
+  (precompute jobs run under ``llm_priority(BACKGROUND)``),
+* on 429/5xx the whole scheduler backs off for the server's ``retry-after``
+  (exponential backoff with jitter when absent) and the call is retried.
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import generate_from_stream
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_groq import ChatGroq
+
+from utils.llm_usage import estimate_tokens
+
+LLM_RPM = int(os.getenv("LLM_RPM", 30))
+LLM_TPM = int(os.getenv("LLM_TPM", 6000))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 4))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 5))
+LLM_COMPLETION_RESERVE = int(os.getenv("LLM_COMPLETION_RESERVE", 512))
+MAX_BACKOFF = 60.0
+
+INTERACTIVE, BACKGROUND = 0, 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+_priority: contextvars.ContextVar = contextvars.ContextVar("llm_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(priority: int):
+    """Run the LLM calls made inside the block (and the threads it spawns with copied context) at a priority."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """Refills ``per_minute`` units per minute up to ``per_minute``; may go into debt when usage is settled."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        # A request larger than the whole budget only waits for a full bucket
+        missing = min(amount, self.capacity) - self.tokens
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float) -> None:
+        self.tokens -= amount
+
+    def adjust(self, delta: float) -> None:
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class LLMScheduler:
+    def __init__(self, rpm: int = LLM_RPM, tpm: int = LLM_TPM, max_concurrency: int = LLM_MAX_CONCURRENCY):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max_concurrency
+        self._cond = threading.Condition()
+        self._waiting: List[tuple] = []  # heap of (priority, seq)
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._stats: Dict[str, Any] = {
+            "calls": {name: 0 for name in PRIORITY_NAMES.values()},
+            "queue_wait_s": {name: 0.0 for name in PRIORITY_NAMES.values()},
+            "backoffs": 0,
+            "backoff_s": 0.0,
+            "reserved_tokens": 0,
+            "used_tokens": 0,
+        }
+
+    @contextmanager
+    def slot(self, tokens: int, priority: Optional[int] = None):
+        """Block until this call may run under the budgets, then hold a concurrency slot."""
+        priority = _priority.get() if priority is None else priority
+        ticket = (priority, next(self._seq))
+        queued = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            while True:
+                timeout = None
+                if self._waiting[0] == ticket and self._in_flight < self.max_concurrency:
+                    now = time.monotonic()
+                    timeout = max(
+                        self._paused_until - now,
+                        self.requests.wait_time(1, now),
+                        self.tokens.wait_time(tokens, now),
+                    )
+                    if timeout <= 0:
+                        break
+                self._cond.wait(timeout)
+            heapq.heappop(self._waiting)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self._in_flight += 1
+            name = PRIORITY_NAMES.get(priority, str(priority))
+            self._stats["calls"][name] = self._stats["calls"].get(name, 0) + 1
+            self._stats["queue_wait_s"][name] = self._stats["queue_wait_s"].get(name, 0.0) + time.monotonic() - queued
+            self._stats["reserved_tokens"] += tokens
+            # The next ticket in line may be able to go as well
+            self._cond.notify_all()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+    def settle(self, reserved: int, used: Optional[int]) -> None:
+        """Correct the token bucket once the real usage of a call is known."""
+        if used is None:
+            return
+        with self._cond:
+            self.tokens.adjust(used - reserved)
+            self._stats["used_tokens"] += used
+            self._cond.notify_all()
+
+    def backoff(self, seconds: float) -> None:
+        """Hold every queued call for ``seconds`` (the server rejected one); the caller then retries."""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._stats["backoffs"] += 1
+            self._stats["backoff_s"] += seconds
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = {key: (dict(value) if isinstance(value, dict) else value) for key, value in self._stats.items()}
+            stats.update({
+                "in_flight": self._in_flight,
+                "queued": len(self._waiting),
+                "paused_for_s": round(max(0.0, self._paused_until - time.monotonic()), 2),
+                "rpm": int(self.requests.capacity),
+                "tpm": int(self.tokens.capacity),
+            })
+        stats["queue_wait_s"] = {k: round(v, 3) for k, v in stats["queue_wait_s"].items()}
+        stats["backoff_s"] = round(stats["backoff_s"], 2)
+        return stats
+
+
+scheduler = LLMScheduler()
+
+
+def retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """Seconds to back off after a retryable error (429 / 5xx), None if it shouldn't be retried."""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status != 429 and not (isinstance(status, int) and status >= 500):
+        return None
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return min(MAX_BACKOFF, float(headers.get("retry-after")))
+    except (TypeError, ValueError):
+        return min(MAX_BACKOFF, 2 ** attempt) * (0.5 + random.random() / 2)
+
+
+def _used_tokens(result: ChatResult) -> Optional[int]:
+    usage = (result.llm_output or {}).get("token_usage") or {}
+    if usage.get("total_tokens") is not None:
+        return int(usage["total_tokens"])
+    message = result.generations[0].message if result.generations else None
+    metadata = getattr(message, "usage_metadata", None) or {}
+    return metadata.get("total_tokens")
+
+
+class ScheduledChatGroq(ChatGroq):
+    """ChatGroq whose every request is admitted by the shared ``scheduler``."""
+
+    def _reserve(self, messages: List[BaseMessage]) -> int:
+        prompt = "".join(str(message.content) for message in messages)
+        return estimate_tokens(prompt) + min(self.max_tokens or LLM_COMPLETION_RESERVE, LLM_COMPLETION_RESERVE)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.streaming:
+            # ChatGroq would call self._stream itself, taking a second slot for the same request
+            return generate_from_stream(self._stream(messages, stop=stop, run_manager=run_manager, **kwargs))
+        reserved = self._reserve(messages)
+        for attempt in itertools.count():
+            with scheduler.slot(reserved):
+                try:
+                    result = super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+                    scheduler.settle(reserved, _used_tokens(result))
+                    return result
+                except Exception as e:
+                    delay = retry_delay(e, attempt)
+                    if delay is None or attempt >= LLM_MAX_RETRIES:
+                        raise
+            scheduler.backoff(delay)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        reserved = self._reserve(messages)
+        for attempt in itertools.count():
+            with scheduler.slot(reserved):
+                started, used = False, None
+                try:
+                    for chunk in super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                        started = True
+                        metadata = getattr(chunk.message, "usage_metadata", None) or {}
+                        used = metadata.get("total_tokens", used)
+                        yield chunk
+                    scheduler.settle(reserved, used)
+                    return
+                except Exception as e:
+                    # Only retry when nothing has been emitted yet
+                    delay = None if started else retry_delay(e, attempt)
+                    if delay is None or attempt >= LLM_MAX_RETRIES:
+                        raise
+            scheduler.backoff(delay)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        # Waiting for the scheduler blocks, so the whole call runs in a worker thread (context is copied)
+        return await asyncio.to_thread(self._generate, messages, stop, None, **kwargs)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        # Same scheduling as _stream; every chunk is pulled from the blocking iterator in a worker thread
+        chunks = self._stream(messages, stop=stop, **kwargs)
+        done = object()
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, done)
+            if chunk is done:
+                return
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+def llm_scheduler_stats() -> Dict[str, Any]:
+    return scheduler.stats()
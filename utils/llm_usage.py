@@ -0,0 +1,66 @@
+"""
+Token and latency accounting for LLM calls.
+
+Token counts come from the provider's response metadata when present
+(``usage_metadata`` / ``response_metadata["token_usage"]``) and are
+otherwise estimated at ~4 characters per token.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Tuple
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text or "") // 4)
+
+
+def response_tokens(response: Any, prompt: str) -> Tuple[int, int]:
+    """(prompt tokens, completion tokens) of one LLM response."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage.get("input_tokens") is not None:
+        return int(usage["input_tokens"]), int(usage.get("output_tokens") or 0)
+    token_usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+    if token_usage.get("prompt_tokens") is not None:
+        return int(token_usage["prompt_tokens"]), int(token_usage.get("completion_tokens") or 0)
+    content = response.content if hasattr(response, "content") else str(response)
+    return estimate_tokens(prompt), estimate_tokens(content)
+
+
+class StageStats:
+    """Per-stage call count, token usage and wall-clock latency."""
+
+    def __init__(self):
+        self._stages: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _stage(self, stage: str) -> Dict[str, Any]:
+        return self._stages.setdefault(
+            stage, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "latency_s": 0.0}
+        )
+
+    def record(self, stage: str, prompts: Iterable[str], responses: Iterable[Any]) -> None:
+        with self._lock:
+            entry = self._stage(stage)
+            for prompt, response in zip(prompts, responses):
+                prompt_tokens, completion_tokens = response_tokens(response, prompt)
+                entry["calls"] += 1
+                entry["prompt_tokens"] += prompt_tokens
+                entry["completion_tokens"] += completion_tokens
+
+    @contextmanager
+    def timed(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._stage(stage)["latency_s"] += round(time.perf_counter() - started, 3)
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            stages = {stage: dict(entry) for stage, entry in self._stages.items()}
+        for entry in stages.values():
+            entry["total_tokens"] = entry["prompt_tokens"] + entry["completion_tokens"]
+        return stages
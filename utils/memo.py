@@ -0,0 +1,174 @@
+"""
+Backend-native memoization for the FastAPI process.
+
+Replaces ``st.cache_data`` (which needs a running Streamlit session) with an
+in-process cache that keys file arguments by content hash, expires entries
+after a TTL, evicts least-recently-used entries once a byte budget is
+exceeded and keeps hit/miss statistics.
+"""
+
+import functools
+import hashlib
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from utils.hashing import file_sha256
+
+DEFAULT_MAX_BYTES = 128 * 1024 * 1024
+
+_registry: Dict[str, "MemoCache"] = {}
+_registry_lock = threading.Lock()
+_MISSING = object()
+
+
+def estimate_size(value: Any) -> int:
+    """Best-effort size in bytes of a cached value."""
+    try:
+        if hasattr(value, "memory_usage") and hasattr(value, "columns"):
+            return int(value.memory_usage(deep=True).sum())
+        if hasattr(value, "nbytes"):
+            return int(value.nbytes)
+        if isinstance(value, dict) and value and all(hasattr(v, "columns") for v in value.values()):
+            return sum(estimate_size(v) for v in value.values())
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class MemoCache:
+    """Thread-safe TTL + LRU cache bounded by total value size."""
+
+    def __init__(self, name: str, ttl: Optional[float] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.name = name
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (value, size, expires_at)
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+        with _registry_lock:
+            _registry[name] = self
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return default
+            value, size, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                self._drop(key)
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return default
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _drop(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+            }
+
+
+def _key_part(value: Any) -> Any:
+    # Paths to existing files are keyed by content, so re-uploads under the
+    # same name invalidate and identical copies under new names hit
+    if isinstance(value, str) and len(value) < 4096 and os.path.isfile(value):
+        return ("file", file_sha256(value))
+    if isinstance(value, (list, tuple)):
+        return tuple(_key_part(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _key_part(v)) for k, v in value.items()))
+    return value
+
+
+def make_key(*args, **kwargs) -> str:
+    """Stable digest of call arguments, hashing file paths by content."""
+    parts = (_key_part(args), _key_part(kwargs))
+    try:
+        raw = pickle.dumps(parts, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        raw = repr(parts).encode()
+    return hashlib.sha256(raw).hexdigest()
+
+
+def memoize(
+    ttl: Optional[float] = 3600,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    name: Optional[str] = None,
+    should_cache: Optional[Callable[[Any], bool]] = None,
+) -> Callable:
+    """
+    Decorator memoizing a function in a named ``MemoCache``.
+
+    Works beneath ``@tool`` and on plain graph-node helpers alike; the wrapper
+    keeps the wrapped signature/docstring and exposes ``cache`` and
+    ``cache_clear``. ``should_cache`` can veto caching a result (e.g. errors).
+    """
+    def decorator(func: Callable) -> Callable:
+        cache = MemoCache(name or f"{func.__module__}.{func.__qualname__}", ttl=ttl, max_bytes=max_bytes)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = make_key(*args, **kwargs)
+            value = cache.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+            value = func(*args, **kwargs)
+            if should_cache is None or should_cache(value):
+                cache.set(key, value)
+            return value
+
+        wrapper.cache = cache
+        wrapper.cache_clear = cache.clear
+        return wrapper
+
+    return decorator
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Statistics for every registered cache, keyed by cache name."""
+    with _registry_lock:
+        caches = list(_registry.values())
+    return {cache.name: cache.stats() for cache in caches}
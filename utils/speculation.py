@@ -0,0 +1,121 @@
+"""
+Speculative execution of cheap, likely-needed work while routing is in flight.
+
+The router's LLM call takes a while; during it ``speculate`` starts work that
+the chosen route will probably need (retrieving personal context for the query,
+warming the analytics caches for an attached file). The consumer ``claim``s the
+result instead of recomputing it, waiting only for whatever is still running
+(a speculation still queued behind others is cancelled and the consumer
+computes it directly); when the route turns out not to need it the
+speculation is ``discard``ed. Speculated work must not block on other work,
+or it holds one of the few workers.
+
+Stats per kind: hit rate, total latency saved (work that overlapped routing),
+speculations cancelled before they started and work wasted on discarded ones.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Tuple
+
+SPECULATION_ENABLED = os.getenv("SPECULATIVE_PREFETCH", "true").lower() in ("1", "true", "yes")
+SPECULATION_WORKERS = int(os.getenv("SPECULATION_WORKERS", "2"))
+SPECULATION_TTL = float(os.getenv("SPECULATION_TTL", "120"))
+
+_executor = ThreadPoolExecutor(max_workers=SPECULATION_WORKERS, thread_name_prefix="speculation")
+_pending: Dict[Tuple[str, str], Dict[str, Any]] = {}
+_stats: Dict[str, Dict[str, Any]] = {}
+_lock = threading.Lock()
+
+
+def _kind_stats(kind: str) -> Dict[str, Any]:
+    return _stats.setdefault(kind, {"started": 0, "hits": 0, "cancelled": 0, "discarded": 0, "errors": 0, "saved_s": 0.0, "wasted_s": 0.0})
+
+
+def _run(entry: Dict[str, Any], fn: Callable, args: tuple) -> Any:
+    entry["began"] = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        entry["finished"] = time.perf_counter()
+
+
+def _drop_expired(now: float) -> None:
+    for key in [key for key, entry in _pending.items() if now - entry["queued"] > SPECULATION_TTL]:
+        del _pending[key]
+        _kind_stats(key[0])["discarded"] += 1
+
+
+def speculate(kind: str, key: str, fn: Callable, *args) -> None:
+    """Start ``fn(*args)`` in the background unless the same speculation is already pending."""
+    if not SPECULATION_ENABLED or not key:
+        return
+    now = time.perf_counter()
+    with _lock:
+        _drop_expired(now)
+        if (kind, key) in _pending:
+            return
+        entry: Dict[str, Any] = {"queued": now, "began": None, "finished": None}
+        entry["future"] = _executor.submit(_run, entry, fn, args)
+        _pending[(kind, key)] = entry
+        _kind_stats(kind)["started"] += 1
+
+
+def claim(kind: str, key: str) -> Tuple[bool, Any]:
+    """
+    (True, result) of a pending speculation, waiting for it if still running;
+    (False, None) when there is none, it hadn't started yet (it is cancelled
+    rather than waited for behind other speculations) or it failed, so the
+    caller computes normally.
+    """
+    with _lock:
+        entry = _pending.pop((kind, key), None)
+        if entry is None:
+            return False, None
+        future: Future = entry["future"]
+        if future.cancel():
+            _kind_stats(kind)["cancelled"] += 1
+            return False, None
+    claimed = time.perf_counter()
+    try:
+        result = future.result()
+    except Exception as e:
+        print(f"DEBUG: Speculative {kind} failed, recomputing: {e}")
+        with _lock:
+            _kind_stats(kind)["errors"] += 1
+        return False, None
+    waited = time.perf_counter() - claimed
+    duration = entry["finished"] - entry["began"]
+    with _lock:
+        stats = _kind_stats(kind)
+        stats["hits"] += 1
+        # Without speculation the whole duration would have been spent now
+        stats["saved_s"] += max(0.0, duration - waited)
+    return True, result
+
+
+def discard(kind: str, key: str) -> None:
+    """The route doesn't need this speculation: cancel it if it hasn't started."""
+    with _lock:
+        entry = _pending.pop((kind, key), None)
+        if entry is None:
+            return
+        stats = _kind_stats(kind)
+        stats["discarded"] += 1
+        if not entry["future"].cancel() and entry["began"] is not None:
+            stats["wasted_s"] += (entry["finished"] or time.perf_counter()) - entry["began"]
+
+
+def speculation_stats() -> Dict[str, Dict[str, Any]]:
+    with _lock:
+        stats = {kind: dict(values) for kind, values in _stats.items()}
+        pending = len(_pending)
+    for values in stats.values():
+        resolved = values["hits"] + values["cancelled"] + values["discarded"] + values["errors"]
+        values["hit_rate"] = round(values["hits"] / resolved, 3) if resolved else None
+        values["avg_saved_ms"] = round(1000 * values["saved_s"] / values["hits"], 1) if values["hits"] else None
+        values["saved_s"] = round(values["saved_s"], 3)
+        values["wasted_s"] = round(values["wasted_s"], 3)
+    return {"enabled": SPECULATION_ENABLED, "pending": pending, "kinds": stats}
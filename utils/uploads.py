@@ -0,0 +1,120 @@
+"""
+Content-addressed storage for uploaded analytics exports.
+
+Uploads are streamed to ``UPLOAD_DIR`` in chunks while their SHA-256 is
+computed, then stored as ``<sha256><ext>``. The digest doubles as the file ID
+clients send back with queries, so identical uploads are written once and the
+ID matches the content-hash keys used by the analytics caches.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from utils.hashing import remember_sha256
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./uploaded_files")
+ALLOWED_EXTENSIONS = (".xlsx", ".csv")
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 100 * 1024 * 1024))
+
+_FILE_ID = re.compile(r"^[0-9a-f]{64}$")
+_index_lock = threading.Lock()
+
+
+def _index_path() -> str:
+    return os.path.join(UPLOAD_DIR, "index.json")
+
+
+def _load_index() -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(_index_path(), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_index(index: Dict[str, Dict[str, Any]]) -> None:
+    tmp = _index_path() + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp, _index_path())
+
+
+class UploadWriter:
+    """Writes an upload chunk by chunk to a temp file while hashing it."""
+
+    def __init__(self, filename: str):
+        ext = os.path.splitext(filename or "")[1].lower()
+        if ext not in ALLOWED_EXTENSIONS:
+            raise ValueError(f"Unsupported file type '{ext}'. Upload an .xlsx or .csv export.")
+        os.makedirs(UPLOAD_DIR, exist_ok=True)
+        self.filename = os.path.basename(filename)
+        self.ext = ext
+        self.size = 0
+        self._sha = hashlib.sha256()
+        fd, self._tmp = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=".part")
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > MAX_UPLOAD_BYTES:
+            self.abort()
+            raise ValueError(f"Upload exceeds the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit.")
+        self._sha.update(chunk)
+        self._file.write(chunk)
+
+    def abort(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self._tmp):
+            os.remove(self._tmp)
+
+    def finish(self) -> Dict[str, Any]:
+        """Move the upload into place (or drop it if the content already exists)."""
+        self._file.close()
+        if self.size == 0:
+            self.abort()
+            raise ValueError("Uploaded file is empty.")
+
+        file_id = self._sha.hexdigest()
+        path = os.path.join(UPLOAD_DIR, f"{file_id}{self.ext}")
+        with _index_lock:
+            deduplicated = os.path.exists(path)
+            if deduplicated:
+                os.remove(self._tmp)
+            else:
+                os.replace(self._tmp, path)
+            remember_sha256(path, file_id)
+
+            index = _load_index()
+            entry = index.get(file_id) or {"path": path, "size": self.size, "uploaded_at": time.time(), "filenames": []}
+            if self.filename not in entry["filenames"]:
+                entry["filenames"].append(self.filename)
+            index[file_id] = entry
+            _save_index(index)
+
+        print(f"DEBUG: Upload {self.filename} stored as {file_id[:12]} (deduplicated={deduplicated})")
+        return {"file_id": file_id, "filename": self.filename, "size": self.size, "deduplicated": deduplicated}
+
+
+def resolve_file_id(file_id: str) -> str:
+    """Path of an uploaded file, raising ValueError for unknown IDs."""
+    if not _FILE_ID.match(file_id or ""):
+        raise ValueError(f"Invalid file id '{file_id}'")
+    entry = _load_index().get(file_id)
+    if entry and os.path.exists(entry["path"]):
+        return entry["path"]
+    for ext in ALLOWED_EXTENSIONS:
+        path = os.path.join(UPLOAD_DIR, f"{file_id}{ext}")
+        if os.path.exists(path):
+            return path
+    raise ValueError(f"Unknown file id '{file_id}'. Upload the file first.")
+
+
+def upload_info(file_id: str) -> Optional[Dict[str, Any]]:
+    return _load_index().get(file_id)